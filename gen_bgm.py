@@ -1,24 +1,18 @@
+import random
 import torch, torchaudio
-from einops import rearrange
-from stable_audio_tools import get_pretrained_model
-from stable_audio_tools.inference.generation import generate_diffusion_cond
+from src.bgm import daemon as bgm_daemon
+from src.bgm.generator import StableAudioGenerator, DaemonGenerator
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model, cfg = get_pretrained_model("stabilityai/stable-audio-open-1.0")
-model = model.to(device)
+PROMPT = "instrumental only, no vocals, lofi chillhop, warm Rhodes and soft drums, simple repeating motif, clean mix, 90 BPM"
 
-conditioning = [{
-  "prompt": "instrumental only, no vocals, lofi chillhop, warm Rhodes and soft drums, simple repeating motif, clean mix, 90 BPM",
-  "seconds_start": 0, "seconds_total": 30
-}]
+# 상주 서비스(python -m src.bgm.daemon)가 떠 있으면 그쪽으로, 아니면 직접 로드
+if bgm_daemon.is_alive():
+    gen = DaemonGenerator(bgm_daemon.DEFAULT_SOCK, seconds=30)
+else:
+    gen = StableAudioGenerator.load(seconds=30, cfg_scale=7, sampler="dpmpp-3m-sde")
 
-audio = generate_diffusion_cond(
-  model, steps=100, cfg_scale=7, conditioning=conditioning,
-  sample_size=cfg["sample_size"], sigma_min=0.3, sigma_max=500,
-  sampler_type="dpmpp-3m-sde", device=device
-)
-audio = rearrange(audio, "b d n -> d (b n)")
+audio, sr = gen.generate(PROMPT, seed=random.randrange(2**31), steps=100)
 audio = audio.float(); audio = audio/(audio.abs().max()+1e-8)
 audio = (audio.clamp(-1,1)*32767).short().cpu()
-torchaudio.save("assets/bgm_seed.wav", audio, cfg["sample_rate"])
+torchaudio.save("assets/bgm_seed.wav", audio, sr)
 print("Wrote assets/bgm_seed.wav")
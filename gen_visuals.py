@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, re, subprocess, argparse, time, base64, io, shutil, tempfile
+import os, re, subprocess, argparse, time
 from pathlib import Path
 
 # ---------- 공통 유틸 ----------
@@ -46,39 +46,20 @@ def build_prompt(style:str, text:str):
     return f"{style}, {base}" if style else base
 
 # ---------- SD(WebUI) 호출 ----------
+_SD_CLIENTS = {}
+
+def get_sd_client(sd_url, **kw):
+    # URL별 세션 재사용(keep-alive)
+    from src.sd_client import SDClient
+    if sd_url not in _SD_CLIENTS:
+        _SD_CLIENTS[sd_url] = SDClient(sd_url, **kw)
+    return _SD_CLIENTS[sd_url]
+
 def sd_txt2img(sd_url, prompt, negative, w, h, steps, cfg, sampler, seed):
-    import requests
+    from src.sd_client import make_payload
     if seed is None or seed < 0:
         seed = int(time.time()*1000) % 4294967295
-    payload = {
-        "prompt": prompt,
-        "negative_prompt": negative or "",
-        "steps": int(steps),
-        "cfg_scale": float(cfg),
-        "width": int(w),
-        "height": int(h),
-        "sampler_name": sampler or "Euler a",
-        "seed": int(seed),
-        "restore_faces": False,
-        "tiling": False,
-        "enable_hr": False,
-        "batch_size": 1,
-    }
-    url = sd_url.rstrip("/") + "/sdapi/v1/txt2img"
-    import requests as _r
-    r = _r.post(url, json=payload, timeout=600)
-    r.raise_for_status()
-    data = r.json()
-    imgs = data.get("images", [])
-    if not imgs:
-        raise RuntimeError("SD returned no images")
-    b = imgs[0]
-    if "," in b:
-        b = b.split(",",1)[-1]
-    imbytes = base64.b64decode(b)
-    from PIL import Image
-    img = Image.open(io.BytesIO(imbytes)).convert("RGB")
-    return img
+    return get_sd_client(sd_url).txt2img(make_payload(prompt, negative, w, h, steps, cfg, sampler, seed))
 
 # ---------- 비디오 생성(켄 번즈) ----------
 def make_kenburns(png, mp4, fps, seconds, w, h, encoder):
@@ -91,49 +72,29 @@ def make_kenburns(png, mp4, fps, seconds, w, h, encoder):
     cmd = f'ffmpeg -y -loglevel error -loop 1 -t "{seconds:.3f}" -i "{png}" -filter_complex "{vf}" -frames:v {frames} {enc_args(encoder)} "{mp4}"'
     run_cmd(cmd)
 
-# ---------- SVD 내부 실행(동일 파일을 SVD venv로 재호출) ----------
-def call_svd_self_in_venv(svd_py, this_file, png, mp4, fps, seconds, w, h, encoder, model, motion_bucket_id, noise_aug):
-    cmd = (
-        f'"{svd_py}" "{this_file}" --_svd-internal '
-        f'--input "{png}" --output "{mp4}" --fps {fps} --seconds {seconds:.3f} '
-        f'--size {w}x{h} --encoder {encoder} '
-        f'--svd-model "{model}" --motion-bucket {motion_bucket_id} --noise-aug {noise_aug}'
-    )
-    run_cmd(cmd)
+# ---------- SVD 워커(동일 파일을 SVD venv에서 한 번만 띄우고 파이프로 샷 전달) ----------
+def start_svd_worker(svd_py, this_file, model):
+    from src.svd_worker import WorkerProcess
+    return WorkerProcess([svd_py, this_file, "--_svd-serve", "--svd-model", model],
+                         cwd=str(Path(this_file).parent))
 
 # ---------- SVD 내부 모드 ----------
-def svd_internal(input_png, output_mp4, fps, seconds, size, encoder, model, motion_bucket_id, noise_aug):
-    import torch
-    from PIL import Image
-    from diffusers import StableVideoDiffusionPipeline
+def encode_frames(frames, output_mp4, fps, seconds, w, h, encoder):
+    # 프레임을 ffmpeg stdin으로 바로 인코딩(PNG 왕복 없음), 샷 길이는 같은 그래프에서 tpad/trim
+    from src.render.frame_sink import write_frames
+    write_frames(frames, output_mp4, w, h, fps, enc_args(encoder), duration=seconds)
+
+def svd_internal(worker, input_png, output_mp4, fps, seconds, size, encoder, motion_bucket_id, noise_aug):
     w,h = [int(x) for x in size.lower().split("x")]
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    dtype  = torch.float16 if device=="cuda" else torch.float32
-    variant = "fp16" if device=="cuda" else None
-
-    pipe = StableVideoDiffusionPipeline.from_pretrained(model, torch_dtype=dtype, variant=variant)
-    pipe = pipe.to(device)
-    if device == "cpu":
-        pipe.enable_model_cpu_offload()
-
-    num_frames = max(8, min(48, int(round(fps*seconds))))
-    img = Image.open(input_png).convert("RGB").resize((w,h), Image.LANCZOS)
-    out = pipe(
-        image=img,
-        decode_chunk_size=8,
-        num_frames=num_frames,
-        motion_bucket_id=int(motion_bucket_id),
-        noise_aug_strength=float(noise_aug),
-    ).frames[0]
-
-    tmp = Path(tempfile.mkdtemp(prefix="svd_frames_"))
-    try:
-        for i,fr in enumerate(out):
-            fr.save(tmp/f"f_{i:06d}.png")
-        cmd = f'ffmpeg -y -loglevel error -r {fps} -i "{tmp}/f_%06d.png" -vf format=yuv420p -frames:v {len(out)} {enc_args(encoder)} "{output_mp4}"'
-        run_cmd(cmd)
-    finally:
-        shutil.rmtree(tmp, ignore_errors=True)
+    return worker.render(input_png, output_mp4, fps, seconds, (w,h),
+                         lambda frames, mp4, fps_, sec: encode_frames(frames, mp4, fps_, sec, w, h, encoder),
+                         motion_bucket_id=motion_bucket_id, noise_aug=noise_aug)
+
+def svd_serve(model):
+    # 파이프라인 1회 로드 후 stdin의 샷 요청을 순서대로 처리
+    from src.svd_worker import SvdWorker, serve
+    worker = SvdWorker(model)
+    serve(lambda req: {"mp4": svd_internal(worker, **req), "stats": worker.stats})
 
 # ---------- 메인 ----------
 def main():
@@ -154,6 +115,14 @@ def main():
     ap.add_argument("--max-shot", type=int, default=9999)
     ap.add_argument("--overwrite", action="store_true")
     ap.add_argument("--encoder", default="libx264", help="libx264 | h264_nvenc | hevc_nvenc ...")
+    ap.add_argument("--sd-inflight", type=int, default=2, help="WebUI 동시 요청 수")
+    ap.add_argument("--sd-batch", type=int, default=4, help="동일 설정 샷 묶음 최대 batch_size")
+    ap.add_argument("--encode-jobs", type=int, default=2, help="Ken Burns 인코딩 병렬 수")
+    ap.add_argument("--reuse", choices=["off","exact","near"], default="off",
+                    help="이미지 재사용 인덱스(assets/image_index.jsonl): exact=동일 프롬프트+설정, near=유사 프롬프트 허용 "
+                         "(--overwrite 또는 랜덤 시드(--seed<0)면 사용 안 함)")
+    ap.add_argument("--near-thr", type=float, default=0.8, help="--reuse near 유사도 임계값(단어/바이그램 Jaccard)")
+    ap.add_argument("--hero", default="1", help="near 재사용 제외 샷 번호(콤마), 예: 1,5")
     ap.add_argument("--t2v", choices=["none","svd"], default="none", help="shot.png -> shot.mp4 생성 방식")
     ap.add_argument("--svd-python", default=str(Path("~/.venv/svd/bin/python").expanduser()))
     ap.add_argument("--svd-model", default=os.environ.get("SVD_MODEL","stabilityai/stable-video-diffusion-img2vid"))
@@ -161,6 +130,7 @@ def main():
     ap.add_argument("--noise-aug", type=float, default=0.1)
     # 내부용(사용자 지정 금지)
     ap.add_argument("--_svd-internal", action="store_true")
+    ap.add_argument("--_svd-serve", action="store_true")
     ap.add_argument("--input")
     ap.add_argument("--output")
     ap.add_argument("--seconds", type=float)
@@ -168,15 +138,19 @@ def main():
     args = ap.parse_args()
 
     # 내부(SVD) 모드 진입
+    if getattr(args, "_svd_serve", False):
+        svd_serve(args.svd_model)
+        return
     if getattr(args, "_svd_internal", False):
+        from src.svd_worker import SvdWorker
         svd_internal(
+            SvdWorker(args.svd_model),
             input_png=args.input,
             output_mp4=args.output,
             fps=args.fps,
             seconds=args.seconds,
             size=args.size,
             encoder=args.encoder,
-            model=args.svd_model,
             motion_bucket_id=args.motion_bucket,
             noise_aug=args.noise_aug,
         )
@@ -203,38 +177,91 @@ def main():
     pngs, mp4s = [], []
     this_file = str(Path(__file__).resolve())
 
-    for s in shots:
-        idx = s["idx"]
-        d   = float(s["seconds"])
-        text= s["text"].strip()
-        prompt = build_prompt(args.style, text)
+    svd = {}   # SVD venv 상주 워커(첫 샷에서 1회 기동)
 
-        png = outdir/f"shot_{idx:03d}.png"
-        mp4 = outdir/f"shot_{idx:03d}.mp4"
+    def render(s, png, mp4):
+        d = float(s["seconds"])
+        if args.t2v == "svd":
+            if Path(args.svd_python).exists():
+                try:
+                    if "proc" not in svd:
+                        svd["proc"] = start_svd_worker(args.svd_python, this_file, args.svd_model)
+                    svd["proc"].call({
+                        "input_png": str(png), "output_mp4": str(mp4), "fps": args.fps, "seconds": d,
+                        "size": f"{args.w}x{args.h}", "encoder": args.encoder,
+                        "motion_bucket_id": args.motion_bucket, "noise_aug": args.noise_aug,
+                    })
+                    return
+                except Exception as e:
+                    print(f"⚠️ SVD 실패: {e}\n→ Ken Burns로 폴백합니다.")
+            else:
+                print("⚠️ SVD venv 미발견 → Ken Burns로 폴백")
+        make_kenburns(str(png), str(mp4), args.fps, d, args.w, args.h, args.encoder)
 
-        if args.overwrite or not png.exists():
-            img = sd_txt2img(args.sd_url, prompt, args.neg, args.w, args.h, args.steps, args.cfg, args.sampler, args.seed)
-            img.save(png)
+    # 이미지 생성(WebUI)과 인코딩을 겹쳐서 진행: 완성된 PNG부터 바로 인코딩 풀에 투입
+    from concurrent.futures import ThreadPoolExecutor
+    from src.sd_client import make_payload
+    workers = 1 if args.t2v == "svd" else max(1, args.encode_jobs)   # SVD는 GPU 하나 → 직렬
+    enc_pool = ThreadPoolExecutor(max_workers=workers)
+    futs = []
 
+    def schedule(s, png, mp4):
         if args.overwrite or not mp4.exists():
-            if args.t2v == "svd":
-                if Path(args.svd_python).exists():
-                    try:
-                        call_svd_self_in_venv(
-                            args.svd_python, this_file, str(png), str(mp4),
-                            args.fps, d, args.w, args.h, args.encoder,
-                            args.svd_model, args.motion_bucket, args.noise_aug
-                        )
-                    except Exception as e:
-                        print(f"⚠️ SVD 실패: {e}\n→ Ken Burns로 폴백합니다.")
-                        make_kenburns(str(png), str(mp4), args.fps, d, args.w, args.h, args.encoder)
-                else:
-                    print("⚠️ SVD venv 미발견 → Ken Burns로 폴백")
-                    make_kenburns(str(png), str(mp4), args.fps, d, args.w, args.h, args.encoder)
-            else:
-                make_kenburns(str(png), str(mp4), args.fps, d, args.w, args.h, args.encoder)
+            futs.append(enc_pool.submit(render, s, png, mp4))
 
+    # 이미지 재사용 인덱스: 같은(또는 비슷한) 프롬프트+설정으로 만든 이미지가 있으면 생성 생략
+    # --overwrite(새로 뽑기) / 랜덤 시드(매번 다른 이미지가 목적)면 인덱스를 보지도 쓰지도 않음
+    index = None
+    if args.reuse != "off" and (args.overwrite or args.seed < 0):
+        print(f"[reuse] {'--overwrite' if args.overwrite else '랜덤 시드'} → 이미지 재사용 안 함")
+    elif args.reuse != "off":
+        from src.image_index import ImageIndex
+        index = ImageIndex()
+    heroes = {int(x) for x in args.hero.split(",") if x.strip().isdigit()}
+    settings = {"engine": "a1111", "w": args.w, "h": args.h, "steps": args.steps, "cfg": args.cfg,
+                "sampler": args.sampler, "neg": args.neg, "seed": args.seed}
+
+    jobs = []
+    for s in shots:
+        idx = s["idx"]
+        png = outdir/f"shot_{idx:03d}.png"
+        mp4 = outdir/f"shot_{idx:03d}.mp4"
         pngs.append(str(png)); mp4s.append(str(mp4))
+        if args.overwrite or not png.exists():
+            prompt = build_prompt(args.style, s["text"].strip())
+            near = args.near_thr if args.reuse == "near" and idx not in heroes else None
+            hit = index.lookup(prompt, settings, near=near) if index else None
+            if hit:
+                index.materialize(hit[0], png)
+                print(f"↪ shot_{idx:03d}.png 재사용({hit[2]}, {hit[1]:.2f}): {hit[0]}")
+                schedule(s, png, mp4)
+                continue
+            seed = args.seed if args.seed >= 0 else -1
+            jobs.append({"key": (s, png, mp4), "prompt": prompt, "payload": make_payload(
+                prompt, args.neg, args.w, args.h, args.steps, args.cfg, args.sampler, seed)})
+        else:
+            schedule(s, png, mp4)
+
+    try:
+        if jobs:
+            client = get_sd_client(args.sd_url, max_in_flight=args.sd_inflight, max_batch=args.sd_batch)
+            for job, img in client.iter_txt2img(jobs):
+                if isinstance(img, Exception):
+                    raise RuntimeError(f"SD txt2img 실패: {img}")
+                s, png, mp4 = job["key"]
+                img.save(png)
+                if index is not None:
+                    index.add(job["prompt"], settings, str(png))
+                print(f"↪ shot_{s['idx']:03d}.png 생성")
+                schedule(s, png, mp4)
+            st = client.stats
+            print(f"[SD] requests={st['requests']} images={st['images']} busy={st['sec']:.1f}s")
+        for f in futs:
+            f.result()
+    finally:
+        enc_pool.shutdown(wait=True)
+        if "proc" in svd:
+            svd["proc"].close()
 
     # 합치기
     concat = outdir/"concat.txt"
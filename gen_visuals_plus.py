@@ -35,25 +35,24 @@ def parse_srt(srt_path):
         blocks.append(dict(idx=int(num), text=text, start=st, end=ed, dur=dur))
     return blocks
 
+_SD_CLIENTS = {}
+
+def get_sd_client(a1111_url, **kw):
+    # URL별 세션 재사용(keep-alive)
+    from src.sd_client import SDClient
+    if a1111_url not in _SD_CLIENTS:
+        _SD_CLIENTS[a1111_url] = SDClient(a1111_url, **kw)
+    return _SD_CLIENTS[a1111_url]
+
+def sd_payload(prompt, neg, w, h, steps, cfg, seed):
+    from src.sd_client import make_payload
+    return make_payload(prompt, neg, w, h, steps, cfg, "DPM++ 2M Karras", seed)
+
 def sd_txt2img(a1111_url, prompt, neg, w, h, steps, cfg, seed, out_png):
-    import requests, base64
-    payload = {
-        "prompt": prompt,
-        "negative_prompt": neg,
-        "steps": steps,
-        "cfg_scale": cfg,
-        "seed": seed,
-        "width": w, "height": h,
-        "sampler_name": "DPM++ 2M Karras",
-        "batch_size": 1,
-    }
     try:
-        r = requests.post(f"{a1111_url}/sdapi/v1/txt2img", json=payload, timeout=300)
-        r.raise_for_status()
-        img64 = r.json()["images"][0]
+        img = get_sd_client(a1111_url).txt2img(sd_payload(prompt, neg, w, h, steps, cfg, seed))
         Path(out_png).parent.mkdir(parents=True, exist_ok=True)
-        with open(out_png, "wb") as f:
-            f.write(base64.b64decode(img64.split(",",1)[-1]))
+        img.save(out_png)
         return True
     except Exception as e:
         print(f"[SD] txt2img 실패, 폴백: {e}")
@@ -70,63 +69,36 @@ def make_kenburns(png, mp4, d, fps, w, h, encoder):
         f'-frames:v {frames} -c:v {encoder} -preset {preset} {gop} -pix_fmt yuv420p -movflags +faststart "{mp4}"'
     )
 
-def try_svd(img_path, mp4_out, d, fps, w, h, encoder):
+SVD_MODEL = "stabilityai/stable-video-diffusion-img2vid-xt-1-1"
+_SVD = {}
+
+def get_svd_worker(loader=None):
+    """실행당 SVD 파이프라인 1회 로드(샷마다 from_pretrained 하지 않음). loader 주입 가능."""
+    if "worker" not in _SVD:
+        from src.svd_worker import SvdWorker, load_pipeline
+        _SVD["worker"] = SvdWorker(SVD_MODEL, loader=loader or load_pipeline, device="cuda", cpu_offload=True,
+                                     use_safetensors=True)
+    return _SVD["worker"]
+
+def try_svd(img_path, mp4_out, d, fps, w, h, encoder, worker=None):
     """Stable Video Diffusion (img2vid) → mp4. 실패 시 False 반환."""
     try:
-        import torch
-        from PIL import Image
-        from diffusers import StableVideoDiffusionPipeline
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        if device != "cuda":
-            print("[SVD] CUDA GPU가 필요합니다 → 폴백(Ken Burns)."); return False
-
-        hf_token = os.getenv("HF_TOKEN", None)
-        pipe = StableVideoDiffusionPipeline.from_pretrained(
-            "stabilityai/stable-video-diffusion-img2vid-xt-1-1",
-            torch_dtype=torch.float16, use_safetensors=True, variant="fp16",
-            token=hf_token
-        ).to(device)
-        pipe.enable_model_cpu_offload()
-
-        img = Image.open(img_path).convert("RGB").resize((w, h), Image.LANCZOS)
+        if worker is None:
+            import torch
+            if not torch.cuda.is_available():
+                print("[SVD] CUDA GPU가 필요합니다 → 폴백(Ken Burns)."); return False
+            worker = get_svd_worker()
 
         target_frames = max(12, min(72, int(d*fps)))
 
-        video_frames = pipe(img, decode_chunk_size=8, num_frames=target_frames).frames[0]
-
-        import cv2
-        tmp = Path(mp4_out).with_suffix(".raw.mp4")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        vw = cv2.VideoWriter(str(tmp), fourcc, fps, (w, h))
-        for f in video_frames:
-            fr = cv2.cvtColor(f, cv2.COLOR_RGB2BGR)
-            vw.write(fr)
-        vw.release()
+        # noise_aug 0.02 = 예전 파이프라인 호출(diffusers 기본 noise_aug_strength) 그대로
+        video_frames = worker.frames(img_path, target_frames, size=(w, h), noise_aug=0.02)
 
+        # 프레임 → ffmpeg stdin 단일 인코드 (길이 보정 tpad/trim 포함, 중간 mp4v 파일 없음)
+        from src.render.frame_sink import write_frames
         preset = "p5" if "nvenc" in encoder else "veryfast"
         gop = "-g 60 -keyint_min 60" if "nvenc" in encoder else "-x264-params keyint=60:min-keyint=60:scenecut=0"
-
-        def getdur(p):
-            r = subprocess.run(f'ffprobe -v error -show_entries format=duration -of csv=p=0 "{p}"',
-                               shell=True, capture_output=True, text=True)
-            return float((r.stdout or "0").strip() or 0)
-        cur = getdur(tmp)
-        if cur <= 0:
-            print("[SVD] 생성 영상 길이 확인 실패 → 폴백."); return False
-
-        if cur < d - 0.03:
-            pad = d - cur
-            sh(f'ffmpeg -y -i "{tmp}" -vf "tpad=stop_mode=clone:stop_duration={pad:.3f},fps={fps},scale={w}:{h},format=yuv420p" '
-               f'-c:v {encoder} -preset {preset} {gop} -pix_fmt yuv420p -movflags +faststart "{mp4_out}"')
-        elif cur > d + 0.03:
-            sh(f'ffmpeg -y -ss 0 -t {d:.3f} -i "{tmp}" -vf "fps={fps},scale={w}:{h},format=yuv420p" '
-               f'-c:v {encoder} -preset {preset} {gop} -pix_fmt yuv420p -movflags +faststart "{mp4_out}"')
-        else:
-            sh(f'ffmpeg -y -i "{tmp}" -vf "fps={fps},scale={w}:{h},format=yuv420p" '
-               f'-c:v {encoder} -preset {preset} {gop} -pix_fmt yuv420p -movflags +faststart "{mp4_out}"')
-
-        try: Path(tmp).unlink(missing_ok=True)
-        except: pass
+        write_frames(video_frames, mp4_out, w, h, fps, f"-c:v {encoder} -preset {preset} {gop}", duration=d)
         return True
     except Exception as e:
         print(f"[SVD] 실패 → 폴백(Ken Burns). 이유: {e}")
@@ -147,6 +119,9 @@ def main():
     ap.add_argument("--sd-url", default="http://127.0.0.1:7860")
     ap.add_argument("--t2v", choices=["off","svd"], default="svd")
     ap.add_argument("--encoder", default=("h264_nvenc" if os.getenv("YT_ENCODER")=="nvenc" else "libx264"))
+    ap.add_argument("--sd-inflight", type=int, default=2, help="WebUI 동시 요청 수")
+    ap.add_argument("--sd-batch", type=int, default=4, help="동일 설정 샷 묶음 최대 batch_size")
+    ap.add_argument("--encode-jobs", type=int, default=2, help="Ken Burns 인코딩 병렬 수 (--t2v off)")
     args = ap.parse_args()
 
     w,h = map(int, args.size.lower().split('x',1))
@@ -158,38 +133,68 @@ def main():
     print(f"▶ durations.txt 저장 ({len(blocks)}줄)")
 
     # txt2img (AUTOMATIC1111 있으면 사용)
-    a1111_ok = False
-    try:
-        import requests
-        requests.get(args.sd_url, timeout=2)
-        a1111_ok = True
-    except Exception:
+    client = get_sd_client(args.sd_url, max_in_flight=args.sd_inflight, max_batch=args.sd_batch)
+    a1111_ok = client.ping()
+    if not a1111_ok:
         print("ℹ️ AUTOMATIC1111 미동작: 이미지 생성은 건너뜁니다(기존 PNG 사용).")
 
-    for i,b in enumerate(blocks):
+    # --t2v off면 Ken Burns 인코딩을 이미지 생성과 겹쳐서 진행(완성된 PNG부터 투입)
+    from concurrent.futures import ThreadPoolExecutor
+    enc_pool = ThreadPoolExecutor(max_workers=max(1, args.encode_jobs)) if args.t2v == "off" else None
+    futs = []
+
+    def seg_paths(i):
         seg = outdir/f"video/seg_{i:03d}"
-        seg.mkdir(parents=True, exist_ok=True)
-        png = seg/"shot.png"
+        return seg/"shot.png", seg/"shot.mp4"
+
+    def kenburns(i, b):
+        png, mp4 = seg_paths(i)
+        make_kenburns(str(png), str(mp4), b["dur"], args.fps, w, h, args.encoder)
+
+    jobs = []
+    for i,b in enumerate(blocks):
+        png, _ = seg_paths(i)
+        png.parent.mkdir(parents=True, exist_ok=True)
         if a1111_ok:
             prompt = f"{b['text']}, {args.style}".strip(", ")
-            made = sd_txt2img(args.sd_url, prompt, args.neg, w, h, args.steps, args.cfg, args.seed, str(png))
-            print(f"↪ seg_{i:03d} {'생성완료' if made else '생성실패→기존PNG'}")
+            jobs.append({"key": i, "payload": sd_payload(prompt, args.neg, w, h, args.steps, args.cfg, args.seed)})
         else:
             print(f"↪ seg_{i:03d} 기존 PNG 사용")
-
-    # img2vid or Ken Burns
-    print("▶ 이미지 → shot.mp4")
-    for i,b in enumerate(blocks):
-        seg = outdir/f"video/seg_{i:03d}"
-        png = seg/"shot.png"
-        mp4 = seg/"shot.mp4"
-        if not png.exists():
-            print(f"⚠️ PNG 없음: {png} → 건너뜀"); continue
-        ok=False
-        if args.t2v=="svd":
+            if enc_pool and png.exists():
+                futs.append(enc_pool.submit(kenburns, i, b))
+
+    for job, img in (client.iter_txt2img(jobs) if jobs else []):
+        i = job["key"]
+        png, _ = seg_paths(i)
+        made = not isinstance(img, Exception)
+        if made:
+            img.save(png)
+        else:
+            print(f"[SD] txt2img 실패, 폴백: {img}")
+        print(f"↪ seg_{i:03d} {'생성완료' if made else '생성실패→기존PNG'}")
+        if enc_pool and png.exists():
+            futs.append(enc_pool.submit(kenburns, i, blocks[i]))
+    if jobs:
+        st = client.stats
+        print(f"[SD] requests={st['requests']} images={st['images']} busy={st['sec']:.1f}s")
+
+    if enc_pool:
+        for f in futs:
+            f.result()
+        enc_pool.shutdown(wait=True)
+        for i,_ in enumerate(blocks):
+            if not seg_paths(i)[0].exists():
+                print(f"⚠️ PNG 없음: {seg_paths(i)[0]} → 건너뜀")
+    else:
+        # img2vid (SVD, 실패 시 Ken Burns)
+        print("▶ 이미지 → shot.mp4")
+        for i,b in enumerate(blocks):
+            png, mp4 = seg_paths(i)
+            if not png.exists():
+                print(f"⚠️ PNG 없음: {png} → 건너뜀"); continue
             ok = try_svd(str(png), str(mp4), b["dur"], args.fps, w, h, args.encoder)
-        if not ok:
-            make_kenburns(str(png), str(mp4), b["dur"], args.fps, w, h, args.encoder)
+            if not ok:
+                make_kenburns(str(png), str(mp4), b["dur"], args.fps, w, h, args.encoder)
 
     # concat
     concat_list = outdir/"all_video.mp4.list.txt"
@@ -207,7 +212,7 @@ def main():
         sh(f'ffmpeg -y -i "{allv}" -i "{alla}" -map 0:v:0 -map 1:a:0 -c:v copy -c:a aac -b:a 192k -shortest "{final}"')
         print(f"✅ 최종: {final}")
     else:
-        print(f"✅ 영상만 생성: {allv} (오디오는 all_audio.m4a가 있으면 자동 합쳐집니다)')
+        print(f"✅ 영상만 생성: {allv} (오디오는 all_audio.m4a가 있으면 자동 합쳐집니다)")
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
-import argparse
+import argparse, json
 from pathlib import Path
 import torch, torchaudio
+from src.audio.duck_curve import load_srt_intervals, srt_gain_curve
+from src.audio import duck_autotune
+from src.audio.wavio import load_audio, save_wav
 
 def db_to_lin(db): return 10.0**(db/20.0)
 def to_float(x):   return x.float()/32768.0 if x.dtype==torch.int16 else x.float()
@@ -46,26 +49,31 @@ def main(args):
     device = "cpu"
 
     # --- Load ---
-    bgm, sr_bgm = torchaudio.load(args.bgm)
-    vox, sr_vox = torchaudio.load(args.voice)
-    bgm, vox = to_float(bgm), to_float(vox)
+    # PCM WAV는 memmap에서 바로 float 변환(그 외 포맷은 디코더 폴백)
+    bgm, sr_bgm = load_audio(args.bgm)
+    bgm = to_float(torch.from_numpy(bgm))
+    vox = None
+    if args.voice:
+        vox, sr_vox = load_audio(args.voice)
+        vox = to_float(torch.from_numpy(vox))
 
     # --- SR unify ---
     target_sr = args.sr
     bgm, _ = resample_if_needed(bgm, sr_bgm, target_sr)
-    vox, _ = resample_if_needed(vox, sr_vox, target_sr)
+    if vox is not None:
+        vox, _ = resample_if_needed(vox, sr_vox, target_sr)
 
-    # --- Length align (shorter) ---
-    L = min(bgm.size(-1), vox.size(-1))
-    bgm, vox = bgm[..., :L], vox[..., :L]
+        # --- Length align (shorter) ---
+        L = min(bgm.size(-1), vox.size(-1))
+        bgm, vox = bgm[..., :L], vox[..., :L]
 
-    # --- VOICE pre (HPF×2 + de-ess + light gate) ---
-    vox = torchaudio.functional.highpass_biquad(vox, target_sr, cutoff_freq=args.voice_hpf)
-    vox = torchaudio.functional.highpass_biquad(vox, target_sr, cutoff_freq=args.voice_hpf)
-    # 라이트 디에서(노치)
-    vox = torchaudio.functional.equalizer_biquad(vox, target_sr, center_freq=7500.0, gain=-3.0, Q=2.0)
+        # --- VOICE pre (HPF×2 + de-ess + light gate) ---
+        vox = torchaudio.functional.highpass_biquad(vox, target_sr, cutoff_freq=args.voice_hpf)
+        vox = torchaudio.functional.highpass_biquad(vox, target_sr, cutoff_freq=args.voice_hpf)
+        # 라이트 디에서(노치)
+        vox = torchaudio.functional.equalizer_biquad(vox, target_sr, center_freq=7500.0, gain=-3.0, Q=2.0)
 
-    if args.gate_enable:
+    if vox is not None and args.gate_enable:
         env_gate = moving_avg_same(vox.mean(dim=0), win=int(target_sr*args.gate_win_ms/1000.0))
         env_db   = 20*torch.log10(env_gate.clamp_min(1e-6))
         under    = (args.gate_thr_db - env_db).clamp_min(0.0)
@@ -83,17 +91,50 @@ def main(args):
     bgm = apply_fade(bgm, target_sr, fin_s=args.fade_in_s, fout_s=args.fade_out_s)
     bgm = bgm * args.bgm_gain
 
-    # --- Sidechain envelope (attack/release) ---
-    vox_mono = vox.mean(dim=0)
-    env   = moving_avg_same(vox_mono, win=int(target_sr*args.attack_ms/1000.0))
-    gain  = sidechain_gain(env, thr_db=args.thr_db, ratio=args.ratio)
-    gain  = moving_avg_same(gain, win=int(target_sr*args.release_ms/1000.0))
-    gain  = gain.clamp(0.05, 1.0)
+    # --- Auto-tune (그리드 탐색 후 1회 렌더) ---
+    if args.autotune and vox is not None and not args.duck_srt:
+        grid = {
+            "thr_db": duck_autotune.parse_grid(args.tune_thr),
+            "ratio": duck_autotune.parse_grid(args.tune_ratio),
+            "attack_ms": duck_autotune.parse_grid(args.tune_attack),
+            "release_ms": duck_autotune.parse_grid(args.tune_release),
+            "mid_max_dip_db": duck_autotune.parse_grid(args.tune_mid_dip),
+        }
+        res = duck_autotune.search(bgm, vox, target_sr, grid, mid_center=args.mid_center, mid_q=args.mid_q,
+                                   target_snr_db=args.tune_target_snr_db)
+        for k, v in res["best"].items():
+            setattr(args, k, v)
+        print(f"[TUNE] {res['n_combos']} combos → {res['best']} (score={res['score']:.3f})")
+        if args.tune_report:
+            Path(args.tune_report).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.tune_report).write_text(json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.duck_srt:
+        # --- Sidechain from SRT (자막 구간 → 게인 커브, 보이스 분석 불필요) ---
+        intervals = load_srt_intervals(args.duck_srt)
+        vox_ref = vox.mean(dim=0).numpy() if (vox is not None and args.srt_refine) else None
+        gain = torch.from_numpy(srt_gain_curve(
+            intervals, target_sr, bgm.size(-1), duck_db=args.srt_duck_db,
+            preroll_s=args.srt_preroll_ms/1000.0, attack_s=args.srt_attack_ms/1000.0,
+            release_s=args.srt_release_ms/1000.0, vox_1d=vox_ref,
+            refine_hop_ms=args.srt_refine_hop_ms, refine_thr_db=args.gate_thr_db))
+        gain_db = 20*torch.log10(gain.clamp_min(1e-6))
+        alpha = (-gain_db / max(args.srt_duck_db, 1e-6)).clamp(0.0, 1.0)                 # 0..1
+    else:
+        # --- Sidechain envelope (attack/release) ---
+        vox_mono = vox.mean(dim=0)
+        env   = moving_avg_same(vox_mono, win=int(target_sr*args.attack_ms/1000.0))
+        gain  = sidechain_gain(env, thr_db=args.thr_db, ratio=args.ratio)
+        gain  = moving_avg_same(gain, win=int(target_sr*args.release_ms/1000.0))
+        gain  = gain.clamp(0.05, 1.0)
+        env_db = 20*torch.log10(env.clamp_min(1e-6))
+        alpha = ((env_db - args.thr_db).clamp_min(0.0) / 20.0).clamp(0.0, 1.0)          # 0..1
     gain_st = gain.view(1,-1).repeat(bgm.size(0), 1)
 
     # --- Align again (safety) ---
-    L2 = min(bgm.size(-1), vox.size(-1), gain_st.size(-1))
-    bgm, vox, gain_st, env = bgm[..., :L2], vox[..., :L2], gain_st[..., :L2], env[..., :L2]
+    L2 = min(bgm.size(-1), gain_st.size(-1)) if vox is None else min(bgm.size(-1), vox.size(-1), gain_st.size(-1))
+    bgm, gain_st, alpha = bgm[..., :L2], gain_st[..., :L2], alpha[..., :L2]
+    if vox is not None: vox = vox[..., :L2]
 
     # 덕킹
     ducked = bgm * gain_st
@@ -102,8 +143,6 @@ def main(args):
     if args.mid_duck_enable and args.mid_max_dip_db > 0.0:
         mid = torchaudio.functional.bandpass_biquad(ducked, target_sr, args.mid_center, Q=args.mid_q)
         rest = ducked - mid
-        env_db = 20*torch.log10(env.clamp_min(1e-6))
-        alpha = ((env_db - args.thr_db).clamp_min(0.0) / 20.0).clamp(0.0, 1.0)          # 0..1
         extra_dip_db = -args.mid_max_dip_db * alpha                                      # 0..-N dB
         extra_gain = db_to_lin(extra_dip_db).view(1,-1)
         if mid.size(0)==2: extra_gain = extra_gain.repeat(2,1)
@@ -111,25 +150,29 @@ def main(args):
         ducked = rest + mid_ducked
 
     # --- Mix ---
-    vox = ensure_stereo(vox, bgm_channels=bgm.size(0))
-    mix = (vox + ducked).clamp(-1, 1)
-
-    # --- Peak margin ---
-    peak = float(mix.abs().max())
-    if peak > 0:
-        mix = mix/peak * db_to_lin(args.peak_dbfs)   # peak_dbfs is negative (e.g., -1)
+    if vox is None:
+        # 보이스 없이 SRT만: 덕킹된 BGM만 저장(bgm_gain 레벨 유지, TTS와 병렬 준비용)
+        mix = ducked.clamp(-1, 1)
+    else:
+        vox = ensure_stereo(vox, bgm_channels=bgm.size(0))
+        mix = (vox + ducked).clamp(-1, 1)
+
+        # --- Peak margin ---
+        peak = float(mix.abs().max())
+        if peak > 0:
+            mix = mix/peak * db_to_lin(args.peak_dbfs)   # peak_dbfs is negative (e.g., -1)
 
     # --- Dither + Save WAV ---
     if args.dither:
         mix = tpdf_dither(mix)
     out = Path(args.out); out.parent.mkdir(parents=True, exist_ok=True)
-    torchaudio.save(str(out), (mix*32767).short().cpu(), sample_rate=target_sr)
+    save_wav(out, (mix*32767).short(), target_sr)
     print(f"[OK] wrote {out}  (len={L2} @ {target_sr} Hz)")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--bgm",   required=True)
-    ap.add_argument("--voice", required=True)
+    ap.add_argument("--voice", default=None, help="내레이션 WAV (--duck_srt 사용 시 생략 가능)")
     ap.add_argument("--out",   required=True)
     # Global
     ap.add_argument("--sr", type=int, default=48000)
@@ -161,5 +204,24 @@ if __name__ == "__main__":
     ap.add_argument("--mid_center",      type=float, default=400.0)
     ap.add_argument("--mid_q",           type=float, default=1.0)
     ap.add_argument("--mid_max_dip_db",  type=float, default=4.0)
+    # SRT-driven duck (자막 타이밍으로 덕킹; 보이스 렌더 전에도 동작)
+    ap.add_argument("--duck_srt",          default=None, help="자막 SRT 경로(지정 시 엔벌로프 대신 자막 구간으로 덕킹)")
+    ap.add_argument("--srt_duck_db",       type=float, default=12.0)
+    ap.add_argument("--srt_preroll_ms",    type=float, default=120.0)
+    ap.add_argument("--srt_attack_ms",     type=float, default=80.0)
+    ap.add_argument("--srt_release_ms",    type=float, default=250.0)
+    ap.add_argument("--srt_refine",        type=int,   default=0, help="1이면 데시메이트 엔벌로프로 자막 내 쉼 구간 덕킹 완화")
+    ap.add_argument("--srt_refine_hop_ms", type=float, default=10.0)
+    # Auto-tune (그리드 탐색; 지정 값들의 모든 조합을 데시메이트 엔벌로프 위에서 평가)
+    ap.add_argument("--autotune",      type=int, default=0, help="1이면 사이드체인 파라미터 자동 탐색 후 최적 조합으로 렌더")
+    ap.add_argument("--tune_thr",      default="-40,-36,-32,-28")
+    ap.add_argument("--tune_ratio",    default="3,4,6,8")
+    ap.add_argument("--tune_attack",   default="20,50,80")
+    ap.add_argument("--tune_release",  default="120,180,300")
+    ap.add_argument("--tune_mid_dip",  default="0,2,4,6")
+    ap.add_argument("--tune_target_snr_db", type=float, default=12.0)
+    ap.add_argument("--tune_report",   default=None, help="탐색 결과 JSON 저장 경로")
     args = ap.parse_args()
+    if not args.voice and not args.duck_srt:
+        ap.error("--voice is required unless --duck_srt is given")
     main(args)
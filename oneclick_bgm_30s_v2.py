@@ -1,15 +1,19 @@
-import os, sys, subprocess, datetime, random, json
+import os, sys, subprocess, datetime, random, json, argparse
 from pathlib import Path
 import torch, torchaudio
-from einops import rearrange
 from huggingface_hub import HfFolder, hf_hub_download
-from stable_audio_tools import get_pretrained_model
-from stable_audio_tools.inference.generation import generate_diffusion_cond
+from src.audio import wavio, band_metrics
+from src.bgm.generator import StableAudioGenerator, DaemonGenerator, draft_then_refine, iter_generate
+from src.bgm import daemon as bgm_daemon
+from src.bgm.library import BgmLibrary, INDEX_PATH, entry_from_summary
 
 # ===== 설정 =====
 SECONDS = 30                   # 정확히 30초 보장
 TARGET_SR = 48000              # 비디오 파이프라인 호환↑
 STEPS = 100
+DRAFT_STEPS = 0                # >0이면 draft→refine: 전 후보를 이 스텝으로 먼저 생성
+TOP_K = 2                      # draft 상위 몇 개를 STEPS로 재생성할지
+BATCH_SIZE = 0                 # 한 번의 샘플링에 묶을 후보 수 (0=가용 메모리로 자동)
 CFG_SCALE = 7
 SAMPLER = "dpmpp-3m-sde"
 FADE_IN = 0.5                  # 초
@@ -59,39 +63,16 @@ def to_int16(audio: torch.Tensor):
     return (audio.clamp(-1, 1) * 32767).to(torch.int16).cpu()
 
 def save_wav(path: Path, audio: torch.Tensor, sr: int):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    torchaudio.save(str(path), audio, sr)
+    # 블록 단위 스트리밍 저장(src/audio/wavio)
+    wavio.save_wav(path, audio, sr)
 
 def band_energy_metrics(audio: torch.Tensor, sr: int):
     """
-    간단 스펙트럼 분석으로 대역별 에너지 비율과 mid_mask_index 산출.
+    대역별 에너지 비율과 mid_mask_index 산출 — 프레임 단위 스트리밍 STFT(src/audio/band_metrics).
     audio: (C, N) [-1,1]
     """
-    mono = audio.mean(dim=0)
-    N = 1
-    L = mono.numel()
-    while N < L: N <<= 1
-    win = torch.hann_window(L, device=mono.device)
-    z = torch.zeros(N, device=mono.device)
-    z[:L] = mono * win
-    spec = torch.fft.rfft(z)
-    mag = spec.abs()
-    freqs = torch.fft.rfftfreq(N, 1.0/sr)
-    total = mag.sum() + 1e-12
-    def band(lo, hi):
-        idx = (freqs >= lo) & (freqs < hi)
-        return float(mag[idx].sum() / total)
-    bands = {
-        "low_20_200": band(20, 200),
-        "lowmid_200_2000": band(200, 2000),
-        "mid_2000_5000": band(2000, 5000),
-        "high_5k_12k": band(5000, 12000),
-        "air_12k_20k": band(12000, min(20000, sr/2)),
-    }
-    centroid = float((freqs * mag).sum() / total)
-    # 말과 충돌 가능성 척도(낮을수록 좋음)
-    mid_mask_index = bands["mid_2000_5000"] + 0.5 * bands["high_5k_12k"]
-    return bands, centroid, float(mid_mask_index)
+    s = band_metrics.analyze(audio, sr).summary()
+    return s["bands"], s["centroid_Hz"], s["mid_mask_index"]
 
 def process_audio(post_audio: torch.Tensor, src_sr: int):
     """
@@ -116,19 +97,6 @@ def process_audio(post_audio: torch.Tensor, src_sr: int):
         sr = src_sr
     return post_audio, sr
 
-def generate_variant(model, cfg, prompt, device, seed=None):
-    if seed is not None:
-        torch.manual_seed(seed)
-        random.seed(seed)
-    cond = [{"prompt": prompt, "seconds_start": 0, "seconds_total": SECONDS}]  # 모델이 고정 길이를 낼 수 있어도 후단에서 트림
-    audio = generate_diffusion_cond(
-        model, steps=STEPS, cfg_scale=CFG_SCALE, conditioning=cond,
-        sample_size=cfg["sample_size"], sigma_min=0.3, sigma_max=500,
-        sampler_type=SAMPLER, device=device
-    )
-    audio = rearrange(audio, "b d n -> d (b n)")   # (C, N)
-    return audio, cfg["sample_rate"]
-
 def mix_with_voice(bgm_path: Path):
     """
     보이스 -14LUFS, BGM HPF/LPF/EQ/볼륨, 보이스를 키로 BGM을 사이드체인 덕킹,
@@ -159,66 +127,142 @@ def mix_with_voice(bgm_path: Path):
     subprocess.run(cmd, check=True)
     return out_path
 
-def main():
-    # 0) Token & gated repo 체크
-    if not HfFolder.get_token():
-        print("ERROR: Hugging Face 토큰 없음. `hf auth login` 후 재시도.", file=sys.stderr)
-        sys.exit(1)
-    try:
-        hf_hub_download("stabilityai/stable-audio-open-1.0", "model_config.json")
-    except Exception:
-        print("ERROR: 모델 접근 권한 필요. 브라우저에서 약관/Access 동의 후 재시도:\n"
-              "https://huggingface.co/stabilityai/stable-audio-open-1.0", file=sys.stderr)
-        sys.exit(1)
-
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"[INFO] device={device}")
-    model, cfg = get_pretrained_model("stabilityai/stable-audio-open-1.0")
-    model = model.to(device)
+def reuse_from_library(lib: BgmLibrary, max_score: float, category=None):
+    """라이브러리에 충분히 좋은 미사용 트랙이 있으면 생성 없이 bgm_best.wav로 내보낸다."""
+    vfp = band_metrics.analyze_file(VOICE_PATH).summary()["fingerprint"] if VOICE_PATH.exists() else None
+    hit = lib.pick(vfp, category, max_score, mark=True, by=str(OUT_ROOT))
+    if hit is None:
+        return None
+    score, entry = hit
+    OUT_ROOT.mkdir(parents=True, exist_ok=True)
+    best_wav = OUT_ROOT / "bgm_best.wav"
+    subprocess.run([FFMPEG, "-y", "-i", entry["path"], "-c:a", "copy", str(best_wav)], check=True)
+    with open(OUT_ROOT / "report.json", "w", encoding="utf-8") as f:
+        json.dump({"reused": entry, "library_score": score, "best": entry}, f, ensure_ascii=False, indent=2)
+    print(f"[OK] 라이브러리 재사용: {entry['path']} (score={score:.4f}) → {best_wav}")
+    return best_wav
+
+def main(args=None, generator=None):
+    steps = getattr(args, "steps", STEPS)
+    draft_steps = getattr(args, "draft_steps", DRAFT_STEPS)
+    top_k = getattr(args, "top_k", TOP_K)
+    batch_size = getattr(args, "batch_size", BATCH_SIZE)
+
+    lib = BgmLibrary(getattr(args, "library", None) or INDEX_PATH)
+    reuse = getattr(args, "reuse", None)
+    if reuse is not None and reuse_from_library(lib, reuse, getattr(args, "category", None)):
+        print(f"[DONE] 출력 폴더: {OUT_ROOT} (diffusion 생략)")
+        return
+
+    sock = getattr(args, "daemon", None)
+    if generator is None and sock:
+        # 상주 서비스에 위임 → 모델 로드/허브 체크 생략
+        if not bgm_daemon.is_alive(sock):
+            print(f"ERROR: BGM 데몬 응답 없음: {sock} (python -m src.bgm.daemon --sock {sock})", file=sys.stderr)
+            sys.exit(1)
+        print(f"[INFO] using bgm daemon: {sock}")
+        generator = DaemonGenerator(sock, seconds=SECONDS)
+
+    if generator is None:
+        # 0) Token & gated repo 체크
+        if not HfFolder.get_token():
+            print("ERROR: Hugging Face 토큰 없음. `hf auth login` 후 재시도.", file=sys.stderr)
+            sys.exit(1)
+        try:
+            hf_hub_download("stabilityai/stable-audio-open-1.0", "model_config.json")
+        except Exception:
+            print("ERROR: 모델 접근 권한 필요. 브라우저에서 약관/Access 동의 후 재시도:\n"
+                  "https://huggingface.co/stabilityai/stable-audio-open-1.0", file=sys.stderr)
+            sys.exit(1)
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"[INFO] device={device}")
+        generator = StableAudioGenerator.load(device=device, seconds=SECONDS, cfg_scale=CFG_SCALE, sampler=SAMPLER)
+
+    batch_size = batch_size or generator.auto_batch_size()
+    print(f"[INFO] batch_size={batch_size}")
 
     OUT_ROOT.mkdir(parents=True, exist_ok=True)
-    report = {"target_sr": TARGET_SR, "seconds": SECONDS, "tracks": []}
+    report = {"target_sr": TARGET_SR, "seconds": SECONDS, "steps": steps, "batch_size": batch_size, "tracks": []}
 
     base_seed = int(datetime.datetime.now().timestamp()) & 0xFFFFFFFF
     torch.manual_seed(base_seed); random.seed(base_seed)
 
-    best_item = None  # (mid_mask_index, path, meta)
+    best_item = None  # (score, path, meta)
 
+    # 보이스가 있으면 프레임별 마스킹으로 고른다(없으면 mid_mask_index)
+    voice_an = band_metrics.analyze_file(VOICE_PATH) if VOICE_PATH.exists() else None
+    report["score_key"] = "masking.mean_voiced" if voice_an is not None else "mid_mask_index"
+
+    def postprocess(raw, sr):
+        post, sr2 = process_audio(raw, sr)
+        # 리미터(피크 보호). torchaudio 기본엔 하드리미터 없으니 레벨 정규화 + alimiter는 믹스 단계에서.
+        # 여기선 -0.1dBFS 근처로 맞춤
+        peak = post.abs().max()
+        if float(peak) > 0:
+            post = post / peak * (10**(-0.1/20))
+        return post, sr2
+
+    def score_of(an):
+        if voice_an is not None:
+            mk = band_metrics.masking_profile(an, voice_an)
+            return mk["mean_voiced"], mk
+        return an.summary()["mid_mask_index"], None
+
+    def finalize(job, raw, sr, batch_info):
+        nonlocal best_item
+        preset_name, seed = job["preset"], job["seed"]
+        post, sr2 = postprocess(raw, sr)
+
+        # 저장 (48kHz int16)
+        wav_path = OUT_ROOT / f"{preset_name}_s{seed}.wav"
+        save_wav(wav_path, to_int16(post), sr2)
+
+        # 분석
+        an = band_metrics.analyze(post, sr2)
+        summ = an.summary()
+        mid_mask_idx = summ["mid_mask_index"]
+        meta = {
+            "preset": preset_name,
+            "seed": seed,
+            "path": str(wav_path),
+            "sr": sr2,
+            "bands": summ["bands"],
+            "centroid_Hz": summ["centroid_Hz"],
+            "mid_mask_index": mid_mask_idx,
+            **batch_info
+        }
+        score, mk = score_of(an)
+        if mk is not None:
+            meta["masking"] = mk
+        report["tracks"].append(meta)
+        lib.add(entry_from_summary(wav_path, summ, preset=preset_name, seed=seed, sr=sr2, seconds=SECONDS))
+
+        # 베스트(말 마스킹 최소) 갱신
+        if (best_item is None) or (score < best_item[0]):
+            best_item = (score, wav_path, meta)
+
+        print(f"  -> saved: {wav_path} | mid_mask_index={mid_mask_idx:.4f} | score={score:.4f}")
+
+    jobs = []
     for preset_name, prompt in PRESETS.items():
         for k in range(N_VARIANTS_PER_PRESET):
             seed = (base_seed + hash(preset_name) + k) & 0xFFFFFFFF
-            print(f"[GEN] {preset_name} #{k+1} (seed={seed})")
-            raw, sr = generate_variant(model, cfg, prompt, device, seed)
-            post, sr2 = process_audio(raw, sr)
-
-            # 리미터(피크 보호). torchaudio 기본엔 하드리미터 없으니 레벨 정규화 + alimiter는 믹스 단계에서.
-            # 여기선 -0.1dBFS 근처로 맞춤
-            peak = post.abs().max()
-            if float(peak) > 0:
-                post = post / peak * (10**(-0.1/20))
-
-            # 저장 (48kHz int16)
-            wav_path = OUT_ROOT / f"{preset_name}_s{seed}.wav"
-            save_wav(wav_path, to_int16(post), sr2)
-
-            # 분석
-            bands, centroid, mid_mask_idx = band_energy_metrics(post, sr2)
-            meta = {
-                "preset": preset_name,
-                "seed": seed,
-                "path": str(wav_path),
-                "sr": sr2,
-                "bands": bands,
-                "centroid_Hz": centroid,
-                "mid_mask_index": mid_mask_idx
-            }
-            report["tracks"].append(meta)
-
-            # 베스트(말 마스킹 최소) 갱신
-            if (best_item is None) or (mid_mask_idx < best_item[0]):
-                best_item = (mid_mask_idx, wav_path, meta)
-
-            print(f"  -> saved: {wav_path} | mid_mask_index={mid_mask_idx:.4f}")
+            jobs.append({"preset": preset_name, "prompt": prompt, "seed": seed, "k": k})
+
+    if draft_steps and draft_steps < steps:
+        # 2단계: 저스텝 초안 전체 → 밴드 지표로 랭킹 → 상위 top_k만 풀스텝 재생성
+        def draft_score(raw, sr):
+            post, sr2 = postprocess(raw, sr)
+            return score_of(band_metrics.analyze(post, sr2))[0]
+        report["draft"] = {"steps": draft_steps, "top_k": top_k,
+                           "candidates": draft_then_refine(generator, jobs, draft_score, draft_steps, steps, top_k,
+                                                           finalize, batch_size=batch_size)}
+    else:
+        print(f"[GEN] {len(jobs)} tracks (steps={steps})")
+        for job, raw, sr, binfo in iter_generate(generator, jobs, steps, batch_size):
+            print(f"[GEN] {job['preset']} #{job['k']+1} (seed={job['seed']})")
+            finalize(job, raw, sr, binfo)
 
     # 베스트 복사
     if best_item:
@@ -229,9 +273,12 @@ def main():
             subprocess.run([FFMPEG, "-y", "-i", str(best_wav), "-c:a", "libmp3lame", "-q:a", "2",
                             str(best_wav.with_suffix(".mp3"))], check=True)
         report["best"] = best_item[2]
-        print(f"[OK] 베스트 트랙: {best_wav} (mid_mask_index={best_item[0]:.4f})")
+        print(f"[OK] 베스트 트랙: {best_wav} ({report['score_key']}={best_item[0]:.4f})")
 
-    # 보고서 저장
+    # 보고서 저장 + 라이브러리 갱신 (베스트는 이번 영상에서 사용됨)
+    if best_item:
+        lib.mark_used(best_item[1], by=str(OUT_ROOT))
+    lib.save()
     with open(OUT_ROOT / "report.json", "w", encoding="utf-8") as f:
         json.dump(report, f, ensure_ascii=False, indent=2)
 
@@ -248,4 +295,15 @@ def main():
     print(f"[DONE] 출력 폴더: {OUT_ROOT}")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--steps", type=int, default=STEPS)
+    ap.add_argument("--draft_steps", type=int, default=DRAFT_STEPS, help=">0이면 전 후보를 저스텝 초안으로 먼저 생성 후 상위만 재생성")
+    ap.add_argument("--top_k", type=int, default=TOP_K)
+    ap.add_argument("--batch_size", type=int, default=BATCH_SIZE, help="배치 샘플링 크기 (0=가용 메모리 기준 자동)")
+    ap.add_argument("--daemon", nargs="?", const=bgm_daemon.DEFAULT_SOCK, default=None,
+                    help="상주 BGM 서비스 소켓 (src/bgm/daemon.py). 지정 시 모델을 직접 로드하지 않음")
+    ap.add_argument("--reuse", type=float, nargs="?", const=0.6, default=None, metavar="MAX_SCORE",
+                    help="BGM 라이브러리에 점수 MAX_SCORE 이하 미사용 트랙이 있으면 생성 생략 (기본 0.6)")
+    ap.add_argument("--category", default=None, help="--reuse 시 프리셋 이름 접두어로 제한")
+    ap.add_argument("--library", default=None, help="라이브러리 인덱스 경로 (기본 assets/bgm_index.json)")
+    main(ap.parse_args())
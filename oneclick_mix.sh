@@ -16,6 +16,10 @@ ALL="${ALL:-0}"
 LUFS14="${LUFS14:-0}"
 VARIANTS="${VARIANTS:-0}"       # 1이면 mild/std/strong 3가지 버전 생성
 MID_DIP="${MID_DIP:-4}"         # 중역 추가 덕킹 최대 dB (기본 4dB)
+AUTOTUNE="${AUTOTUNE:-0}"       # 1이면 파라미터 그리드 탐색 후 최적 1개만 렌더
+SRT="${SRT:-}"                  # 지정 시 자막 타이밍 기반 덕킹(mix_duck_v4 --duck_srt)
+LIBRARY="${LIBRARY:-0}"         # 1이면 BGM 라이브러리에서 보이스에 맞는 미사용 트랙 선택
+CATEGORY="${CATEGORY:-}"        # --library 시 프리셋 접두어 제한
 
 usage() {
   cat <<USG
@@ -24,14 +28,18 @@ Usage: ./oneclick_mix.sh [옵션]
   --voice=PATH   내레이션 오디오(미지정시 영상에서 추출)
   --bgm=PATH     BGM 파일 직접 지정
   --dir=PATH     생성 폴더 지정(미지정시 최신 폴더)
+  --library      BGM 라이브러리(assets/bgm_index.json)에서 보이스 스펙트럼 기준 미사용 트랙 선택
+  --category=STR --library 시 프리셋 이름 접두어 (예: lofi)
   --gain=FLOAT   BGM 게인 (기본 0.15)
   --thr=DB       덕킹 스레시홀드 dB (기본 -32, 강하게 -35)
   --ratio=N      덕킹 레시오 (기본 6, 강하게 8)
   --attack=MS    공격 ms (기본 50)
   --release=MS   릴리즈 ms (기본 180)
   --mid-dip=DB   중역 추가 덕킹 최대 dB (기본 4)
+  --srt=PATH     자막(SRT) 구간으로 덕킹 커브 생성 (엔벌로프 분석 대신)
   --all          폴더 내 모든 트랙 배치 처리
   --variants     mild/std/strong 3개 버전 자동 생성
+  --autotune     thr/ratio/attack/release/mid-dip 자동 탐색 후 최적 믹스 1개만 렌더
   --lufs14       최종 영상 -14 LUFS 정규화
   -h|--help      도움말
 USG
@@ -49,8 +57,12 @@ for arg in "$@"; do
     --attack=*)  ATTACK="${arg#*=}";;
     --release=*) RELEASE="${arg#*=}";;
     --mid-dip=*) MID_DIP="${arg#*=}";;
+    --srt=*)     SRT="${arg#*=}";;
+    --library)   LIBRARY=1;;
+    --category=*) CATEGORY="${arg#*=}";;
     --all)       ALL=1;;
     --variants)  VARIANTS=1;;
+    --autotune)  AUTOTUNE=1;;
     --lufs14)    LUFS14=1;;
     -h|--help)   usage; exit 0;;
     *) echo "[WARN] unknown option: $arg";;
@@ -62,6 +74,13 @@ mkdir -p "$OUTDIR"
 # venv
 if [[ -d .venv310 ]]; then source .venv310/bin/activate || true; fi
 
+# 자막 덕킹 옵션
+SRT_ARGS=()
+if [[ -n "$SRT" ]]; then
+  [[ -f "$SRT" ]] || { echo "[ERR] --srt 파일 없음: $SRT"; exit 1; }
+  SRT_ARGS=(--duck_srt "$SRT")
+fi
+
 # 필요 툴 체크
 [[ -f mix_duck_v4.py ]] || { echo "[ERR] mix_duck_v4.py 없음"; exit 1; }
 command -v ffmpeg >/dev/null || { echo "[ERR] ffmpeg 미설치"; exit 1; }
@@ -91,6 +110,13 @@ select_bgm_from_dir() {
 }
 
 # BGM
+if [[ -z "$BGM" && "$LIBRARY" == "1" ]]; then
+  python -m src.bgm.library scan || true
+  PICK_ARGS=(--voice "$VOICE_WAV" --mark --by "$VIDEO")
+  [[ -n "$CATEGORY" ]] && PICK_ARGS+=(--category "$CATEGORY")
+  BGM="$(python -m src.bgm.library pick "${PICK_ARGS[@]}" || true)"
+  [[ -n "$BGM" ]] || echo "[WARN] 라이브러리에 맞는 트랙 없음 → 최신 생성 폴더 사용"
+fi
 if [[ -z "$BGM" ]]; then
   if [[ -n "$DIR" ]]; then
     [[ -d "$DIR" ]] || { echo "[ERR] --dir 폴더 없음: $DIR"; exit 1; }
@@ -118,7 +144,8 @@ process_one() {
     --bgm "$bgm" --voice "$VOICE_WAV" --out "$mix_wav" \
     --bgm_gain "$GAIN" --thr_db "$THR" --ratio "$RATIO" \
     --attack_ms "$ATTACK" --release_ms "$RELEASE" \
-    --mid_max_dip_db "$MID_DIP"
+    --mid_max_dip_db "$MID_DIP" ${SRT_ARGS[@]+"${SRT_ARGS[@]}"} \
+    --autotune "$AUTOTUNE" --tune_report "$OUTDIR/tune_${stem}.json"
 
   ffmpeg -y -i "$mix_wav" -c:a aac -b:a 192k "$mix_m4a" >/dev/null 2>&1
   ffmpeg -y -i "$VIDEO" -i "$mix_m4a" -map 0:v:0 -map 1:a:0 -c:v copy -c:a aac -b:a 192k -shortest "$out_mp4" >/dev/null 2>&1
@@ -147,7 +174,7 @@ process_variants() {
       --bgm "$bgm" --voice "$OUTDIR/voice_norm.wav" --out "$mix_wav" \
       --bgm_gain "$GAIN" --thr_db "${thrs[$i]}" --ratio "${ratios[$i]}" \
       --attack_ms "$ATTACK" --release_ms "$RELEASE" \
-      --mid_max_dip_db "$MID_DIP"
+      --mid_max_dip_db "$MID_DIP" ${SRT_ARGS[@]+"${SRT_ARGS[@]}"}
     ffmpeg -y -i "$mix_wav" -c:a aac -b:a 192k "$mix_m4a" >/dev/null 2>&1
     ffmpeg -y -i "$VIDEO" -i "$mix_m4a" -map 0:v:0 -map 1:a:0 -c:v copy -c:a aac -b:a 192k -shortest "$out_mp4" >/dev/null 2>&1
     [[ "$LUFS14" == "1" ]] && ffmpeg -y -i "$out_mp4" -filter:a loudnorm=I=-14:TP=-1.5:LRA=9 -c:v copy -c:a aac -b:a 192k "${out_mp4%.mp4}_loudnorm.mp4" >/dev/null 2>&1
@@ -163,10 +190,10 @@ if [[ "$ALL" == "1" ]]; then
   [[ ${#files[@]} -gt 0 ]] || { echo "[ERR] 배치 대상 없음"; exit 1; }
   for f in "${files[@]}"; do
     echo "---- [BGM] $f"
-    [[ "$VARIANTS" == "1" ]] && process_variants "$f" || process_one "$f"
+    [[ "$VARIANTS" == "1" && "$AUTOTUNE" != "1" ]] && process_variants "$f" || process_one "$f"
   done
 else
-  [[ "$VARIANTS" == "1" ]] && process_variants "$BGM" || process_one "$BGM"
+  [[ "$VARIANTS" == "1" && "$AUTOTUNE" != "1" ]] && process_variants "$BGM" || process_one "$BGM"
 fi
 
 echo "[DONE]"
@@ -36,8 +36,14 @@ def mux_av(video_path: str, audio_path: str, out_path: str):
        f'-map 0:v:0 -map 1:a:0 -c:v copy -c:a aac -b:a 192k -ar 48000 -shortest '
        f'-movflags +faststart -colorspace bt709 -color_primaries bt709 -color_trc bt709 "{out_path}"')
 
-def overlay_music(audio_path: str, music_path: str, out_path: str, music_db=-18):
+def overlay_music(audio_path: str, music_path: str, out_path: str, music_db=-18, loop=True):
     vol = 10**(music_db/20)
+    # BGM이 내레이션보다 짧으면 박자 정렬 루프로 연장(duration=shortest에 잘리지 않게)
+    if loop:
+        need, have = probe_duration(audio_path), probe_duration(music_path)
+        if need > 0 and 0 < have < need:
+            from .audio.loop_extend import extend_file
+            music_path = extend_file(music_path, need + 0.5, out_path + ".bgm_loop.wav")
     ff(f'ffmpeg -y -i "{audio_path}" -i "{music_path}" '
        f'-filter_complex "[1:a]volume={vol}[bg];[0:a][bg]amix=inputs=2:duration=shortest:dropout_transition=2" '
        f'-c:a aac -b:a 192k "{out_path}"')
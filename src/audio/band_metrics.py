@@ -0,0 +1,142 @@
+# 스트리밍 STFT 대역 분석 (BGM 후보 스코어링)
+# 트랙 전체를 한 번에 rfft 하지 않고 프레임 단위로 누적 → 메모리는 블록 크기에 비례.
+# band ratio / centroid / mid_mask_index 정의는 oneclick_bgm_30s_v2의 기존 지표와 동일하고,
+# 보이스가 주어지면 프레임별 마스킹(보이스 대역에서 BGM이 차지하는 비율)도 낸다.
+from typing import Dict
+import numpy as np
+
+BANDS = (
+    ("low_20_200", 20, 200),
+    ("lowmid_200_2000", 200, 2000),
+    ("mid_2000_5000", 2000, 5000),
+    ("high_5k_12k", 5000, 12000),
+    ("air_12k_20k", 12000, 20000),
+)
+VOICE_BAND = (300.0, 4000.0)
+FP_EDGES = np.geomspace(60.0, 16000.0, 25)   # 24개 로그 대역 = 스펙트럼 지문
+
+def _as_mono(x) -> np.ndarray:
+    if hasattr(x, "detach"):
+        x = x.detach().cpu().numpy()
+    x = np.asarray(x, dtype=np.float32)
+    return x.mean(axis=0) if x.ndim == 2 else x
+
+class StreamingBandAnalyzer:
+    def __init__(self, sr: int, n_fft=2048, hop=1024, voice_band=VOICE_BAND, keep_frames=True):
+        self.sr, self.n_fft, self.hop = sr, n_fft, hop
+        self.window = np.hanning(n_fft).astype(np.float32)
+        freqs = np.fft.rfftfreq(n_fft, 1.0/sr)
+        self.freqs = freqs.astype(np.float32)
+        self.band_masks = np.stack([(freqs >= lo) & (freqs < min(hi, sr/2)) for _, lo, hi in BANDS])
+        self.voice_mask = (freqs >= voice_band[0]) & (freqs < voice_band[1])
+        self.fp_masks = np.stack([(freqs >= lo) & (freqs < hi) for lo, hi in zip(FP_EDGES[:-1], FP_EDGES[1:])])
+        self.band_sums = np.zeros(len(BANDS))
+        self.fp_sums = np.zeros(len(FP_EDGES) - 1)
+        self.sq_sum, self.n_samples = 0.0, 0
+        self.total = 0.0
+        self.centroid_num = 0.0
+        self.n_frames = 0
+        self.keep_frames = keep_frames
+        self._voice_frames = []     # 프레임별 보이스 대역 magnitude 합
+        self._mmi_frames = []       # 프레임별 mid_mask_index
+        self._buf = np.zeros(0, dtype=np.float32)
+
+    def _process(self, frames: np.ndarray):
+        mag = np.abs(np.fft.rfft(frames * self.window, axis=-1))            # (T, F)
+        per_band = mag @ self.band_masks.T.astype(np.float32)               # (T, 5)
+        tot = mag.sum(axis=1)
+        self.band_sums += per_band.sum(axis=0)
+        self.fp_sums += (mag @ self.fp_masks.T.astype(np.float32)).sum(axis=0)
+        self.total += float(tot.sum())
+        self.centroid_num += float((mag @ self.freqs).sum())
+        self.n_frames += frames.shape[0]
+        if self.keep_frames:
+            self._voice_frames.append(mag[:, self.voice_mask].sum(axis=1))
+            r = per_band / (tot[:, None] + 1e-12)
+            self._mmi_frames.append(r[:, 2] + 0.5 * r[:, 3])
+
+    def feed(self, block):
+        """모노 블록(또는 (C, n))을 이어 붙여 가능한 프레임만 처리, 나머지는 다음 블록으로."""
+        mono = _as_mono(block)
+        self.sq_sum += float(np.dot(mono, mono))
+        self.n_samples += mono.size
+        self._buf = np.concatenate([self._buf, mono])
+        if self._buf.size < self.n_fft:
+            return
+        n = 1 + (self._buf.size - self.n_fft) // self.hop
+        frames = np.lib.stride_tricks.sliding_window_view(self._buf, self.n_fft)[::self.hop][:n]
+        self._process(frames)
+        self._buf = self._buf[n*self.hop:].copy()
+
+    def finish(self):
+        if self._buf.size > self.hop // 2 or self.n_frames == 0:
+            tail = np.zeros(self.n_fft, dtype=np.float32)
+            tail[:min(self._buf.size, self.n_fft)] = self._buf[:self.n_fft]
+            self._process(tail[None, :])
+        self._buf = np.zeros(0, dtype=np.float32)
+        return self
+
+    @property
+    def frame_times(self) -> np.ndarray:
+        return (np.arange(self.n_frames) * self.hop + self.n_fft / 2) / self.sr
+
+    @property
+    def voice_band_frames(self) -> np.ndarray:
+        return np.concatenate(self._voice_frames) if self._voice_frames else np.zeros(0)
+
+    def summary(self) -> Dict:
+        total = self.total + 1e-12
+        bands = {name: float(v / total) for (name, _, _), v in zip(BANDS, self.band_sums)}
+        centroid = float(self.centroid_num / total)
+        # 말과 충돌 가능성 척도(낮을수록 좋음)
+        mid_mask_index = bands["mid_2000_5000"] + 0.5 * bands["high_5k_12k"]
+        out = {"bands": bands, "centroid_Hz": centroid, "mid_mask_index": float(mid_mask_index),
+               "rms_dbfs": float(10*np.log10(self.sq_sum / max(1, self.n_samples) + 1e-12)),
+               "fingerprint": [round(float(v), 5) for v in self.fp_sums / (self.fp_sums.sum() + 1e-12)]}
+        if self.keep_frames and self._mmi_frames:
+            mmi = np.concatenate(self._mmi_frames)
+            out["mid_mask_p90"] = float(np.percentile(mmi, 90))
+        return out
+
+def analyze_stream(blocks, sr: int, **kw) -> StreamingBandAnalyzer:
+    a = StreamingBandAnalyzer(sr, **kw)
+    for b in blocks:
+        a.feed(b)
+    return a.finish()
+
+def analyze(audio, sr: int, block=1 << 16, **kw) -> StreamingBandAnalyzer:
+    """(C, N) 텐서/배열을 block 단위로 흘려 넣는다(전체 FFT 버퍼를 만들지 않음)."""
+    mono = _as_mono(audio)
+    return analyze_stream((mono[s:s + block] for s in range(0, mono.size, block)), sr, **kw)
+
+def masking_profile(bgm: StreamingBandAnalyzer, voice: StreamingBandAnalyzer, active_db=-30.0) -> Dict:
+    """
+    프레임별 마스킹 = 보이스 대역에서 BGM 몫 B/(B+V). 보이스가 있는 프레임(최대 대비 active_db 이내)만 집계.
+    샘플레이트/hop이 달라도 BGM 프레임 시각으로 보이스를 보간해 맞춘다.
+    """
+    t = bgm.frame_times
+    B = bgm.voice_band_frames
+    V = np.interp(t, voice.frame_times, voice.voice_band_frames, left=0.0, right=0.0) if voice.n_frames else np.zeros_like(B)
+    frac = B / (B + V + 1e-12)
+    active = V > (V.max() if V.size else 0.0) * 10**(active_db/20.0)
+    if not active.any():
+        return {"hop_s": bgm.hop / bgm.sr, "voiced_frames": 0, "mean_voiced": 0.0, "p90_voiced": 0.0, "per_frame": []}
+    fa = frac[active]
+    return {
+        "hop_s": bgm.hop / bgm.sr,
+        "voiced_frames": int(active.sum()),
+        "mean_voiced": float(fa.mean()),
+        "p90_voiced": float(np.percentile(fa, 90)),
+        "per_frame": [round(float(v), 4) if a else None for v, a in zip(frac, active)],
+    }
+
+def analyze_file(path, **kw) -> StreamingBandAnalyzer:
+    """PCM WAV면 memmap 블록으로, 아니면 디코딩 후 분석."""
+    from .wavio import open_wav, load_audio
+    try:
+        w = open_wav(path)
+    except ValueError:
+        audio, sr = load_audio(path)
+        return analyze(audio, sr, **kw)
+    with w:
+        return analyze_stream(w.blocks(), w.sr, **kw)
@@ -0,0 +1,102 @@
+# mix_duck_v4 사이드체인 파라미터 자동 탐색
+# (thr_db, ratio, attack, release, mid_max_dip_db) 그리드 전체를
+# 데시메이트된 엔벌로프(hop 단위) 위에서 한 번에 브로드캐스트로 평가하고,
+# 보이스 대역에서 "말 대 BGM" 비율(마스킹 프록시)로 점수를 매긴다.
+import itertools
+from typing import Dict, Sequence
+import torch
+
+def parse_grid(s: str):
+    return [float(x) for x in str(s).split(",") if x.strip()]
+
+def block_abs_mean(x_1d: torch.Tensor, hop: int):
+    """|x|의 hop 블록 평균 — 샘플 단위 moving average의 데시메이트 버전."""
+    n = x_1d.numel() // hop
+    return x_1d[:n*hop].abs().view(n, hop).mean(dim=1)
+
+def box_smooth(x: torch.Tensor, wins: Sequence[int]):
+    """
+    마지막 축에 대해 여러 창 길이의 이동평균을 한 번에 계산(cumsum 기반, same 길이).
+    x: (..., M) → (K, ..., M)
+    """
+    M = x.size(-1)
+    cs = torch.nn.functional.pad(x.cumsum(dim=-1), (1, 0))
+    idx = torch.arange(M)
+    outs = []
+    for w in wins:
+        w = max(1, int(w))
+        lo = (idx - (w - 1)//2).clamp(0, M)
+        hi = (idx + w//2 + 1).clamp(0, M)
+        outs.append((cs[..., hi] - cs[..., lo]) / (hi - lo).to(x.dtype))
+    return torch.stack(outs, dim=0)
+
+def band_power(x_1d: torch.Tensor, sr: int, hop: int, bands, n_fft=1024):
+    """STFT 프레임(hop 정렬)별 대역 파워. 반환: [(M,), ...]"""
+    win = torch.hann_window(n_fft)
+    spec = torch.stft(x_1d, n_fft=n_fft, hop_length=hop, window=win, center=True, return_complex=True)
+    p = spec.abs().pow(2)                       # (F, M+1)
+    freqs = torch.fft.rfftfreq(n_fft, 1.0/sr)
+    return [p[(freqs >= lo) & (freqs < hi)].sum(dim=0) for lo, hi in bands]
+
+def search(bgm: torch.Tensor, vox: torch.Tensor, sr: int, grid: Dict[str, Sequence[float]],
+           mid_center=400.0, mid_q=1.0, hop_ms=5.0, voice_band=(300.0, 4000.0),
+           target_snr_db=12.0, w_duck=0.05, w_pump=0.005, floor_lin=0.05):
+    """
+    bgm, vox: 전처리 끝난 (C, L) 텐서(같은 길이/sr).
+    반환: {"best": {...}, "score": float, "ranking": [...]}
+    """
+    hop = max(1, int(sr*hop_ms/1000.0))
+    vox_m, bgm_m = vox.mean(dim=0), bgm.mean(dim=0)
+
+    # --- 보이스 대역 에너지 (보이스 / BGM 중역 / BGM 나머지) ---
+    bw = mid_center / max(mid_q, 1e-3)
+    mid_lo, mid_hi = max(voice_band[0], mid_center - bw/2), mid_center + bw/2
+    (V,) = band_power(vox_m, sr, hop, [voice_band])
+    B_all, B_mid = band_power(bgm_m, sr, hop, [voice_band, (mid_lo, mid_hi)])
+    B_rest = (B_all - B_mid).clamp_min(0.0)
+
+    env_blk = block_abs_mean(vox_m, hop)
+    M = min(env_blk.numel(), V.numel())
+    env_blk, V, B_mid, B_rest = env_blk[:M], V[:M], B_mid[:M], B_rest[:M]
+    voiced = V > V.max() * 10**(-30/10)        # 최대 대비 -30 dB 이내 프레임 = 말 있음
+    if not bool(voiced.any()):
+        voiced = torch.ones_like(V, dtype=torch.bool)
+
+    thr   = torch.tensor(grid["thr_db"]).view(1, -1, 1, 1, 1, 1)
+    ratio = torch.tensor(grid["ratio"]).view(1, 1, -1, 1, 1, 1)
+    dip   = torch.tensor(grid["mid_max_dip_db"]).view(1, 1, 1, 1, -1, 1)
+    att_w = [max(1, round(a / hop_ms)) for a in grid["attack_ms"]]
+    rel_w = [max(1, round(r / hop_ms)) for r in grid["release_ms"]]
+
+    # (A, M) → dB
+    env = box_smooth(env_blk, att_w).clamp_min(1e-6)
+    env_db = (20*torch.log10(env)).view(len(att_w), 1, 1, 1, 1, M)
+
+    # 사이드체인 게인 (A, T, R, 1, 1, M) → 릴리즈 스무딩 (A, T, R, Rel, 1, M)
+    over = (env_db - thr).clamp_min(0.0)
+    g = 10**(-(over * (1.0 - 1.0/ratio))/20.0)
+    g = box_smooth(g.squeeze(-2).squeeze(-2), rel_w)                  # (Rel, A, T, R, M)
+    g = g.permute(1, 2, 3, 0, 4).unsqueeze(-2).clamp(floor_lin, 1.0)  # (A, T, R, Rel, 1, M)
+
+    # 중역 추가 덕킹 (A, T, 1, 1, D, M)
+    alpha = ((env_db - thr).clamp_min(0.0) / 20.0).clamp(0.0, 1.0)
+    m = 10**((-dip * alpha)/20.0)
+
+    E = g.pow(2) * (B_rest + B_mid * m.pow(2)) + 1e-12             # 덕킹 후 BGM 보이스대역 에너지
+    snr_db = 10*torch.log10((V + 1e-12) / E)
+    mask_pen = (target_snr_db - snr_db).clamp_min(0.0)[..., voiced].mean(dim=-1)
+    g_db = -20*torch.log10(g)
+    duck = g_db.mean(dim=-1)                                        # BGM을 얼마나 눌렀나
+    pump = (g_db[..., 1:] - g_db[..., :-1]).abs().sum(dim=-1) / max(1.0, (M*hop/sr))  # dB/s
+    score = mask_pen + w_duck * duck + w_pump * pump
+
+    keys = ["attack_ms", "thr_db", "ratio", "release_ms", "mid_max_dip_db"]
+    shape = (len(grid["attack_ms"]), len(grid["thr_db"]), len(grid["ratio"]),
+             len(grid["release_ms"]), len(grid["mid_max_dip_db"]))
+    score = score.expand(*shape).reshape(-1)
+    order = torch.argsort(score)
+    combos = list(itertools.product(grid["attack_ms"], grid["thr_db"], grid["ratio"],
+                                    grid["release_ms"], grid["mid_max_dip_db"]))
+    ranking = [dict(zip(keys, combos[int(i)]), score=float(score[i])) for i in order[:10]]
+    best = dict(zip(keys, combos[int(order[0])]))
+    return {"best": best, "score": float(score[order[0]]), "n_combos": len(combos), "ranking": ranking}
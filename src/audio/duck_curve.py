@@ -0,0 +1,86 @@
+# 자막(SRT) 구간 → BGM 덕킹 게인 커브
+# 커브 자체는 자막 개수만큼의 브레이크포인트(O(자막 수))로 만들고,
+# 샘플 단위 게인은 마지막에 np.interp 한 번으로 펼친다.
+import re
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+
+TIME_RE = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)")
+
+def load_srt_intervals(path) -> List[Tuple[float, float]]:
+    """SRT에서 (start, end) 초 단위 구간만 뽑는다. 텍스트는 보지 않음."""
+    txt = Path(path).read_text(encoding="utf-8", errors="ignore")
+    out = []
+    for m in TIME_RE.finditer(txt):
+        h1,m1,s1,ms1,h2,m2,s2,ms2 = map(int, m.groups())
+        st = h1*3600 + m1*60 + s1 + ms1/1000.0
+        ed = h2*3600 + m2*60 + s2 + ms2/1000.0
+        if ed > st:
+            out.append((st, ed))
+    return sorted(out)
+
+def merge_intervals(intervals, min_gap: float):
+    """min_gap보다 짧은 틈은 이어 붙임(덕킹이 자막 사이에서 출렁이지 않게)."""
+    merged = []
+    for st, ed in intervals:
+        if merged and st - merged[-1][1] < min_gap:
+            merged[-1][1] = max(merged[-1][1], ed)
+        else:
+            merged.append([st, ed])
+    return [(a, b) for a, b in merged]
+
+def srt_breakpoints(intervals, duck_db=12.0, preroll_s=0.12, attack_s=0.08, release_s=0.25):
+    """
+    구간마다 4개 점: 램프 시작(0 dB) → 프리롤 지점(-duck_db) → 자막 끝(-duck_db) → 릴리즈 끝(0 dB).
+    반환: (times[s], gains[dB]) — 단조 증가 times.
+    """
+    lead = preroll_s + attack_s
+    merged = merge_intervals(intervals, min_gap=lead + release_s)
+    times, gains = [], []
+    for st, ed in merged:
+        t1 = st - preroll_s
+        times += [t1 - attack_s, t1, max(ed, t1 + 1e-4), max(ed, t1 + 1e-4) + max(release_s, 1e-4)]
+        gains += [0.0, -duck_db, -duck_db, 0.0]
+    return np.asarray(times, dtype=np.float64), np.asarray(gains, dtype=np.float64)
+
+def block_envelope_db(x_1d: np.ndarray, sr: int, hop_ms=10.0):
+    """hop 단위 RMS(dB) — 샘플마다가 아니라 블록마다 한 값(데시메이트)."""
+    hop = max(1, int(sr*hop_ms/1000.0))
+    n = len(x_1d) // hop
+    if n == 0:
+        return np.zeros(0), hop
+    blk = np.asarray(x_1d[:n*hop], dtype=np.float32).reshape(n, hop)
+    rms = np.sqrt(np.mean(blk*blk, axis=1) + 1e-12)
+    return 20*np.log10(np.maximum(rms, 1e-6)), hop
+
+def refine_with_envelope(times, gains, vox_1d, sr, hop_ms=10.0, thr_db=-40.0, relax=0.5, smooth_ms=120.0):
+    """
+    자막 안이라도 실제로 말이 끊긴 구간은 덕킹 깊이를 relax 배까지 풀어준다.
+    데시메이트된 엔벌로프 위에서만 계산 → 반환도 블록 해상도의 (times, gains).
+    """
+    env_db, hop = block_envelope_db(vox_1d, sr, hop_ms)
+    if env_db.size == 0:
+        return times, gains
+    t_blk = (np.arange(env_db.size) + 0.5) * hop / sr
+    curve = np.interp(t_blk, times, gains, left=0.0, right=0.0)
+    presence = np.clip((env_db - thr_db) / 6.0, 0.0, 1.0)
+    win = max(1, int(round(smooth_ms / hop_ms)))
+    if win > 1:
+        presence = np.convolve(presence, np.ones(win)/win, mode="same")
+    scale = relax + (1.0 - relax) * presence
+    return t_blk, curve * scale
+
+def render_gain(times, gains_db, sr: int, n: int) -> np.ndarray:
+    """브레이크포인트 → 샘플 단위 선형 게인 (float32, 길이 n)."""
+    t = np.arange(n, dtype=np.float64) / sr
+    g_db = np.interp(t, times, gains_db, left=0.0, right=0.0) if len(times) else np.zeros(n)
+    return (10.0 ** (g_db / 20.0)).astype(np.float32)
+
+def srt_gain_curve(intervals, sr: int, n: int, duck_db=12.0, preroll_s=0.12, attack_s=0.08,
+                   release_s=0.25, vox_1d=None, refine_hop_ms=10.0, refine_thr_db=-40.0):
+    times, gains = srt_breakpoints(intervals, duck_db, preroll_s, attack_s, release_s)
+    if vox_1d is not None and len(times):
+        times, gains = refine_with_envelope(times, gains, vox_1d, sr, hop_ms=refine_hop_ms,
+                                            thr_db=refine_thr_db, smooth_ms=(attack_s + release_s)*1000.0)
+    return render_gain(times, gains, sr, n)
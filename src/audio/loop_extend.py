@@ -0,0 +1,184 @@
+# 박자 정렬 루프 연장
+# 30초 BGM을 재생성 없이 임의 길이로 늘린다.
+#   1) 스펙트럴 플럭스 온셋 → 자기상관으로 템포, 비트 그리드 위상 추정
+#   2) 마디(4비트) 경계 쌍 중 스펙트럼/레벨 불연속이 가장 작은 (start, end) 선택
+#   3) [0:end] + ([start:end] 반복) + [start:] 로 이어 붙이고 이음새는 등전력 크로스페이드
+# 루프 포인트는 트랙 옆 <name>.loop.json 에 캐시(파일 크기/mtime 일치 시 재사용).
+#
+#   python -m src.audio.loop_extend assets/bgm_30s/.../bgm_best.wav --secs 70 --out bgm_70s.wav
+import json, argparse
+from pathlib import Path
+import numpy as np
+from .wavio import load_audio, save_wav
+
+N_FFT = 2048
+HOP = 512
+BPM_RANGE = (70.0, 180.0)
+BEATS_PER_BAR = 4
+XFADE_MS = 40
+EDGE_S = (1.0, 1.5)        # 페이드 인/아웃 구간은 루프 후보에서 제외
+MIN_LOOP_BARS = 2
+
+def _mono(audio):
+    a = np.asarray(audio, dtype=np.float32)
+    return a.mean(axis=0) if a.ndim == 2 else a
+
+def _frames(x, n_fft=N_FFT, hop=HOP):
+    n = 1 + max(0, len(x) - n_fft) // hop
+    idx = np.arange(n_fft)[None, :] + hop * np.arange(n)[:, None]
+    return x[idx] * np.hanning(n_fft).astype(np.float32)
+
+def log_spec(x, n_fft=N_FFT, hop=HOP):
+    """(frames, bins) 로그 크기 스펙트럼."""
+    return np.log1p(np.abs(np.fft.rfft(_frames(x, n_fft, hop), axis=1)).astype(np.float32))
+
+def onset_envelope(S):
+    flux = np.maximum(0.0, np.diff(S, axis=0)).sum(axis=1)
+    flux = np.concatenate([[0.0], flux])
+    flux -= np.convolve(flux, np.ones(16) / 16, mode="same")   # 느린 추세 제거
+    return np.maximum(flux, 0.0)
+
+def estimate_tempo(env, sr, hop=HOP, bpm_range=BPM_RANGE, n_fft=N_FFT):
+    """온셋 자기상관 피크 → (bpm, 마디 시작 위상 s)."""
+    fps = sr / hop
+    e = env - env.mean()
+    ac = np.fft.irfft(np.abs(np.fft.rfft(e, 2 * len(e))) ** 2)[:len(e)]
+    lags = np.arange(len(ac))
+    lo, hi = int(fps * 60 / bpm_range[1]), int(fps * 60 / bpm_range[0]) + 1
+    hi = min(hi, len(ac) - 1)
+    if hi <= lo:
+        return 120.0, 0.0
+    # 지각 템포 가중(120BPM 중심 로그 가우시안)으로 배수/약수 혼동 완화
+    bpm = 60 * fps / np.maximum(lags[lo:hi], 1)
+    w = np.exp(-0.5 * (np.log2(bpm / 120.0) / 0.9) ** 2)
+    lag = lo + int(np.argmax(ac[lo:hi] * w))
+    # 포물선 보간으로 소수 lag (정수 lag만 쓰면 30초 동안 위상이 밀린다)
+    if 0 < lag < len(ac) - 1:
+        a, b, c = ac[lag - 1], ac[lag], ac[lag + 1]
+        den = a - 2 * b + c
+        lag = lag + (0.5 * (a - c) / den if den < 0 else 0.0)
+    # 위상: 마디 그리드 위 온셋 합이 최대인 오프셋(강박이 다운비트로 잡힘)
+    bar = lag * BEATS_PER_BAR
+    grid = np.round(bar * np.arange(int(len(env) / bar) + 1)).astype(int)
+    phase_sum = np.array([env[(p + grid)[p + grid < len(env)]].sum() for p in range(min(int(bar), len(env)))])
+    phase = int(np.argmax(phase_sum))
+    return 60 * fps / lag, (phase * hop + n_fft / 2) / sr     # 프레임 중심 시각
+
+def find_loop(audio, sr, min_bars=MIN_LOOP_BARS, edge_s=EDGE_S):
+    """마디 경계 기준 최적 루프 (start_s, end_s)와 분석값."""
+    x = _mono(audio)
+    if len(x) < N_FFT + 16 * HOP:
+        # 온셋 추세 제거(16프레임)에 못 미치는 짧은 트랙 → 전체를 루프(extend가 타일/패딩으로 처리)
+        return {"bpm": None, "beat_phase_s": 0.0, "bar_s": None, "loop_start_s": 0.0,
+                "loop_end_s": round(len(x) / sr, 4), "cost": None}
+    S = log_spec(x)
+    env = onset_envelope(S)
+    bpm, phase_s = estimate_tempo(env, sr)   # phase_s = 첫 다운비트
+    bar_s = 60.0 / bpm * BEATS_PER_BAR
+    dur = len(x) / sr
+    bars = phase_s + bar_s * np.arange(int((dur - phase_s) / bar_s) + 1)
+    bars = bars[(bars >= edge_s[0]) & (bars <= dur - edge_s[1])]
+    info = {"bpm": round(float(bpm), 2), "beat_phase_s": round(float(phase_s), 4), "bar_s": round(float(bar_s), 4)}
+    if len(bars) < min_bars + 1:
+        # 마디가 부족하면 페이드 구간만 뺀 전체를 루프
+        return dict(info, loop_start_s=edge_s[0], loop_end_s=max(edge_s[0] + 0.5, dur - edge_s[1]), cost=None)
+
+    # 경계 근처 프레임(±2) 스펙트럼 + 레벨로 불연속 비용 행렬
+    fi = np.clip(np.round((bars * sr - N_FFT / 2) / HOP).astype(int), 2, len(S) - 3)
+    ctx = np.stack([S[fi + d] for d in (-2, -1, 0, 1, 2)], axis=1).reshape(len(fi), -1)
+    ctx /= np.linalg.norm(ctx, axis=1, keepdims=True) + 1e-9
+    spec_cost = 1.0 - ctx @ ctx.T
+    rms = np.log1p(np.sqrt((S[fi] ** 2).mean(axis=1)))
+    cost = spec_cost + 0.5 * np.abs(rms[:, None] - rms[None, :])
+    i, j = np.meshgrid(np.arange(len(bars)), np.arange(len(bars)), indexing="ij")
+    valid = (j - i) >= min_bars
+    # 긴 루프 선호(반복이 덜 티 남)
+    cost = np.where(valid, cost - 0.002 * (j - i), np.inf)
+    s, e = np.unravel_index(np.argmin(cost), cost.shape)
+    return dict(info, loop_start_s=round(float(bars[s]), 4), loop_end_s=round(float(bars[e]), 4),
+                cost=round(float(cost[s, e]), 5))
+
+def _cache_path(path):
+    p = Path(path)
+    return p.with_name(p.stem + ".loop.json")
+
+def loop_points(path, audio=None, sr=None):
+    """캐시된 루프 포인트(없으면 분석 후 저장)."""
+    path = Path(path)
+    st = path.stat()
+    key = {"size": st.st_size, "mtime": int(st.st_mtime)}
+    cp = _cache_path(path)
+    if cp.exists():
+        try:
+            with open(cp, encoding="utf-8") as f:
+                c = json.load(f)
+            if c.get("key") == key:
+                return c
+        except (OSError, ValueError):
+            pass
+    if audio is None:
+        audio, sr = load_audio(path)
+    c = dict(find_loop(audio, sr), key=key, sr=sr)
+    try:
+        with open(cp, "w", encoding="utf-8") as f:
+            json.dump(c, f, indent=2)
+    except OSError:
+        pass
+    return c
+
+def _xfade(a, b):
+    t = np.linspace(0.0, np.pi / 2, a.shape[-1], dtype=np.float32)
+    return a * np.cos(t) + b * np.sin(t)
+
+def extend(audio, sr, target_s, start_s, end_s, xfade_ms=XFADE_MS, fade_out_s=1.0):
+    """(C, N) → (C, target) : [0:end] + 반복[start:end] + [start:], 넘치면 자르고 페이드아웃."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim == 1:
+        audio = audio[None]
+    n, target = audio.shape[-1], int(round(target_s * sr))
+    if target <= n:
+        return audio[:, :target]
+    ls = min(max(int(start_s * sr), 0), n)
+    le = min(max(int(end_s * sr), ls), n)
+    x = max(1, int(xfade_ms * sr / 1000))
+    if le - ls < 2 * x or n - le < x:
+        # 루프가 크로스페이드보다 짧거나 끝 뒤에 이을 샘플이 없음 → 트랙 전체를 타일, 그것도 안 되면 무음 패딩
+        x = max(1, min(x, n // 3))
+        ls, le = 0, n - x
+        if le - ls < 2 * x:
+            return np.pad(audio, ((0, 0), (0, target - n)))
+    body = np.concatenate([_xfade(audio[:, le:le + x], audio[:, ls:ls + x]), audio[:, ls + x:le]], axis=1)
+    k = int(np.ceil((target - n) / (le - ls)))
+    out = np.concatenate([audio[:, :le]] + [body] * (k - 1) +
+                         [_xfade(audio[:, le:le + x], audio[:, ls:ls + x]), audio[:, ls + x:]], axis=1)
+    # [0:le] + (k-1)×[ls:le] + [ls:] → 길이 n + k*(le-ls) ≥ target
+    out = out[:, :target]
+    fo = min(int(fade_out_s * sr), target)
+    if fo > 0 and out.shape[-1] > n:
+        out[:, -fo:] *= np.linspace(1.0, 0.0, fo, dtype=np.float32)
+    return out
+
+def extend_file(path, target_s, out_path=None, xfade_ms=XFADE_MS):
+    """트랙을 target_s 길이로 연장해 저장. 이미 길면 원본 경로를 그대로 돌려준다."""
+    audio, sr = load_audio(path)
+    if audio.shape[-1] >= target_s * sr:
+        return str(path)
+    lp = loop_points(path, audio, sr)
+    out = extend(audio, sr, target_s, lp["loop_start_s"], lp["loop_end_s"], xfade_ms)
+    out_path = out_path or str(Path(path).with_name(f"{Path(path).stem}_{int(round(target_s))}s.wav"))
+    save_wav(out_path, out, sr)
+    return out_path
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--secs", type=float, required=True)
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--xfade_ms", type=float, default=XFADE_MS)
+    args = ap.parse_args()
+    lp = loop_points(args.path)
+    print(json.dumps({k: v for k, v in lp.items() if k != "key"}, ensure_ascii=False))
+    print(extend_file(args.path, args.secs, args.out, args.xfade_ms))
+
+if __name__ == "__main__":
+    main()
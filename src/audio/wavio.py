@@ -0,0 +1,164 @@
+# PCM WAV 메모리맵 I/O
+# - 읽기: RIFF 청크만 파싱하고 data 영역을 numpy.memmap으로 연다(디코딩/복사 없음).
+#   채널 뷰는 strided view라 zero-copy, float 변환은 요청한 구간만 한다.
+#   같은 파일을 여러 프로세스가 열면 페이지 캐시를 그대로 공유.
+# - 쓰기: 헤더를 먼저 쓰고 블록 단위로 스트리밍, close 때 크기 필드만 패치.
+# - PCM/float WAV가 아니면(mp3, 24-bit 등) 디코더(torchaudio → pydub)로 폴백.
+import struct
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+_PCM, _FLOAT, _EXT = 0x0001, 0x0003, 0xFFFE
+_DTYPES = {(_PCM, 8): np.uint8, (_PCM, 16): np.int16, (_PCM, 32): np.int32,
+           (_FLOAT, 32): np.float32, (_FLOAT, 64): np.float64}
+
+class WavFile:
+    def __init__(self, path, sr: int, channels: int, dtype, offset: int, frames: int, mode="r"):
+        self.path, self.sr, self.channels, self.dtype = str(path), sr, channels, np.dtype(dtype)
+        self.frames = frames
+        # (frames, channels) 인터리브 그대로
+        self.data = np.memmap(self.path, dtype=self.dtype, mode=mode, offset=offset, shape=(frames, channels))
+
+    @property
+    def seconds(self) -> float:
+        return self.frames / float(self.sr)
+
+    def channel(self, i: int) -> np.ndarray:
+        """i번째 채널의 zero-copy 뷰(원래 dtype)."""
+        return self.data[:, i]
+
+    def _scale(self, x: np.ndarray) -> np.ndarray:
+        if self.dtype == np.uint8:
+            return (x.astype(np.float32) - 128.0) / 128.0
+        if self.dtype.kind == "i":
+            return x.astype(np.float32) / float(-np.iinfo(self.dtype).min)
+        return x.astype(np.float32, copy=False)
+
+    def to_float(self, start=0, stop=None) -> np.ndarray:
+        """[start, stop) 프레임만 (C, n) float32로 변환."""
+        return self._scale(self.data[start:stop]).T
+
+    def mono(self, start=0, stop=None) -> np.ndarray:
+        return self.to_float(start, stop).mean(axis=0)
+
+    def blocks(self, block=1 << 16) -> Iterator[np.ndarray]:
+        """(C, n) float32 블록 스트림 — 파일 전체를 올리지 않고 분석할 때."""
+        for s in range(0, self.frames, block):
+            yield self.to_float(s, min(self.frames, s + block))
+
+    def close(self):
+        # memmap 참조만 놓음 — 밖에 남은 뷰가 있으면 그 뷰가 사라질 때 unmap
+        self.data = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def _parse_header(f) -> Tuple[int, int, int, int, int, int]:
+    riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+    if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+    fmt = None
+    while True:
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            raise ValueError("no data chunk")
+        cid, size = struct.unpack("<4sI", hdr)
+        if cid == b"fmt ":
+            body = f.read(size + (size & 1))
+            tag, ch, sr, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if tag == _EXT and len(body) >= 26:
+                tag = struct.unpack("<H", body[24:26])[0]  # SubFormat GUID 앞 2바이트
+            fmt = (tag, ch, sr, bits)
+        elif cid == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            return (*fmt, f.tell(), size)
+        else:
+            f.seek(size + (size & 1), 1)
+
+def open_wav(path) -> WavFile:
+    """PCM/float WAV를 memmap으로 연다. 지원 안 되는 포맷이면 ValueError."""
+    with open(path, "rb") as f:
+        tag, ch, sr, bits, offset, size = _parse_header(f)
+    dtype = _DTYPES.get((tag, bits))
+    if dtype is None:
+        raise ValueError(f"unsupported WAV format tag={tag} bits={bits}")
+    fsize = Path(path).stat().st_size
+    size = min(size, fsize - offset)  # 스트리밍 중 끊긴 파일/0xFFFFFFFF 크기 대비
+    frames = size // (np.dtype(dtype).itemsize * ch)
+    return WavFile(path, sr, ch, dtype, offset, frames)
+
+def _decode_fallback(path) -> Tuple[np.ndarray, int]:
+    try:
+        import torchaudio
+        x, sr = torchaudio.load(str(path))
+        return x.float().numpy(), sr
+    except ImportError:
+        from pydub import AudioSegment
+        seg = AudioSegment.from_file(str(path))
+        a = np.array(seg.get_array_of_samples()).reshape(-1, seg.channels).T
+        return a.astype(np.float32) / float(1 << (8*seg.sample_width - 1)), seg.frame_rate
+
+def load_audio(path) -> Tuple[np.ndarray, int]:
+    """(C, N) float32, sr. PCM WAV는 memmap에서 변환, 그 외는 디코더."""
+    try:
+        w = open_wav(path)
+    except (ValueError, struct.error):
+        return _decode_fallback(path)
+    with w:
+        return np.array(w.to_float(), copy=True), w.sr   # float32 mono는 memmap 뷰라 복사 필수
+
+class WavWriter:
+    """블록 단위 스트리밍 WAV 쓰기. write()는 (C, n) float[-1,1] 또는 int16."""
+    def __init__(self, path, sr: int, channels: int, sampwidth=2):
+        if sampwidth not in (2, 4):
+            raise ValueError("sampwidth must be 2 (int16) or 4 (float32)")
+        self.path, self.sr, self.channels, self.sampwidth = Path(path), sr, channels, sampwidth
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.path, "wb")
+        self.nbytes = 0
+        self._write_header()
+
+    def _write_header(self):
+        tag = _PCM if self.sampwidth == 2 else _FLOAT
+        ba = self.channels * self.sampwidth
+        self.f.write(struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + self.nbytes, b"WAVE",
+                                 b"fmt ", 16, tag, self.channels, self.sr, self.sr*ba, ba,
+                                 8*self.sampwidth, b"data", self.nbytes))
+
+    def write(self, block):
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[None, :]
+        if self.sampwidth == 2:
+            if block.dtype != np.int16:
+                block = (np.clip(block, -1.0, 1.0) * 32767.0).astype(np.int16)
+        else:
+            block = block.astype(np.float32, copy=False)
+        buf = np.ascontiguousarray(block.T).tobytes()
+        self.f.write(buf)
+        self.nbytes += len(buf)
+
+    def close(self):
+        if self.f is None:
+            return
+        self.f.seek(0)
+        self._write_header()
+        self.f.close()
+        self.f = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def save_wav(path, audio, sr: int, sampwidth=2, block=1 << 16):
+    """(C, N) 배열(numpy 또는 torch)을 block 프레임씩 스트리밍 저장."""
+    if hasattr(audio, "detach"):
+        audio = audio.detach().cpu().numpy()
+    audio = np.asarray(audio)
+    if audio.ndim == 1:
+        audio = audio[None, :]
+    with WavWriter(path, sr, audio.shape[0], sampwidth) as w:
+        for s in range(0, audio.shape[-1], block):
+            w.write(audio[:, s:s + block])
+    return Path(path)
@@ -0,0 +1,107 @@
+# 상주 BGM 생성 서비스
+# 모델을 한 번만 로드해 두고 로컬 유닉스 소켓으로 작업(JSON 한 줄)을 받는다.
+#   요청: {"prompt": ..., "seed": 123, "seconds": 30, "steps": 100, "out": "path.wav"(선택)}
+#   응답: {"ok": true, "path": ..., "sr": ..., "seconds": ..., "metrics": {...}}
+# HF 허브 확인 없이 로컬 캐시만 사용(HF_HUB_OFFLINE=1).
+#
+#   python -m src.bgm.daemon --sock /tmp/yt_bgm.sock
+import os, sys, json, time, socket, socketserver, threading, tempfile, argparse
+from pathlib import Path
+from ..audio import wavio, band_metrics
+
+DEFAULT_SOCK = os.environ.get("BGM_DAEMON_SOCK", "/tmp/yt_bgm.sock")
+
+def _handle(gen, lock, req, out_dir: Path):
+    if req.get("cmd") == "ping":
+        return {"ok": True, "pid": os.getpid()}
+    prompt, seed = req["prompt"], int(req.get("seed", 0))
+    steps = int(req.get("steps", 100))
+    seconds = float(req.get("seconds", getattr(gen, "seconds", 30)))
+    out = Path(req.get("out") or out_dir / f"bgm_s{seed}_{int(time.time()*1000)}.wav")
+    t0 = time.time()
+    with lock:   # 모델은 하나 → 생성은 직렬
+        prev = getattr(gen, "seconds", None)
+        gen.seconds = seconds
+        try:
+            audio, sr = gen.generate(prompt, seed, steps)
+        finally:
+            gen.seconds = prev
+    audio = audio[..., :int(seconds * sr)].float().cpu()
+    peak = float(audio.abs().max())
+    if peak > 0:
+        audio = audio / peak
+    wavio.save_wav(out, audio, sr, sampwidth=4)     # float32 그대로(후처리는 클라이언트)
+    return {"ok": True, "path": str(out), "sr": sr, "seconds": seconds, "seed": seed, "steps": steps,
+            "gen_s": round(time.time() - t0, 2), "metrics": band_metrics.analyze(audio, sr).summary()}
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                res = _handle(self.server.gen, self.server.lock, json.loads(line), self.server.out_dir)
+            except Exception as e:
+                res = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(res, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+class BgmDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, sock_path, gen, out_dir):
+        if os.path.exists(sock_path):
+            os.unlink(sock_path)
+        super().__init__(sock_path, _Handler)
+        self.gen, self.lock, self.out_dir = gen, threading.Lock(), Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+def request(job: dict, sock_path=DEFAULT_SOCK, timeout=None) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(sock_path)
+        s.sendall((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    res = json.loads(buf.decode("utf-8"))
+    if not res.get("ok"):
+        raise RuntimeError(f"bgm daemon: {res.get('error')}")
+    return res
+
+def is_alive(sock_path=DEFAULT_SOCK) -> bool:
+    if not os.path.exists(sock_path):
+        return False
+    try:
+        return bool(request({"cmd": "ping"}, sock_path, timeout=2.0).get("ok"))
+    except (OSError, ValueError, RuntimeError):
+        return False
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sock", default=DEFAULT_SOCK)
+    ap.add_argument("--out_dir", default=str(Path(tempfile.gettempdir()) / "yt_bgm_daemon"))
+    ap.add_argument("--online", action="store_true", help="허브 접근 허용(기본: 로컬 HF 캐시만)")
+    args = ap.parse_args()
+    if not args.online:
+        os.environ["HF_HUB_OFFLINE"] = "1"   # huggingface_hub import 전에 설정해야 함
+    import torch
+    from .generator import StableAudioGenerator
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    t0 = time.time()
+    gen = StableAudioGenerator.load(device=device)
+    print(f"[bgm-daemon] model loaded on {device} in {time.time()-t0:.1f}s → {args.sock}", file=sys.stderr)
+    with BgmDaemon(args.sock, gen, args.out_dir) as srv:
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(args.sock):
+                os.unlink(args.sock)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# BGM 생성기 인터페이스 + draft→refine 후보 선별
+# oneclick_bgm_30s_v2.py가 사용. stable-audio 대신 작은 스텁 모델을 끼울 수 있게
+# "generate(prompt, seed, steps) -> (audio(C,N), sr)" 하나만 요구한다.
+# generate_batch는 여러 conditioning(프리셋/시드)을 한 번의 샘플링 호출로 묶는다.
+import os, random, tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import torch
+
+MODEL_NAME = "stabilityai/stable-audio-open-1.0"
+
+BATCH_ITEM_MB = 3000      # 배치 1개당 대략적 피크 메모리(stable-audio-open 30초, fp32 기준)
+MAX_BATCH = 8
+
+class BgmGenerator:
+    def generate(self, prompt: str, seed: int, steps: int) -> Tuple[torch.Tensor, int]:
+        raise NotImplementedError
+
+    def generate_batch(self, jobs: List[Dict], steps: int) -> List[Tuple[torch.Tensor, int]]:
+        """기본 구현은 순차 생성. 배치 샘플링이 가능한 생성기는 오버라이드."""
+        return [self.generate(j["prompt"], j["seed"], steps) for j in jobs]
+
+    def auto_batch_size(self) -> int:
+        return 1
+
+def free_memory_mb(device: str) -> float:
+    if str(device).startswith("cuda") and torch.cuda.is_available():
+        return torch.cuda.mem_get_info()[0] / 2**20
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (ValueError, OSError, AttributeError):
+        return BATCH_ITEM_MB
+
+class StableAudioGenerator(BgmGenerator):
+    def __init__(self, model, cfg: Dict, device: str, seconds=30, cfg_scale=7, sampler="dpmpp-3m-sde"):
+        self.model, self.cfg, self.device = model, cfg, device
+        self.seconds, self.cfg_scale, self.sampler = seconds, cfg_scale, sampler
+
+    @classmethod
+    def load(cls, name=MODEL_NAME, device=None, **kw):
+        from stable_audio_tools import get_pretrained_model
+        device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        model, cfg = get_pretrained_model(name)
+        return cls(model.to(device), cfg, device, **kw)
+
+    def generate(self, prompt, seed, steps):
+        from einops import rearrange
+        from stable_audio_tools.inference.generation import generate_diffusion_cond
+        torch.manual_seed(seed); random.seed(seed)
+        cond = [{"prompt": prompt, "seconds_start": 0, "seconds_total": self.seconds}]  # 모델이 고정 길이를 낼 수 있어도 후단에서 트림
+        # seed를 샘플러에 넘겨야 같은 시드 = 같은 초기 노이즈(draft/refine 대응)
+        audio = generate_diffusion_cond(
+            self.model, steps=steps, cfg_scale=self.cfg_scale, conditioning=cond,
+            sample_size=self.cfg["sample_size"], sigma_min=0.3, sigma_max=500,
+            sampler_type=self.sampler, seed=seed, device=self.device
+        )
+        audio = rearrange(audio, "b d n -> d (b n)")   # (C, N)
+        return audio, self.cfg["sample_rate"]
+
+    def generate_batch(self, jobs, steps):
+        """
+        jobs의 conditioning을 batch_size=len(jobs)로 한 번에 샘플링 후 트랙별로 분리.
+        generate_diffusion_cond는 seed 하나로 배치 전체 노이즈를 뽑으므로 쓰지 않고, job마다
+        generate()와 같은 순서(manual_seed(seed) → randn)로 뽑은 초기 노이즈를 sample_k에 직접 넘긴다.
+        → 같은 seed = 단독 생성과 같은 초기 노이즈(draft/refine이 같은 출발점).
+        SDE 샘플러(dpmpp-3m-sde)의 스텝별 노이즈는 배치 단위 전역 RNG라 결과가 단독 생성과
+        샘플 단위로 같지는 않다.
+        """
+        model = self.model
+        if len(jobs) == 1 or model.diffusion_objective != "v":
+            return BgmGenerator.generate_batch(self, jobs, steps)   # v 목적함수(stable-audio-open)만 직접 샘플링
+        from stable_audio_tools.inference.sampling import sample_k
+        size = self.cfg["sample_size"]
+        if model.pretransform is not None:
+            size //= model.pretransform.downsampling_ratio          # 잠재 길이
+        noise = []
+        for j in jobs:
+            torch.manual_seed(int(j["seed"])); random.seed(int(j["seed"]))
+            noise.append(torch.randn([1, model.io_channels, size], device=self.device))
+        dtype = next(model.model.parameters()).dtype
+        cond = [{"prompt": j["prompt"], "seconds_start": 0, "seconds_total": self.seconds} for j in jobs]
+        inputs = model.get_conditioning_inputs(model.conditioner(cond, self.device))
+        inputs = {k: v.type(dtype) if v is not None else v for k, v in inputs.items()}
+        sampled = sample_k(model.model, torch.cat(noise).type(dtype), None, steps, sampler_type=self.sampler,
+                           sigma_min=0.3, sigma_max=500, device=self.device, cfg_scale=self.cfg_scale,
+                           batch_cfg=True, rescale_cfg=True, **inputs)
+        if model.pretransform is not None:
+            sampled = model.pretransform.decode(sampled.to(next(model.pretransform.parameters()).dtype))
+        return [(sampled[i], self.cfg["sample_rate"]) for i in range(sampled.size(0))]   # 각 (C, N)
+
+    def auto_batch_size(self, item_mb=BATCH_ITEM_MB, max_batch=MAX_BATCH):
+        """가용 메모리의 60%에 들어가는 배치 크기(최소 1)."""
+        return int(max(1, min(max_batch, free_memory_mb(self.device) * 0.6 // item_mb)))
+
+class DaemonGenerator(BgmGenerator):
+    """상주 서비스(src/bgm/daemon.py)에 작업을 넘기는 생성기 — 모델 로드/허브 확인 없음."""
+    def __init__(self, sock_path: str, seconds=30):
+        self.sock_path, self.seconds = sock_path, seconds
+
+    def generate(self, prompt, seed, steps):
+        from .daemon import request
+        from ..audio.wavio import load_audio
+        with tempfile.TemporaryDirectory(prefix="bgmd_") as d:
+            res = request({"prompt": prompt, "seed": int(seed), "steps": int(steps), "seconds": self.seconds,
+                           "out": str(Path(d) / "bgm.wav")}, self.sock_path)
+            audio, sr = load_audio(res["path"])
+        return torch.from_numpy(audio), sr
+
+def iter_generate(gen: BgmGenerator, jobs: List[Dict], steps: int, batch_size: int):
+    """jobs를 batch_size씩 묶어 생성하고 (job, audio, sr, batch_info)를 트랙 단위로 돌려준다."""
+    batch_size = max(1, int(batch_size))
+    for s in range(0, len(jobs), batch_size):
+        chunk = jobs[s:s + batch_size]
+        outs = gen.generate_batch(chunk, steps)
+        for i, (job, (audio, sr)) in enumerate(zip(chunk, outs)):
+            yield job, audio, sr, {"batch_index": i, "batch_size": len(chunk)}
+
+def draft_then_refine(gen: BgmGenerator, jobs: List[Dict], score_fn: Callable, draft_steps: int,
+                      full_steps: int, top_k: int, on_final: Callable, batch_size=1) -> List[Dict]:
+    """
+    jobs: [{"preset", "prompt", "seed"}, ...]
+    1) 전 후보를 draft_steps로 생성 → score_fn(audio, sr) (낮을수록 좋음)
+    2) 상위 top_k 시드만 full_steps로 다시 생성 → on_final(job, audio, sr, batch_info)
+    반환: 후보별 {"preset", "seed", "draft_score", "refined"} (report.json 기록용)
+    """
+    cands = {}
+    print(f"[DRAFT] {len(jobs)} candidates (steps={draft_steps}, batch={batch_size})")
+    for job, audio, sr, binfo in iter_generate(gen, jobs, draft_steps, batch_size):
+        cands[id(job)] = {"preset": job["preset"], "seed": job["seed"], "draft_score": float(score_fn(audio, sr)),
+                          "refined": False, **binfo}
+        print(f"  -> {job['preset']} (seed={job['seed']}) draft_score={cands[id(job)]['draft_score']:.4f}")
+    top = sorted(jobs, key=lambda j: cands[id(j)]["draft_score"])[:max(1, top_k)]
+    print(f"[REFINE] top {len(top)} (steps={full_steps})")
+    for job, audio, sr, binfo in iter_generate(gen, top, full_steps, batch_size):
+        cands[id(job)]["refined"] = True
+        on_final(job, audio, sr, binfo)
+    return [cands[id(j)] for j in jobs]
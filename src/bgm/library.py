@@ -0,0 +1,176 @@
+# BGM 라이브러리(카탈로그)
+# 생성된 트랙을 전부 인덱싱해 두고, 보이스 스펙트럼/카테고리에 맞는 미사용 트랙을 바로 고른다.
+#   엔트리: path, preset, seed, sr, seconds, bands, centroid_Hz, mid_mask_index, rms_dbfs,
+#           fingerprint(24개 로그 대역 에너지 비율), created, used[]
+#   인덱스: assets/bgm_index.json (JSON 한 파일, 원자적 저장)
+#
+#   python -m src.bgm.library scan                       # assets/bgm_30s/*/ 기존 트랙 흡수
+#   python -m src.bgm.library pick --voice voice.wav --mark
+#   python -m src.bgm.library stats
+import os, sys, json, time, argparse
+from pathlib import Path
+import numpy as np
+from ..audio import band_metrics
+
+INDEX_PATH = Path(os.environ.get("BGM_INDEX", "assets/bgm_index.json"))
+SCAN_ROOT = Path("assets") / "bgm_30s"
+W_MID = 0.5          # 점수 = 보이스와의 스펙트럼 겹침 + W_MID * mid_mask_index (낮을수록 좋음)
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+def entry_from_summary(path, summary, **meta):
+    """band_metrics 요약 → 인덱스 엔트리."""
+    return {
+        "path": str(path),
+        "preset": meta.get("preset"),
+        "seed": meta.get("seed"),
+        "sr": meta.get("sr"),
+        "seconds": meta.get("seconds"),
+        "bands": summary["bands"],
+        "centroid_Hz": summary["centroid_Hz"],
+        "mid_mask_index": summary["mid_mask_index"],
+        "rms_dbfs": summary.get("rms_dbfs"),
+        "fingerprint": summary.get("fingerprint"),
+        "created": meta.get("created") or _now(),
+        "used": [],
+    }
+
+class BgmLibrary:
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.entries = {}          # path → entry
+        self._fp = None            # (N, 24) 캐시, 변경 시 무효화
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for e in json.load(f).get("tracks", []):
+                    self.entries[e["path"]] = e
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "tracks": list(self.entries.values())}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def add(self, entry):
+        old = self.entries.get(entry["path"])
+        if old:
+            entry["used"] = old.get("used", [])
+        self.entries[entry["path"]] = entry
+        self._fp = None
+        return entry
+
+    def add_file(self, path, **meta):
+        """wav 분석(스트리밍 STFT) 후 추가. 이미 지문이 있으면 건너뜀."""
+        path = str(path)
+        e = self.entries.get(path)
+        if e and e.get("fingerprint"):
+            return e
+        an = band_metrics.analyze_file(path)
+        meta.setdefault("sr", an.sr)
+        meta.setdefault("seconds", round(an.n_samples / an.sr, 3))
+        return self.add(entry_from_summary(path, an.summary(), **meta))
+
+    def mark_used(self, path, by=None):
+        self.entries[str(path)]["used"].append({"at": _now(), "by": by})
+
+    def _matrix(self):
+        if self._fp is None:
+            items = [e for e in self.entries.values() if e.get("fingerprint") and Path(e["path"]).exists()]
+            fp = np.array([e["fingerprint"] for e in items], dtype=np.float32).reshape(len(items), -1)
+            mid = np.array([e["mid_mask_index"] for e in items], dtype=np.float32)
+            used = np.array([len(e.get("used", [])) for e in items], dtype=np.int32)
+            self._fp = (items, fp, mid, used)
+        return self._fp
+
+    def rank(self, voice_fp=None, category=None, unused_only=True, limit=10):
+        """
+        후보 점수(낮을수록 좋음). 보이스 지문이 있으면 대역별 min(bgm, voice) 합 = 겹치는 에너지 비율.
+        category: 프리셋 이름 접두어(예: "lofi", "ambient_cinematic").
+        """
+        items, fp, mid, used = self._matrix()
+        if not items:
+            return []
+        score = W_MID * mid
+        if voice_fp is not None:
+            v = np.asarray(voice_fp, dtype=np.float32)
+            score = score + np.minimum(fp, v[None, :]).sum(axis=1)
+        ok = np.ones(len(items), dtype=bool)
+        if unused_only:
+            ok &= used == 0
+        if category:
+            ok &= np.array([str(e.get("preset") or "").startswith(category) for e in items])
+        idx = np.flatnonzero(ok)
+        if idx.size == 0:
+            return []
+        order = idx[np.argsort(score[idx], kind="stable")][:limit]
+        return [(float(score[i]), items[i]) for i in order]
+
+    def pick(self, voice_fp=None, category=None, max_score=None, mark=False, by=None):
+        """최적 미사용 트랙 1개 (없거나 max_score 초과면 None)."""
+        ranked = self.rank(voice_fp, category, limit=1)
+        if not ranked or (max_score is not None and ranked[0][0] > max_score):
+            return None
+        score, e = ranked[0]
+        if mark:
+            self.mark_used(e["path"], by)
+            self.save()
+        return score, e
+
+    def scan(self, root=SCAN_ROOT):
+        """생성 폴더들의 report.json을 읽어 아직 없는 트랙을 흡수."""
+        n = 0
+        for rep_path in sorted(Path(root).glob("*/report.json")):
+            with open(rep_path, encoding="utf-8") as f:
+                rep = json.load(f)
+            created = rep_path.parent.name
+            for t in rep.get("tracks", []):
+                if not Path(t["path"]).exists() or self.entries.get(t["path"], {}).get("fingerprint"):
+                    continue
+                self.add_file(t["path"], preset=t.get("preset"), seed=t.get("seed"), created=created)
+                n += 1
+        return n
+
+def voice_fingerprint(path):
+    return band_metrics.analyze_file(path).summary()["fingerprint"]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index", default=str(INDEX_PATH))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("scan"); s.add_argument("--root", default=str(SCAN_ROOT))
+    p = sub.add_parser("pick")
+    p.add_argument("--voice", default=None, help="보이스 wav (스펙트럼 겹침 최소 트랙 선택)")
+    p.add_argument("--category", default=None, help="프리셋 이름 접두어")
+    p.add_argument("--max_score", type=float, default=None)
+    p.add_argument("--mark", action="store_true", help="선택한 트랙을 사용됨으로 기록")
+    p.add_argument("--by", default=None, help="사용처 메모(영상 경로 등)")
+    sub.add_parser("stats")
+    args = ap.parse_args()
+
+    lib = BgmLibrary(args.index)
+    if args.cmd == "scan":
+        n = lib.scan(args.root)
+        lib.save()
+        print(f"[OK] +{n} tracks (total {len(lib)}) → {lib.path}", file=sys.stderr)
+    elif args.cmd == "pick":
+        vfp = voice_fingerprint(args.voice) if args.voice else None
+        hit = lib.pick(vfp, args.category, args.max_score, mark=args.mark, by=args.by or args.voice)
+        if hit is None:
+            print("[INFO] 조건에 맞는 미사용 트랙 없음", file=sys.stderr)
+            sys.exit(1)
+        print(f"[INFO] score={hit[0]:.4f} preset={hit[1]['preset']} seed={hit[1]['seed']}", file=sys.stderr)
+        print(hit[1]["path"])
+    else:
+        n_used = sum(1 for e in lib.entries.values() if e.get("used"))
+        presets = {}
+        for e in lib.entries.values():
+            presets[e.get("preset")] = presets.get(e.get("preset"), 0) + 1
+        print(json.dumps({"tracks": len(lib), "used": n_used, "presets": presets}, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
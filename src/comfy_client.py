@@ -1,45 +1,165 @@
-import json, time, requests, os
+import json, time, requests, os, uuid, threading
 from typing import Dict, Any, Optional, List
 
+# ComfyUI HTTP/WS 클라이언트
+# - requests.Session 하나로 커넥션 재사용
+# - 완료 감지: /ws 실행 이벤트(websocket-client 있으면), 없으면 적응형 폴링(0.1s → poll)
+# - /view 다운로드는 청크 스트리밍으로 디스크에 바로 기록
+
 class ComfyClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, client_id: Optional[str] = None, use_ws: bool = True,
+                 session: Optional[requests.Session] = None):
         self.base = base_url.rstrip("/")
+        self.client_id = client_id or f"yt_auto_{uuid.uuid4().hex[:12]}"
+        self.session = session or requests.Session()
+        self.use_ws = use_ws
+        self._ws = None
+        self._ws_failed = False
+        self._ws_lock = threading.Lock()
+        self._events: Dict[str, Dict[str, Any]] = {}   # prompt_id → 종료 이벤트
+
+    # ---------- WebSocket ----------
+    def _ws_url(self):
+        if self.base.startswith("https://"):
+            return "wss://" + self.base[len("https://"):] + f"/ws?clientId={self.client_id}"
+        return "ws://" + self.base.split("://", 1)[-1] + f"/ws?clientId={self.client_id}"
+
+    def connect_ws(self, timeout=5.0):
+        """실행 이벤트 구독. 큐 등록 전에 붙어야 이벤트를 놓치지 않는다. 실패 시 None(폴링)."""
+        if not self.use_ws or self._ws_failed:
+            return None
+        if self._ws is None:
+            try:
+                import websocket   # websocket-client
+                self._ws = websocket.create_connection(self._ws_url(), timeout=timeout)
+            except Exception as e:
+                print(f"[comfy] ws unavailable ({e}); polling /history")
+                self._ws_failed = True
+                self._ws = None
+        return self._ws
+
+    def _pump_ws(self, timeout: float):
+        """메시지 하나 읽어 종료 이벤트면 기록. 타임아웃이면 False."""
+        import websocket
+        ws = self._ws
+        ws.settimeout(max(0.05, timeout))
+        try:
+            msg = ws.recv()
+        except websocket.WebSocketTimeoutException:
+            return False
+        if not isinstance(msg, str):      # 미리보기 바이너리 프레임
+            return True
+        try:
+            ev = json.loads(msg)
+        except ValueError:
+            return True
+        t, data = ev.get("type"), ev.get("data") or {}
+        pid = data.get("prompt_id")
+        if not pid:
+            return True
+        if (t == "executing" and data.get("node") is None) or t == "execution_success":
+            self._events.setdefault(pid, {"type": "done"})
+        elif t in ("execution_error", "execution_interrupted"):
+            self._events[pid] = {"type": t, "data": data}
+        return True
+
+    def close(self):
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+        self.session.close()
 
+    # ---------- HTTP ----------
     def queue_prompt(self, workflow: Dict[str, Any], prompt_id: Optional[str]=None):
-        body = {"prompt": workflow, "client_id": "yt_auto"}
+        self.connect_ws()
+        body = {"prompt": workflow, "client_id": self.client_id}
         if prompt_id:
             body["prompt_id"] = prompt_id
-        r = requests.post(f"{self.base}/prompt", json=body, timeout=60)
+        r = self.session.post(f"{self.base}/prompt", json=body, timeout=60)
         r.raise_for_status()
         return r.json()
 
     def get_history(self, prompt_id: str):
-        r = requests.get(f"{self.base}/history/{prompt_id}", timeout=60)
+        r = self.session.get(f"{self.base}/history/{prompt_id}", timeout=60)
         r.raise_for_status()
         return r.json()
 
-    def fetch_binary(self, filename: str, subfolder: str, save_to: str):
-        params = {"filename": filename, "subfolder": subfolder, "type": "output"}
-        import requests
-        r = requests.get(f"{self.base}/view", params=params, timeout=300)
+    def get_queue(self):
+        """{"running": n, "pending": n}"""
+        r = self.session.get(f"{self.base}/queue", timeout=10)
         r.raise_for_status()
-        with open(save_to, "wb") as f:
-            f.write(r.content)
-    def fetch_image(self, filename: str, subfolder: str, save_to: str):
-        return self.fetch_binary(filename, subfolder, save_to)
+        q = r.json()
+        return {"running": len(q.get("queue_running", [])), "pending": len(q.get("queue_pending", []))}
+
+    def fetch_binary(self, filename: str, subfolder: str, save_to: str, chunk: int = 1 << 16):
         # ComfyUI view endpoint: /view?filename=...&subfolder=...&type=output
         params = {"filename": filename, "subfolder": subfolder, "type": "output"}
-        r = requests.get(f"{self.base}/view", params=params, timeout=120)
-        r.raise_for_status()
-        with open(save_to, "wb") as f:
-            f.write(r.content)
+        tmp = save_to + ".part"
+        with self.session.get(f"{self.base}/view", params=params, timeout=300, stream=True) as r:
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for buf in r.iter_content(chunk_size=chunk):
+                    if buf:
+                        f.write(buf)
+        os.replace(tmp, save_to)
+        return save_to
+
+    def fetch_image(self, filename: str, subfolder: str, save_to: str):
+        return self.fetch_binary(filename, subfolder, save_to)
+
+    def output_images(self, hist: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """history 항목 → [{"filename","subfolder","type","node"}] (노드 순서 유지)."""
+        out = []
+        for node_id, node_out in (hist.get("outputs") or {}).items():
+            for im in node_out.get("images") or []:
+                if im.get("filename"):
+                    out.append(dict(im, node=node_id))
+        return out
 
     def wait_for_complete(self, prompt_id: str, poll=2.0, timeout=600):
         t0 = time.time()
+        if self._ws is not None:
+            return self._wait_ws(prompt_id, poll, timeout, t0)
+        # 적응형 폴링: 처음엔 촘촘히, 점점 poll까지 늘림
+        delay = 0.1
         while True:
             h = self.get_history(prompt_id)
             if prompt_id in h and "outputs" in h[prompt_id]:
                 return h[prompt_id]
             if time.time() - t0 > timeout:
                 raise TimeoutError("ComfyUI generation timed out")
-            time.sleep(poll)
+            time.sleep(delay)
+            delay = min(poll, delay * 1.5)
+
+    def _wait_ws(self, prompt_id, poll, timeout, t0):
+        last_check = time.time()
+        while True:
+            with self._ws_lock:
+                ev = self._events.pop(prompt_id, None)
+                if ev is None:
+                    try:
+                        self._pump_ws(min(poll, 1.0))
+                    except Exception as e:
+                        # 소켓이 끊기면 폴링으로 이어감
+                        print(f"[comfy] ws dropped ({e}); polling /history")
+                        self._ws, self._ws_failed = None, True
+                        return self.wait_for_complete(prompt_id, poll, max(1.0, timeout - (time.time() - t0)))
+                    ev = self._events.pop(prompt_id, None)
+            if ev is not None:
+                if ev["type"] != "done":
+                    msg = (ev.get("data") or {}).get("exception_message") or ev["type"]
+                    raise RuntimeError(f"ComfyUI {ev['type']}: {msg}")
+                h = self.get_history(prompt_id)
+                if prompt_id in h:
+                    return h[prompt_id]
+            # 이벤트 유실 대비: 가끔 history 직접 확인
+            if time.time() - last_check > max(poll, 5.0):
+                last_check = time.time()
+                h = self.get_history(prompt_id)
+                if prompt_id in h and "outputs" in h[prompt_id]:
+                    return h[prompt_id]
+            if time.time() - t0 > timeout:
+                raise TimeoutError("ComfyUI generation timed out")
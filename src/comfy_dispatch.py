@@ -0,0 +1,187 @@
+import time, threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from .comfy_client import ComfyClient
+
+# 여러 ComfyUI 인스턴스로 프롬프트 분산
+# - 인스턴스마다 /queue 깊이를 보고 depth까지 채워 둠(ComfyUI 자체 큐가 비지 않게)
+# - 실패한 프롬프트는 다른 인스턴스로 재시도(retries회)
+# - 결과는 입력(샷) 순서대로 반환
+#
+#   jobs = [{"workflow": wf, "save_to": ["seg_000/shot.png"], "output_nodes": ["5"](선택)}, ...]
+#   results = ComfyDispatcher(["http://gpu1:8188", "http://gpu2:8188"], depth=2).run(jobs)
+
+def parse_urls(urls: Union[str, Sequence[str]]) -> List[str]:
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    return [u.strip().rstrip("/") for u in urls if u and u.strip()]
+
+class _Instance:
+    def __init__(self, url, client):
+        self.url = url
+        self.client = client
+        self.inflight = 0
+        self.down_until = 0.0
+        self.done = 0
+        self.failed = 0
+        self.probe_failures = 0     # 연속 /queue 조회·제출 연결 실패
+
+class ComfyDispatcher:
+    def __init__(self, urls: Union[str, Sequence[str]], depth: int = 2, retries: int = 2,
+                 client_factory: Callable[[str], Any] = ComfyClient, queue_poll: float = 0.25,
+                 timeout: float = 600, cooldown: float = 10.0):
+        self.urls = parse_urls(urls)
+        if not self.urls:
+            raise ValueError("ComfyDispatcher: no ComfyUI urls")
+        self.depth = max(1, int(depth))
+        self.retries = max(0, int(retries))
+        self.queue_poll = queue_poll
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.instances = [_Instance(u, client_factory(u)) for u in self.urls]
+        self._lock = threading.Condition()
+
+    def _load(self, inst: _Instance) -> int:
+        # 로컬 in-flight와 서버 /queue 중 큰 값(다른 클라이언트 작업도 반영)
+        try:
+            q = inst.client.get_queue()
+            inst.probe_failures = 0
+            return max(inst.inflight, q["running"] + q["pending"])
+        except Exception:
+            inst.probe_failures += 1
+            inst.down_until = time.time() + self.cooldown
+            return self.depth
+
+    def _all_dead(self) -> bool:
+        # 모든 인스턴스가 retries+1번 연속 연결 실패 → 대기 중 작업은 포기(호출 측 폴백)
+        return all(x.probe_failures > self.retries for x in self.instances)
+
+    def _finish(self, inst, job_idx, job, hist):
+        paths = []
+        images = inst.client.output_images(hist)
+        if job.get("output_nodes"):
+            # 배치 워크플로: 저장 노드 순서 = 샷 순서
+            order = {str(nid): k for k, nid in enumerate(job["output_nodes"])}
+            images = sorted((im for im in images if str(im["node"]) in order), key=lambda im: order[str(im["node"])])
+        save_to = job.get("save_to") or []
+        if isinstance(save_to, str):
+            save_to = [save_to]
+        if len(images) < len(save_to):
+            raise RuntimeError(f"expected {len(save_to)} images, got {len(images)}")
+        for im, path in zip(images, save_to):
+            inst.client.fetch_image(im["filename"], im.get("subfolder", ""), path)
+            paths.append(path)
+        return {"ok": True, "paths": paths, "instance": inst.url, "images": images}
+
+    def run(self, jobs: List[Dict[str, Any]], on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None):
+        """jobs: [{"workflow": {...}, "save_to": path | [paths]}] → 같은 순서의 결과 리스트."""
+        n = len(jobs)
+        results: List[Optional[Dict[str, Any]]] = [None] * n
+        todo = deque((i, 0, frozenset()) for i in range(n))     # (job idx, 시도 횟수, 제외 인스턴스)
+        remaining = [n]
+        cv = self._lock
+
+        def settle(i, res):
+            with cv:
+                results[i] = res
+                remaining[0] -= 1
+                cv.notify_all()
+            if on_result:
+                on_result(i, res)
+
+        def waiter(inst, i, attempt, avoid, pid):
+            try:
+                hist = inst.client.wait_for_complete(pid, timeout=self.timeout)
+                res = self._finish(inst, i, jobs[i], hist)
+                inst.done += 1
+                ok = True
+            except Exception as e:
+                inst.failed += 1
+                res, ok = {"ok": False, "error": f"{type(e).__name__}: {e}", "instance": inst.url}, False
+            with cv:
+                inst.inflight -= 1
+                if not ok and attempt < self.retries:
+                    todo.appendleft((i, attempt + 1, avoid | {inst.url}))
+                    cv.notify_all()
+                    return
+            res["attempts"] = attempt + 1
+            settle(i, res)
+
+        def pick_job(inst):
+            # 이 인스턴스를 피해야 하는 작업은 건너뜀(단, 가용 인스턴스가 하나뿐이면 허용)
+            alive = [x for x in self.instances if x.down_until <= time.time()]
+            for k, (i, attempt, avoid) in enumerate(todo):
+                if inst.url not in avoid or all(x.url in avoid for x in alive):
+                    del todo[k]
+                    return i, attempt, avoid
+            return None
+
+        def feeder(inst, pool):
+            while True:
+                with cv:
+                    if remaining[0] <= 0:
+                        return
+                    while not todo and remaining[0] > 0:
+                        cv.wait(self.queue_poll)
+                    if remaining[0] <= 0:
+                        return
+                if inst.down_until > time.time():
+                    time.sleep(self.queue_poll)
+                    continue
+                if self._load(inst) >= self.depth:
+                    if self._all_dead():
+                        with cv:
+                            dropped = list(todo)
+                            todo.clear()
+                        for i, attempt, _ in dropped:
+                            settle(i, {"ok": False, "error": "no ComfyUI instance reachable",
+                                       "instance": None, "attempts": attempt + 1})
+                        continue
+                    time.sleep(self.queue_poll)
+                    continue
+                with cv:
+                    item = pick_job(inst)
+                    if item is None:
+                        cv.wait(self.queue_poll)
+                        continue
+                    inst.inflight += 1
+                i, attempt, avoid = item
+                try:
+                    pid = inst.client.queue_prompt(jobs[i]["workflow"])["prompt_id"]
+                except Exception as e:
+                    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                        inst.down_until = time.time() + self.cooldown   # 인스턴스 다운 → 잠시 제외
+                        inst.probe_failures += 1
+                    print(f"[comfy] submit failed on {inst.url}: {e}")
+                    inst.failed += 1
+                    with cv:
+                        inst.inflight -= 1
+                        if attempt < self.retries:
+                            todo.appendleft((i, attempt + 1, avoid | {inst.url}))
+                            cv.notify_all()
+                            continue
+                    settle(i, {"ok": False, "error": f"{type(e).__name__}: {e}", "instance": inst.url,
+                               "attempts": attempt + 1})
+                    continue
+                inst.probe_failures = 0
+                pool.submit(waiter, inst, i, attempt, avoid, pid)
+
+        if n == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=len(self.instances) * self.depth) as pool:
+            feeders = [threading.Thread(target=feeder, args=(inst, pool), daemon=True) for inst in self.instances]
+            for t in feeders:
+                t.start()
+            for t in feeders:
+                t.join()
+        return results
+
+    def stats(self):
+        return {x.url: {"done": x.done, "failed": x.failed} for x in self.instances}
+
+    def close(self):
+        for x in self.instances:
+            if hasattr(x.client, "close"):
+                x.client.close()
@@ -0,0 +1,112 @@
+import os, json, copy
+from typing import Any, Dict, List, Optional, Sequence
+
+# ComfyUI API 워크플로 템플릿
+# - 파일은 한 번만 파싱(경로+mtime 캐시), {"prompt": {...}} 래퍼도 허용
+# - KSampler 링크를 따라 prompt / negative / seed / size / batch_size 노드를 자동으로 찾음
+# - 여러 샷을 프롬프트 하나로: 텍스트가 같으면 EmptyLatentImage.batch_size,
+#   다르면 샷별로 달라지는 하위 그래프(텍스트 인코드→latent→sampler→decode→save)만 복제하고
+#   체크포인트 로더·네거티브 인코드는 공유 → 큐 등록/스케줄링 1회
+
+SAMPLER_TYPES = ("KSampler", "KSamplerAdvanced")
+LATENT_TYPES = ("EmptyLatentImage", "EmptySD3LatentImage")
+SAVE_TYPES = ("SaveImage", "PreviewImage")
+
+_CACHE: Dict[str, Any] = {}
+
+def _links(inputs: Dict[str, Any]):
+    for k, v in inputs.items():
+        if isinstance(v, list) and len(v) == 2 and isinstance(v[0], str):
+            yield k, v[0]
+
+class WorkflowTemplate:
+    def __init__(self, graph: Dict[str, Any], prompt_node: Optional[Any] = None, neg_node: Optional[Any] = None):
+        if "prompt" in graph and isinstance(graph["prompt"], dict) and "class_type" not in graph["prompt"]:
+            graph = graph["prompt"]
+        self.graph = graph
+        self._json = json.dumps(graph)
+        by_type = lambda types: [nid for nid, n in graph.items() if n.get("class_type") in types]
+        samplers = by_type(SAMPLER_TYPES)
+        self.sampler_node = samplers[0] if samplers else None
+        s_in = graph[self.sampler_node]["inputs"] if self.sampler_node else {}
+        link = dict(_links(s_in))
+        self.prompt_node = str(prompt_node) if prompt_node is not None and str(prompt_node) in graph else link.get("positive")
+        self.neg_node = str(neg_node) if neg_node is not None and str(neg_node) in graph else link.get("negative")
+        self.latent_node = link.get("latent_image") if link.get("latent_image") in graph else (by_type(LATENT_TYPES) or [None])[0]
+        self.seed_key = "noise_seed" if "noise_seed" in s_in else "seed"
+        self.save_nodes = by_type(SAVE_TYPES)
+
+    @classmethod
+    def load(cls, path: str, prompt_node=None, neg_node=None) -> "WorkflowTemplate":
+        key = (os.path.abspath(path), os.path.getmtime(path), str(prompt_node), str(neg_node))
+        t = _CACHE.get(key)
+        if t is None:
+            with open(path, "r", encoding="utf-8") as f:
+                t = cls(json.load(f), prompt_node, neg_node)
+            _CACHE[key] = t
+        return t
+
+    def _fresh(self) -> Dict[str, Any]:
+        return json.loads(self._json)
+
+    def _set(self, wf, nid, key, value):
+        if nid is not None and value is not None and nid in wf:
+            wf[nid].setdefault("inputs", {})[key] = value
+
+    def render(self, prompt: str, negative: Optional[str] = None, seed: Optional[int] = None,
+               width: Optional[int] = None, height: Optional[int] = None, batch_size: Optional[int] = None):
+        wf = self._fresh()
+        self._set(wf, self.prompt_node, "text", prompt)
+        self._set(wf, self.neg_node, "text", negative)
+        self._set(wf, self.sampler_node, self.seed_key, None if seed is None else int(seed))
+        self._set(wf, self.latent_node, "width", width)
+        self._set(wf, self.latent_node, "height", height)
+        self._set(wf, self.latent_node, "batch_size", batch_size)
+        return wf
+
+    def _downstream(self, roots: Sequence[str]) -> List[str]:
+        """roots에서 링크를 따라 도달하는 노드(roots 포함)."""
+        users: Dict[str, List[str]] = {}
+        for nid, n in self.graph.items():
+            for _, src in _links(n.get("inputs", {})):
+                users.setdefault(src, []).append(nid)
+        seen, stack = set(), [r for r in roots if r]
+        while stack:
+            nid = stack.pop()
+            if nid in seen:
+                continue
+            seen.add(nid)
+            stack.extend(users.get(nid, []))
+        return [nid for nid in self.graph if nid in seen]
+
+    def render_batch(self, prompts: Sequence[str], negative: Optional[str] = None,
+                     seeds: Optional[Sequence[Optional[int]]] = None,
+                     width: Optional[int] = None, height: Optional[int] = None):
+        """
+        여러 샷 → (workflow, output_nodes). output_nodes 순서대로 이미지가 샷 순서.
+        텍스트가 모두 같으면 latent batch_size=N 한 번(시드는 첫 값 기준 배치 노이즈).
+        """
+        n = len(prompts)
+        seeds = list(seeds) if seeds is not None else [None] * n
+        if n == 1 or len(set(prompts)) == 1:
+            wf = self.render(prompts[0], negative, seeds[0], width, height, batch_size=n)
+            return wf, list(self.save_nodes)
+
+        base = self.render(prompts[0], negative, seeds[0], width, height)
+        per_shot = self._downstream([self.prompt_node, self.latent_node, self.sampler_node])
+        ids = [int(x) for x in base if str(x).isdigit()]
+        stride = (max(ids) + 1) if ids else len(base) + 1
+        outputs = [nid for nid in per_shot if nid in self.save_nodes]
+        for k in range(1, n):
+            remap = {nid: str(int(nid) + stride * k) if nid.isdigit() else f"{nid}_{k}" for nid in per_shot}
+            for nid in per_shot:
+                node = copy.deepcopy(base[nid])
+                for key, src in list(_links(node.get("inputs", {}))):
+                    if src in remap:
+                        node["inputs"][key] = [remap[src], node["inputs"][key][1]]
+                base[remap[nid]] = node
+            self._set(base, remap.get(self.prompt_node), "text", prompts[k])
+            if seeds[k] is not None:
+                self._set(base, remap.get(self.sampler_node), self.seed_key, int(seeds[k]))
+            outputs += [remap[nid] for nid in per_shot if nid in self.save_nodes]
+        return base, outputs
@@ -0,0 +1,120 @@
+import os, re, json, time, shutil, hashlib, threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# 생성 이미지 재사용 인덱스
+# (정규화 프롬프트 + 생성 설정) → 기존 이미지
+#   exact: 구절 집합 + 설정(시드 고정 시 시드 포함)이 같으면 그대로 재사용
+#   near : 같은 설정 그룹 안에서 단어+바이그램 Jaccard ≥ 임계값(히어로 샷 제외 권장)
+# 저장: JSON lines 추가 기록(증분), 로드 시 한 번 읽어 메모리 인덱스 구성
+#       이미지는 assets/image_store/ 로 복사해 둠(샷 경로는 다음 실행에서 덮어써질 수 있음)
+#
+#   idx = ImageIndex()
+#   hit = idx.lookup(prompt, settings, near=0.8)   # → (path, score, "exact"|"near") | None
+
+INDEX_PATH = Path(os.environ.get("IMAGE_INDEX", "assets/image_index.jsonl"))
+STORE_DIR = "image_store"      # INDEX_PATH 옆
+SIZE_RE = re.compile(r"\b\d{3,4}\s*[x×]\s*\d{3,4}\b")
+WORD_RE = re.compile(r"[0-9a-z가-힣]+")
+SETTING_KEYS = ("engine", "model", "workflow", "w", "h", "steps", "cfg", "sampler", "neg")
+
+def normalize_prompt(prompt: str) -> str:
+    """소문자, 해상도 토큰 제거(설정으로 취급), 쉼표 구절 단위 중복 제거 후 정렬."""
+    p = SIZE_RE.sub(" ", (prompt or "").lower())
+    phrases = {" ".join(WORD_RE.findall(x)) for x in p.split(",")}
+    return ", ".join(sorted(x for x in phrases if x))
+
+def prompt_tokens(norm: str) -> frozenset:
+    words = WORD_RE.findall(norm)
+    return frozenset(words + [f"{a}_{b}" for a, b in zip(words, words[1:])])
+
+def settings_group(settings: Dict[str, Any]) -> str:
+    g = {k: settings.get(k) for k in SETTING_KEYS if settings.get(k) is not None}
+    if "neg" in g:
+        g["neg"] = normalize_prompt(g["neg"])
+    return json.dumps(g, sort_keys=True, ensure_ascii=False)
+
+def exact_key(norm: str, settings: Dict[str, Any]) -> str:
+    seed = settings.get("seed")
+    seed = int(seed) if seed is not None and int(seed) >= 0 else None   # 랜덤 시드는 키에서 제외
+    raw = f"{settings_group(settings)}|{seed}|{norm}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class ImageIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.entries = []                      # [{"path","prompt","norm","group","key","created"}]
+        self.exact: Dict[str, int] = {}        # key → entry id (최신)
+        self.inv: Dict[str, Dict[str, list]] = {}   # group → token → [entry ids]
+        self.tokens = []
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            self._insert(json.loads(line))
+                        except (ValueError, KeyError):
+                            continue
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _insert(self, e):
+        i = len(self.entries)
+        self.entries.append(e)
+        toks = prompt_tokens(e["norm"])
+        self.tokens.append(toks)
+        self.exact[e["key"]] = i
+        g = self.inv.setdefault(e["group"], {})
+        for t in toks:
+            g.setdefault(t, []).append(i)
+        return i
+
+    def add(self, prompt: str, settings: Dict[str, Any], path: str):
+        norm = normalize_prompt(prompt)
+        key = exact_key(norm, settings)
+        store = self.path.parent / STORE_DIR / key[:2]
+        store.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            kept = store / f"{key}_{len(self.entries)}{Path(path).suffix or '.png'}"
+            shutil.copyfile(path, kept)
+            e = {"path": str(kept), "source": str(path), "prompt": prompt, "norm": norm,
+                 "group": settings_group(settings), "key": key, "seed": settings.get("seed"),
+                 "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self._insert(e)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        return e
+
+    def lookup(self, prompt: str, settings: Dict[str, Any], near: Optional[float] = None) -> Optional[Tuple[str, float, str]]:
+        norm = normalize_prompt(prompt)
+        i = self.exact.get(exact_key(norm, settings))
+        if i is not None and os.path.exists(self.entries[i]["path"]):
+            return self.entries[i]["path"], 1.0, "exact"
+        if not near:
+            return None
+        inv = self.inv.get(settings_group(settings))
+        if not inv:
+            return None
+        q = prompt_tokens(norm)
+        shared = Counter()
+        for t in q:
+            for j in inv.get(t, ()):
+                shared[j] += 1
+        best, best_s = None, 0.0
+        for j, inter in shared.items():
+            s = inter / (len(q) + len(self.tokens[j]) - inter)
+            if s > best_s or (s == best_s and best is not None and j > best):
+                if os.path.exists(self.entries[j]["path"]):
+                    best, best_s = j, s
+        if best is None or best_s < near:
+            return None
+        return self.entries[best]["path"], best_s, "near"
+
+    def materialize(self, src: str, dst: str):
+        """재사용 이미지를 샷 경로로 복사(하드링크는 이후 덮어쓰기가 저장본까지 바꾸므로 쓰지 않음)."""
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dst)
+        return str(dst)
@@ -1,7 +1,7 @@
 import os, argparse, yaml, textwrap, shutil, json, math
 from typing import List, Dict, Any
 from .script_shots import synthesize_script_from_topic, parse_script, load_template
-from .visuals import build_shot_video
+from .visuals import build_shot_video, comfyui_generate_images
 from .tts import tts_edge, tts_melo, tts_pyttsx3, get_audio_durations
 from .assemble import write_srt, concat_videos, mix_audio, mux_av, overlay_music, write_metadata
 
@@ -56,6 +56,10 @@ def main():
     ap.add_argument("--workflow", type=str, default=None)
     ap.add_argument("--prompt_node", type=int, default=None)
     ap.add_argument("--neg_prompt_node", type=int, default=None)
+    ap.add_argument("--comfy_depth", type=int, default=None, help="ComfyUI 인스턴스당 큐 깊이 (--comfyui_url은 콤마로 여러 개)")
+    ap.add_argument("--comfy_batch", type=int, default=None, help="ComfyUI 프롬프트 하나에 묶을 샷 수")
+    ap.add_argument("--reuse_images", type=str, default=None, choices=["off","exact","near"],
+                    help="이미지 재사용 인덱스 (near: 유사 프롬프트 허용, 첫 샷 제외)")
     ap.add_argument("--music", type=str, default=None)
     ap.add_argument("--llm", type=str, default=None, choices=["template","openai"])
     ap.add_argument("--stitch_only", action="store_true", help="Skip generation; just stitch existing segments in out dir")
@@ -83,7 +87,11 @@ def main():
             "url": args.comfyui_url or cfg["comfyui"]["url"],
             "workflow_path": args.workflow or cfg["comfyui"]["workflow_path"],
             "prompt_node": args.prompt_node or cfg["comfyui"]["prompt_node"],
-            "neg_prompt_node": args.neg_prompt_node if args.neg_prompt_node is not None else cfg["comfyui"].get("neg_prompt_node")
+            "neg_prompt_node": args.neg_prompt_node if args.neg_prompt_node is not None else cfg["comfyui"].get("neg_prompt_node"),
+            "urls": cfg["comfyui"].get("urls") if not args.comfyui_url else None,
+            "depth": args.comfy_depth or cfg["comfyui"].get("depth", 2),
+            "batch": args.comfy_batch or cfg["comfyui"].get("batch", 1),
+            "reuse": args.reuse_images or cfg["comfyui"].get("reuse", "off"),
         }
 
     # 1) Script
@@ -125,16 +133,27 @@ def main():
     video_dir = os.path.join(args.out, "video"); ensure_dir(video_dir)
     video_paths = []
     if not args.stitch_only:
+        prompts = [s.get("prompt") or f"cinematic, high detail, key idea: {s['text']}" for s in shots]
+        seg_dirs = [os.path.join(video_dir, f"seg_{i:03d}") for i in range(len(shots))]
+        for d in seg_dirs: ensure_dir(d)
+        ready, dispatched = [False] * len(shots), False
+        if comfy_cfg:
+            # 전 샷 이미지를 먼저 ComfyUI 인스턴스들에 동시 투입(샷 순서로 수집)
+            try:
+                ready = comfyui_generate_images(prompts, [os.path.join(d, "shot.png") for d in seg_dirs], comfy_cfg)
+                dispatched = True   # 실패 샷은 이미 재시도됨 → 텍스트 이미지 폴백
+            except Exception as e:
+                print("[warn] ComfyUI dispatch failed, falling back per shot:", e)
         for i, s in enumerate(shots):
-            tmp_dir = os.path.join(video_dir, f"seg_{i:03d}"); ensure_dir(tmp_dir)
             vp = build_shot_video(
                 text=s["text"],
-                prompt=s.get("prompt") or f"cinematic, high detail, key idea: {s['text']}",
+                prompt=prompts[i],
                 size=args.size,
                 secs=s["dur"],
-                tmp_dir=tmp_dir,
-                use_comfy=bool(comfy_cfg) and (not args.mock),
-                comfy_cfg=comfy_cfg
+                tmp_dir=seg_dirs[i],
+                use_comfy=bool(comfy_cfg) and (not args.mock) and not dispatched,
+                comfy_cfg=comfy_cfg,
+                image_ready=ready[i]
             )
             video_paths.append(vp)
     else:
@@ -1,8 +1,17 @@
-import argparse, json, pathlib, subprocess
+import argparse, json, pathlib, traceback
+from concurrent.futures import ProcessPoolExecutor
+from ..beats import gen as beats_gen
+from ..tts import length as tts_length
+from ..shots import plan as shots_plan
+from ..render import compose as render_compose
+
+# 토픽 배치: 단계(beats → tts 길이 → shots → compose)를 프로세스 안에서 함수로 호출
+# 토픽끼리는 --workers 개 프로세스 풀에서 병렬, 결과 파일은 예전 CLI 체인과 같음
 parser = argparse.ArgumentParser()
 parser.add_argument('--queue', required=True)
 parser.add_argument('--max', type=int, default=5)
 parser.add_argument('--nvenc', action='store_true')
+parser.add_argument('--workers', type=int, default=1)
 
 
 def run_topic(item, i):
@@ -16,22 +25,44 @@ def run_topic(item, i):
     outmp4 = pathlib.Path('out')/f"{tid}.mp4"
 
     # brief
-    brief.write_text(json.dumps({"id":tid, "title": item['title'], "category": item['category']}, ensure_ascii=False, indent=2), encoding='utf-8')
-    # beats
-    subprocess.check_call(['python','-m','src.beats.gen','--brief',str(brief),'--out',str(beats)])
-    # tts length (stub)
-    subprocess.check_call(['python','-m','src.tts.length','--beats',str(beats),'--write',str(beats)])
+    b = {"id":tid, "title": item['title'], "category": item['category']}
+    brief.write_text(json.dumps(b, ensure_ascii=False, indent=2), encoding='utf-8')
+    # beats + tts length (stub)
+    rows = tts_length.estimate(beats_gen.generate(b))
+    beats_gen.write_beats(rows, beats)
     # shots
-    subprocess.check_call(['python','-m','src.shots.plan','--beats',str(beats),'--out_tsv',str(shots),'--out_prompts',str(prompts)])
+    tsv_lines, prompt_rows = shots_plan.plan(rows)
+    shots_plan.write_plan(tsv_lines, prompt_rows, shots, prompts)
     # compose manifest
-    subprocess.check_call(['python','-m','src.render.compose','--topic',item['title'],'--beats',str(beats),'--shots',str(shots),'--prompts',str(prompts),'--out',str(outmp4),'--snap_to_tts'])
+    _, mpath = render_compose.compose(item['title'], beats, shots, prompts, outmp4, snap_to_tts=True)
+    return str(mpath)
+
+
+def _run_safe(item, i):
+    try:
+        return i, run_topic(item, i), None
+    except Exception:
+        return i, None, traceback.format_exc()
 
 
 def main():
     args = parser.parse_args()
     items = [json.loads(l) for l in pathlib.Path(args.queue).read_text(encoding='utf-8').splitlines() if l.strip()]
-    for i, it in enumerate(items[:args.max]):
-        run_topic(it, i)
+    items = items[:args.max]
+    if args.workers > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(items))) as pool:
+            results = list(pool.map(_run_safe, items, range(len(items))))
+    else:
+        results = [_run_safe(it, i) for i, it in enumerate(items)]
+    failed = 0
+    for i, mpath, err in results:
+        if err:
+            failed += 1
+            print(f'[batch] t{i:03d} failed:\n{err}')
+        else:
+            print('[compose] manifest written:', mpath)
+    if failed:
+        raise SystemExit(f'[batch] {failed}/{len(items)} topics failed')
 
 if __name__ == '__main__':
     main()
@@ -8,19 +8,24 @@ parser.add_argument('--prompts', required=True)
 parser.add_argument('--out', required=True)
 parser.add_argument('--snap_to_tts', action='store_true')
 
-def main():
-    args = parser.parse_args()
+def compose(topic, beats, shots, prompts, out, snap_to_tts=False):
+    """manifest를 쓰고 (manifest, 경로)를 돌려줌. beats/shots/prompts는 파일 경로."""
     manifest = {
-        "topic": args.topic,
-        "beats_csv": args.beats,
-        "shots_tsv": args.shots,
-        "prompts_jsonl": args.prompts,
-        "render": args.out,
-        "snap_to_tts": bool(args.snap_to_tts),
+        "topic": topic,
+        "beats_csv": str(beats),
+        "shots_tsv": str(shots),
+        "prompts_jsonl": str(prompts),
+        "render": str(out),
+        "snap_to_tts": bool(snap_to_tts),
     }
-    mpath = pathlib.Path('data/manifests')/f"{pathlib.Path(args.out).stem}.manifest.json"
+    mpath = pathlib.Path('data/manifests')/f"{pathlib.Path(out).stem}.manifest.json"
     mpath.parent.mkdir(parents=True, exist_ok=True)
     mpath.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    return manifest, mpath
+
+def main():
+    args = parser.parse_args()
+    _, mpath = compose(args.topic, args.beats, args.shots, args.prompts, args.out, args.snap_to_tts)
     print('[compose] manifest written:', mpath)
 
 if __name__ == '__main__':
@@ -0,0 +1,123 @@
+# 프레임 싱크: 메모리의 RGB 프레임을 ffmpeg stdin(rawvideo)으로 바로 흘려 한 번에 인코딩
+# - PNG 임시 파일/중간 mp4 없이 단일 인코드
+# - duration 지정 시 같은 필터 그래프에서 tpad(마지막 프레임 복제) + trim으로 길이를 맞춤
+#
+#   with FrameSink("shot.mp4", 1080, 1920, 30, ["-c:v", "libx264", "-crf", "21"], duration=3.2) as sink:
+#       for fr in frames: sink.write(fr)
+import shlex, subprocess, tempfile
+from typing import Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+def _to_rgb(frame) -> np.ndarray:
+    """PIL.Image / (H,W,3) uint8·float 배열 / torch 텐서 → (H,W,3) uint8."""
+    if hasattr(frame, "convert"):
+        frame = frame.convert("RGB")
+    elif hasattr(frame, "detach"):
+        frame = frame.detach().cpu().numpy()
+    a = np.asarray(frame)
+    if a.ndim == 3 and a.shape[0] in (1, 3) and a.shape[-1] not in (1, 3):
+        a = a.transpose(1, 2, 0)       # CHW → HWC
+    if a.ndim == 2:
+        a = np.repeat(a[..., None], 3, axis=2)
+    if a.shape[-1] == 1:
+        a = np.repeat(a, 3, axis=2)
+    if a.dtype != np.uint8:
+        a = np.clip(a * 255.0 if a.max() <= 1.0 else a, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(a[..., :3])
+
+class FrameSink:
+    def __init__(self, out_path: str, w: int, h: int, fps: float,
+                 encoder_args: Union[str, Sequence[str]] = ("-c:v", "libx264", "-preset", "veryfast", "-crf", "21"),
+                 duration: Optional[float] = None, ffmpeg: str = "ffmpeg", extra_vf: Optional[str] = None):
+        self.out_path, self.w, self.h, self.fps = str(out_path), int(w), int(h), fps
+        self.encoder_args = shlex.split(encoder_args) if isinstance(encoder_args, str) else list(encoder_args)
+        self.duration = duration
+        self.ffmpeg = ffmpeg
+        self.extra_vf = extra_vf
+        self.proc = None
+        self.size = None          # 입력 프레임 크기(첫 프레임 기준)
+        self.n_frames = 0
+        self._err = None
+
+    def filter_graph(self) -> str:
+        vf = [f"scale={self.w}:{self.h}:flags=lanczos"]
+        if self.extra_vf:
+            vf.append(self.extra_vf)
+        if self.duration:
+            # 모자라면 마지막 프레임 복제, 넘치면 자름 — 프레임 수를 몰라도 결과 길이는 duration
+            vf.append(f"tpad=stop_mode=clone:stop_duration={self.duration:.3f}")
+            vf.append(f"trim=duration={self.duration:.3f}")
+        vf.append("format=yuv420p")
+        return ",".join(vf)
+
+    def command(self) -> List[str]:
+        iw, ih = self.size
+        cmd = [self.ffmpeg, "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{iw}x{ih}", "-framerate", str(self.fps),
+               "-i", "pipe:0", "-vf", self.filter_graph(), "-r", str(self.fps)]
+        enc = self.encoder_args
+        if "-pix_fmt" not in enc:
+            enc = enc + ["-pix_fmt", "yuv420p"]
+        if "-movflags" not in enc:
+            enc = enc + ["-movflags", "+faststart"]
+        return cmd + enc + [self.out_path]
+
+    def _start(self, shape):
+        self.size = (shape[1], shape[0])
+        self._err = tempfile.TemporaryFile()
+        cmd = self.command()
+        print(f"[CMD] {shlex.join(cmd)}")
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._err)
+
+    def write(self, frame):
+        a = _to_rgb(frame)
+        if self.proc is None:
+            self._start(a.shape)
+        elif (a.shape[1], a.shape[0]) != self.size:
+            raise ValueError(f"frame size changed: {a.shape[1]}x{a.shape[0]} != {self.size[0]}x{self.size[1]}")
+        try:
+            self.proc.stdin.write(a.tobytes())
+        except BrokenPipeError:
+            self.close()
+            raise
+        self.n_frames += 1
+
+    def write_all(self, frames: Iterable):
+        for fr in frames:
+            self.write(fr)
+        return self
+
+    def close(self):
+        if self.proc is None:
+            raise RuntimeError("FrameSink: no frames written")
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        rc = self.proc.wait()
+        if rc != 0:
+            self._err.seek(0)
+            msg = self._err.read().decode("utf-8", "replace")[-3000:]
+            self._err.close()
+            raise RuntimeError(f"ffmpeg error ({rc}): {msg}")
+        self._err.close()
+        return self.out_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self._err.close()
+
+def write_frames(frames: Iterable, out_path: str, w: int, h: int, fps: float,
+                 encoder_args: Union[str, Sequence[str]] = ("-c:v", "libx264", "-preset", "veryfast", "-crf", "21"),
+                 duration: Optional[float] = None, **kw) -> str:
+    with FrameSink(out_path, w, h, fps, encoder_args, duration, **kw) as sink:
+        sink.write_all(frames)
+    return sink.out_path
@@ -0,0 +1,141 @@
+import io, json, time, base64, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+# AUTOMATIC1111 WebUI txt2img 클라이언트
+# - requests.Session 하나로 keep-alive 커넥션 재사용
+# - max_in_flight개 요청을 동시에 유지(GPU 큐가 비지 않게)
+# - 시드만 다른 동일 설정 샷은 batch_size/n_iter 한 번으로 묶음 (A1111은 seed, seed+1, ... 로 생성)
+# - base64 → PIL 디코딩은 별도 스레드 풀
+
+SEED_KEYS = ("seed",)
+
+def make_payload(prompt, negative="", w=1080, h=1920, steps=28, cfg=6.5, sampler="Euler a", seed=-1, **extra):
+    p = {
+        "prompt": prompt,
+        "negative_prompt": negative or "",
+        "steps": int(steps),
+        "cfg_scale": float(cfg),
+        "width": int(w),
+        "height": int(h),
+        "sampler_name": sampler or "Euler a",
+        "seed": int(seed if seed is not None else -1),
+        "restore_faces": False,
+        "tiling": False,
+        "enable_hr": False,
+    }
+    p.update(extra)
+    return p
+
+def _settings_key(payload):
+    return json.dumps({k: v for k, v in payload.items() if k not in SEED_KEYS}, sort_keys=True)
+
+def group_jobs(jobs: List[Dict[str, Any]], max_batch=4) -> List[List[Dict[str, Any]]]:
+    """
+    설정(시드 제외)이 같고 시드가 -1이거나 연속인 잡끼리 묶는다.
+    jobs: [{"key": ..., "payload": {...}}]
+    """
+    groups, by_key = [], {}
+    for job in jobs:
+        k = _settings_key(job["payload"])
+        seed = job["payload"].get("seed", -1)
+        g = by_key.get(k)
+        if g is not None and len(g) < max_batch:
+            last = g[-1]["payload"].get("seed", -1)
+            if (seed < 0 and last < 0) or (seed >= 0 and last >= 0 and seed == last + 1):
+                g.append(job)
+                continue
+        g = [job]
+        by_key[k] = g
+        groups.append(g)
+    return groups
+
+def decode_image(b64: str):
+    from PIL import Image
+    if "," in b64:
+        b64 = b64.split(",", 1)[-1]
+    return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
+
+class SDClient:
+    def __init__(self, base_url: str, max_in_flight: int = 2, max_batch: int = 4,
+                 decode_workers: int = 4, timeout: float = 600):
+        self.base = base_url.rstrip("/")
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_batch = max(1, int(max_batch))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._decode = ThreadPoolExecutor(max_workers=max(1, decode_workers), thread_name_prefix="sd-decode")
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "images": 0, "sec": 0.0}
+
+    def ping(self, timeout=2) -> bool:
+        try:
+            self.session.get(self.base, timeout=timeout)
+            return True
+        except requests.RequestException:
+            return False
+
+    def txt2img_raw(self, payload: Dict[str, Any]) -> List[str]:
+        t0 = time.time()
+        r = self.session.post(f"{self.base}/sdapi/v1/txt2img", json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        imgs = r.json().get("images", [])
+        if not imgs:
+            raise RuntimeError("SD returned no images")
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["images"] += len(imgs)
+            self.stats["sec"] += time.time() - t0
+        return imgs
+
+    def txt2img(self, payload: Dict[str, Any]):
+        """단일 호출 → 첫 이미지(PIL)."""
+        return decode_image(self.txt2img_raw(dict(payload, batch_size=1, n_iter=1))[0])
+
+    def _run_group(self, group):
+        n = len(group)
+        bs = min(n, self.max_batch)
+        payload = dict(group[0]["payload"], batch_size=bs, n_iter=-(-n // bs))
+        imgs = self.txt2img_raw(payload)
+        # 그리드가 앞에 붙어 오는 설정이면 뒤쪽 n개가 개별 이미지
+        imgs = imgs[-(bs * payload["n_iter"]):][:n]
+        if len(imgs) < n:
+            raise RuntimeError(f"SD returned {len(imgs)} images for {n} jobs")
+        return [self._decode.submit(decode_image, b) for b in imgs]
+
+    def iter_txt2img(self, jobs: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """
+        jobs: [{"key": ..., "payload": make_payload(...)}]
+        완료되는 순서대로 (job, PIL.Image | Exception) 를 내보낸다.
+        """
+        groups = group_jobs(jobs, self.max_batch)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="sd-http") as pool:
+            futs = {pool.submit(self._run_group, g): g for g in groups}
+            for fut in as_completed(futs):
+                g = futs[fut]
+                try:
+                    decoded = fut.result()
+                except Exception as e:
+                    for job in g:
+                        yield job, e
+                    continue
+                for job, df in zip(g, decoded):
+                    try:
+                        yield job, df.result()
+                    except Exception as e:
+                        yield job, e
+
+    def close(self):
+        self._decode.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,9 +5,8 @@ parser.add_argument('--beats', required=True)
 parser.add_argument('--out_tsv', required=True)
 parser.add_argument('--out_prompts', required=True)
 
-def main():
-    args = parser.parse_args()
-    beats = list(csv.DictReader(open(args.beats, encoding='utf-8')))
+def plan(beats):
+    """beat 행 목록 → (shots.tsv 행 목록, prompts 목록)."""
     tsv_lines = []
     prompts = []
     for b in beats:
@@ -17,9 +16,11 @@ def main():
         prompts.append({"shot_id": f"{bid}-1", "engine":"sdxl", "seed": 1234, "cfg": 6.5, "steps": 30, "prompt": "neon title, high contrast", "neg":"blurry"})
         # shot 2: motion/b-roll placeholder
         tsv_lines.append([bid, 2, 'motion', 'AnimateDiff: fast zoom / icon pop', float(b.get('sec_target', 3)) - 1.2, '-'])
-    # write
-    out_tsv = pathlib.Path(args.out_tsv)
-    out_prom = pathlib.Path(args.out_prompts)
+    return tsv_lines, prompts
+
+def write_plan(tsv_lines, prompts, out_tsv, out_prompts):
+    out_tsv = pathlib.Path(out_tsv)
+    out_prom = pathlib.Path(out_prompts)
     out_tsv.parent.mkdir(parents=True, exist_ok=True)
     with out_tsv.open('w', encoding='utf-8') as f:
         f.write('beat_id\tshot_id\ttype\tprompt/motion\tduration_est\tsrc\n')
@@ -27,5 +28,11 @@ def main():
             f.write('\t'.join(map(str,r))+'\n')
     out_prom.write_text('\n'.join(json.dumps(p, ensure_ascii=False) for p in prompts), encoding='utf-8')
 
+def main():
+    args = parser.parse_args()
+    beats = list(csv.DictReader(open(args.beats, encoding='utf-8')))
+    tsv_lines, prompts = plan(beats)
+    write_plan(tsv_lines, prompts, args.out_tsv, args.out_prompts)
+
 if __name__ == '__main__':
     main()
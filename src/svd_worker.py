@@ -0,0 +1,138 @@
+import os, sys, json, time, subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+# Stable Video Diffusion(img2vid) 워커
+# - 파이프라인은 실행당 한 번만 로드(지연 로드), 샷 목록 전체를 같은 파이프라인으로 처리
+# - loader 주입 가능 → 테스트에선 작은 스텁 파이프라인 사용
+# - 다른 venv에서 돌릴 땐 상주 프로세스 + stdin/stdout JSON 라인(WorkerProcess / serve)
+
+DEFAULT_MODEL = os.environ.get("SVD_MODEL", "stabilityai/stable-video-diffusion-img2vid")
+MARK = "@@SVD "     # 응답 라인 표식(그 외 stdout 출력은 로그로 통과)
+
+def load_pipeline(model: str = DEFAULT_MODEL, device: Optional[str] = None, cpu_offload: Optional[bool] = None,
+                  token: Optional[str] = None, **kw):
+    import torch
+    from diffusers import StableVideoDiffusionPipeline
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    variant = "fp16" if device == "cuda" else None
+    pipe = StableVideoDiffusionPipeline.from_pretrained(model, torch_dtype=dtype, variant=variant,
+                                                        token=token or os.getenv("HF_TOKEN"), **kw)
+    if cpu_offload:
+        pipe.enable_model_cpu_offload()
+    else:
+        pipe = pipe.to(device)
+    return pipe
+
+def num_frames_for(fps, seconds, lo=8, hi=48):
+    return max(lo, min(hi, int(round(fps * seconds))))
+
+class SvdWorker:
+    def __init__(self, model: str = DEFAULT_MODEL, loader: Callable[..., Any] = load_pipeline,
+                 decode_chunk_size: int = 8, **load_kw):
+        self.model = model
+        self.loader = loader
+        self.load_kw = load_kw
+        self.decode_chunk_size = decode_chunk_size
+        self._pipe = None
+        self.stats = {"loads": 0, "load_s": 0.0, "shots": 0, "gen_s": 0.0}
+
+    @property
+    def pipe(self):
+        if self._pipe is None:
+            t0 = time.time()
+            self._pipe = self.loader(self.model, **self.load_kw)
+            self.stats["loads"] += 1
+            self.stats["load_s"] += time.time() - t0
+        return self._pipe
+
+    def frames(self, image, num_frames: int, size=None, motion_bucket_id=127, noise_aug=0.1) -> List[Any]:
+        """image: 경로 또는 PIL.Image → PIL 프레임 리스트."""
+        from PIL import Image
+        if not hasattr(image, "convert"):
+            image = Image.open(image)
+        image = image.convert("RGB")
+        if size:
+            image = image.resize(tuple(size), Image.LANCZOS)
+        t0 = time.time()
+        out = self.pipe(
+            image=image,
+            decode_chunk_size=self.decode_chunk_size,
+            num_frames=int(num_frames),
+            motion_bucket_id=int(motion_bucket_id),
+            noise_aug_strength=float(noise_aug),
+        ).frames[0]
+        self.stats["shots"] += 1
+        self.stats["gen_s"] += time.time() - t0
+        return out
+
+    def render(self, png, mp4, fps, seconds, size, encode: Callable[..., Any],
+               motion_bucket_id=127, noise_aug=0.1, max_frames=48):
+        """한 샷: 프레임 생성 → encode(frames, mp4, fps, seconds)."""
+        frames = self.frames(png, num_frames_for(fps, seconds, hi=max_frames), size, motion_bucket_id, noise_aug)
+        encode(frames, mp4, fps, seconds)
+        return mp4
+
+    def run(self, shots: List[Dict[str, Any]], encode: Callable[..., Any], **kw) -> List[Dict[str, Any]]:
+        """shots: [{"png","mp4","fps","seconds","size"}] → [{"mp4", "ok", "error"?}] (샷 실패는 기록만)."""
+        results = []
+        for s in shots:
+            try:
+                self.render(s["png"], s["mp4"], s["fps"], s["seconds"], s.get("size"), encode, **kw)
+                results.append({"mp4": s["mp4"], "ok": True})
+            except Exception as e:
+                results.append({"mp4": s["mp4"], "ok": False, "error": f"{type(e).__name__}: {e}"})
+        return results
+
+# ---------- 상주 프로세스(파이프) ----------
+def serve(handle: Callable[[Dict[str, Any]], Dict[str, Any]], stdin=None, stdout=None):
+    """JSON 한 줄 요청 → handle(req) → MARK + JSON 한 줄 응답. EOF 또는 {"cmd":"quit"}에서 종료."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+            if req.get("cmd") == "quit":
+                break
+            resp = dict(handle(req) or {}, ok=True)
+        except Exception as e:
+            resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        stdout.write(MARK + json.dumps(resp, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+class WorkerProcess:
+    """serve()를 도는 자식 프로세스 클라이언트(예: SVD 전용 venv의 python)."""
+    def __init__(self, argv: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
+        self.proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                     bufsize=1, cwd=cwd, env=env)
+
+    def call(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        if self.proc.poll() is not None:
+            raise RuntimeError(f"SVD worker exited ({self.proc.returncode})")
+        self.proc.stdin.write(json.dumps(req, ensure_ascii=False) + "\n")
+        self.proc.stdin.flush()
+        for line in self.proc.stdout:
+            if line.startswith(MARK):
+                resp = json.loads(line[len(MARK):])
+                if not resp.get("ok"):
+                    raise RuntimeError(resp.get("error", "SVD worker error"))
+                return resp
+            print(line, end="")
+        raise RuntimeError(f"SVD worker exited ({self.proc.wait()})")
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.write(json.dumps({"cmd": "quit"}) + "\n")
+                self.proc.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+            self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
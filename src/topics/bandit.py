@@ -1,5 +1,26 @@
-import json, pathlib, random
+import argparse, csv, json, math, os, pathlib, random
+import numpy as np
+
+# 카테고리/소스 Thompson sampling
+# - 상태: {arm: {"alpha", "beta"}} — 카테고리 arm은 카테고리 이름, 소스 arm은 "source:<이름>"
+# - 선택 실행마다 arm당 샘플 하나를 한 번의 rng.beta 호출로 뽑아 후보에 브로드캐스트
+# - 성과 피드백(조회수/유지율 JSONL·CSV)을 배치로 받아 alpha += r, beta += 1-r (r ∈ [0,1])
+#   배치마다 상태 + 체크포인트(처리한 피드백 키) 저장 → 재실행해도 중복 반영 없음
+#   (상태가 .db면 체크포인트는 meta 테이블에 같은 트랜잭션으로)
+#
+#   python -m src.topics.bandit update --state data/topics.db --feedback exports/analytics.csv
+#   python -m src.topics.bandit show --state data/topics.db
+
+SOURCE_PREFIX = 'source:'
+PRIOR = {"alpha": 1.0, "beta": 1.0}
+
+def _is_db(path) -> bool:
+    return str(path).endswith(('.db', '.sqlite'))
 def load_state(path: str):
+    if _is_db(path):
+        from .store import TopicStore
+        with TopicStore(path) as st:
+            return st.load_bandit()
     p = pathlib.Path(path)
     if not p.exists() or p.stat().st_size == 0:
         return {}
@@ -8,7 +29,191 @@ def load_state(path: str):
     except Exception:
         return {}
 def save_state(path: str, state):
-    pathlib.Path(path).write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    if _is_db(path):
+        from .store import TopicStore
+        with TopicStore(path) as st:
+            return st.save_bandit(state)
+    p = pathlib.Path(path)
+    tmp = p.with_name(p.name + f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, p)
 def boost(category: str, state: dict) -> float:
-    ab = state.get(category, {"alpha":1, "beta":1})
+    ab = state.get(category, PRIOR)
     return 0.1 * (random.betavariate(ab['alpha'], ab['beta']) - 0.5)
+
+def _codes(labels):
+    ids = {}
+    codes = np.fromiter((ids.setdefault(x, len(ids)) for x in labels), dtype=np.int64)
+    return codes, list(ids)
+
+def sample_arms(arms, state: dict, rng=None) -> np.ndarray:
+    """arm 목록 → 각 arm의 Thompson 샘플(한 번의 rng.beta 호출)."""
+    rng = rng or np.random.default_rng()
+    a = np.array([float(state.get(k, PRIOR)['alpha']) for k in arms])
+    b = np.array([float(state.get(k, PRIOR)['beta']) for k in arms])
+    return rng.beta(a, b) if len(arms) else np.zeros(0)
+
+def boosts(categories, state: dict, rng=None, sources=None, source_weight: float = 0.05):
+    """카테고리(선택: 소스) 목록 → 후보별 boost. arm당 샘플 하나를 모든 후보에 브로드캐스트."""
+    rng = rng or np.random.default_rng()
+    codes, cats = _codes(categories)
+    out = 0.1 * (sample_arms(cats, state, rng)[codes] - 0.5) if len(codes) else np.zeros(0)
+    if sources is not None and len(codes):
+        scodes, srcs = _codes(sources)
+        arms = [SOURCE_PREFIX + str(s) for s in srcs]
+        out = out + source_weight * (sample_arms(arms, state, rng)[scodes] - 0.5)
+    return out
+
+# ---------- 피드백 ----------
+def read_feedback(path):
+    """JSONL 또는 헤더 있는 CSV(유튜브 분석 내보내기 등) → 행 목록."""
+    lines = [l for l in pathlib.Path(path).read_text(encoding='utf-8-sig').splitlines() if l.strip()]
+    if lines and lines[0].lstrip().startswith('{'):
+        return [json.loads(l) for l in lines]
+    return [dict(r) for r in csv.DictReader(lines)]
+
+def _num(row, *keys):
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, ''):
+            try:
+                return float(str(v).replace(',', '').rstrip('%'))
+            except ValueError:
+                pass
+    return float('nan')
+
+def feedback_key(row) -> str:
+    for k in ('video_id', 'id', 'topic_id'):
+        if row.get(k):
+            return f'{k}:{row[k]}'
+    return f"title:{row.get('title', '')}|{row.get('published_at') or row.get('date') or ''}"
+
+def rewards(views: np.ndarray, retention: np.ndarray, views_target: float = 10000.0, w_views: float = 0.5):
+    """조회수(로그, views_target에서 1) + 평균 유지율(0~1 또는 %) → 보상 [0,1]. 없는 값은 다른 쪽만 사용."""
+    v = np.clip(np.log1p(np.maximum(views, 0)) / math.log1p(views_target), 0, 1)
+    ret = np.where(retention > 1, retention / 100.0, retention)
+    ret = np.clip(ret, 0, 1)
+    r = w_views * v + (1 - w_views) * ret
+    r = np.where(np.isnan(v), ret, np.where(np.isnan(ret), v, r))
+    return r
+
+def decay_state(state: dict, decay: float):
+    """기존 증거를 prior 쪽으로 감쇠(비정상 환경용)."""
+    for arm, ab in state.items():
+        state[arm] = {k: round(PRIOR[k] + decay * (float(ab[k]) - PRIOR[k]), 6) for k in ('alpha', 'beta')}
+    return state
+
+def apply_batch(state: dict, arms, r: np.ndarray):
+    """arm별로 보상 합/실패 합을 모아(np.add.at) 한 번에 반영."""
+    codes, uniq = _codes(arms)
+    wins = np.zeros(len(uniq))
+    losses = np.zeros(len(uniq))
+    np.add.at(wins, codes, r)
+    np.add.at(losses, codes, 1 - r)
+    for k, arm in enumerate(uniq):
+        ab = state.get(arm, PRIOR)
+        state[arm] = {"alpha": round(float(ab['alpha']) + wins[k], 6), "beta": round(float(ab['beta']) + losses[k], 6)}
+    return state
+
+def _checkpoint_path(state_path, checkpoint=None):
+    return pathlib.Path(checkpoint) if checkpoint else pathlib.Path(str(state_path) + '.feedback.json')
+
+def update_from_feedback(state_path, feedback_path, batch: int = 1000, views_target: float = 10000.0,
+                         w_views: float = 0.5, decay: float = 1.0, checkpoint=None, lookup=None):
+    """
+    피드백 파일을 batch 행씩 반영. 행에 category/source가 없으면 lookup(title) → {"category","source"}로 보충.
+    반환: {"rows", "applied", "skipped"}
+    """
+    store = None
+    if _is_db(state_path) and checkpoint is None:
+        # DB 상태: 체크포인트는 meta 테이블, 상태와 같은 트랜잭션으로 저장
+        from .store import TopicStore
+        store = TopicStore(state_path)
+        seen = store.feedback_seen()
+        state = store.load_bandit()
+    else:
+        ck = _checkpoint_path(state_path, checkpoint)
+        seen = set(json.loads(ck.read_text(encoding='utf-8')).get('seen', [])) if ck.exists() else set()
+        state = load_state(state_path)
+    try:
+        return _update(state_path, state, seen, store, None if store else ck, feedback_path,
+                       batch, views_target, w_views, decay, lookup)
+    finally:
+        if store is not None:
+            store.close()
+
+def _update(state_path, state, seen, store, ck, feedback_path, batch, views_target, w_views, decay, lookup):
+    rows = read_feedback(feedback_path)
+    todo = []
+    for row in rows:
+        key = feedback_key(row)
+        if key in seen:
+            continue
+        if not row.get('category') and lookup and row.get('title'):
+            row = {**(lookup(row['title']) or {}), **{k: v for k, v in row.items() if v not in (None, '')}}
+        if not row.get('category'):
+            continue
+        todo.append((key, row))
+    applied = 0
+    if todo and decay < 1.0:
+        decay_state(state, decay)
+    for s in range(0, len(todo), batch):
+        chunk = todo[s:s + batch]
+        views = np.array([_num(r, 'views', 'view_count', 'Views') for _, r in chunk])
+        ret = np.array([_num(r, 'retention', 'avg_view_percentage', 'Average percentage viewed (%)') for _, r in chunk])
+        r = rewards(views, ret, views_target, w_views)
+        ok = ~np.isnan(r)
+        arms = [row['category'] for (_, row), m in zip(chunk, ok) if m]
+        src = [(SOURCE_PREFIX + row['source'], x) for (_, row), x, m in zip(chunk, r, ok) if m and row.get('source')]
+        apply_batch(state, arms, r[ok])
+        if src:
+            apply_batch(state, [a for a, _ in src], np.array([x for _, x in src]))
+        # 지표가 아직 없는(NaN) 행은 체크포인트하지 않음 → 나중 내보내기에서 다시 반영
+        done = [k for (k, _), m in zip(chunk, ok) if m]
+        seen.update(done)
+        if store is not None:
+            store.save_bandit(state, done)
+        else:
+            save_state(state_path, state)
+            tmp = ck.with_name(ck.name + '.tmp')
+            tmp.write_text(json.dumps({'seen': sorted(seen)}, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp, ck)
+        applied += int(ok.sum())
+    return {"rows": len(rows), "applied": applied, "skipped": len(rows) - applied}
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    up = sub.add_parser('update')
+    up.add_argument('--state', required=True)       # bandit_state.json 또는 topics.db
+    up.add_argument('--feedback', required=True)    # JSONL/CSV: title, category, source, views, retention
+    up.add_argument('--batch', type=int, default=1000)
+    up.add_argument('--views-target', type=float, default=10000.0)
+    up.add_argument('--w-views', type=float, default=0.5)
+    up.add_argument('--decay', type=float, default=1.0)   # <1: 실행마다 예전 증거 감쇠
+    up.add_argument('--checkpoint', default=None)
+    up.add_argument('--db', default=None)           # 선택 기록에서 category/source 보충
+    sh = sub.add_parser('show')
+    sh.add_argument('--state', required=True)
+    args = ap.parse_args()
+    if args.cmd == 'update':
+        lookup, store = None, None
+        db = args.db or (args.state if _is_db(args.state) else None)
+        if db:
+            from .store import TopicStore
+            store = TopicStore(db)
+            lookup = store.lookup_pick
+        try:
+            res = update_from_feedback(args.state, args.feedback, args.batch, args.views_target,
+                                       args.w_views, args.decay, args.checkpoint, lookup)
+        finally:
+            if store is not None:
+                store.close()
+        print(json.dumps(res))
+    state = load_state(args.state)
+    for arm, ab in sorted(state.items()):
+        a, b = float(ab['alpha']), float(ab['beta'])
+        print(f'{arm:32s} alpha={a:8.2f} beta={b:8.2f} mean={a / (a + b):.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse, random, time, datetime as dt
+from .diversify import History
+
+# 히스토리 인덱스 벤치마크: 쿨다운 + 주간 쿼터 체크
+#   python -m src.topics.bench_history --history 100000 --candidates 1000000
+# 기존(전체 스캔) 구현은 --legacy-sample 개만 돌려서 후보 수만큼 외삽
+
+class LegacyHistory:
+    """인덱스 이전 구현(호출마다 전체 행 스캔 + fromisoformat)."""
+    def __init__(self, rows):
+        self.rows = rows
+    def recent(self, days=14, today=None):
+        return [r for r in self.rows if (today - dt.date.fromisoformat(r['picked_at'][:10])).days <= days]
+    def count_weekly(self, category, today=None):
+        start = today - dt.timedelta(days=today.weekday())
+        end = start + dt.timedelta(days=6)
+        return sum(1 for r in self.rows
+                   if r['category'] == category and start <= dt.date.fromisoformat(r['picked_at'][:10]) <= end)
+
+def make_rows(n, cats, today, span_days, rng):
+    return [{'picked_at': (today - dt.timedelta(days=rng.randrange(span_days))).isoformat() + 'T09:00:00',
+             'category': rng.choice(cats), 'title': f't{i}'} for i in range(n)]
+
+def check_new(h, c, cooldown, maxw, today):
+    return not h.in_cooldown(c, cooldown, today) and h.count_weekly(c, today) < maxw
+
+def check_legacy(h, c, cooldown, maxw, today):
+    if any(r['category'] == c for r in h.recent(cooldown, today)):
+        return False
+    return h.count_weekly(c, today) < maxw
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--history', type=int, default=100_000)
+    ap.add_argument('--candidates', type=int, default=1_000_000)
+    ap.add_argument('--categories', type=int, default=40)
+    ap.add_argument('--span-days', type=int, default=3650)
+    ap.add_argument('--cooldown', type=int, default=3)
+    ap.add_argument('--max-weekly', type=int, default=3)
+    ap.add_argument('--legacy-sample', type=int, default=20)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    today = dt.date.today()
+    cats = [f'cat{i}' for i in range(args.categories)]
+    rows = make_rows(args.history, cats, today, args.span_days, rng)
+    cands = [rng.choice(cats) for _ in range(args.candidates)]
+
+    t0 = time.perf_counter()
+    h = History(rows)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ok = sum(check_new(h, c, args.cooldown, args.max_weekly, today) for c in cands)
+    t_new = time.perf_counter() - t0
+
+    legacy = LegacyHistory(rows)
+    sample = cands[:args.legacy_sample]
+    t0 = time.perf_counter()
+    ok_legacy = [check_legacy(legacy, c, args.cooldown, args.max_weekly, today) for c in sample]
+    t_legacy = (time.perf_counter() - t0) / max(1, len(sample))
+    same = ok_legacy == [check_new(h, c, args.cooldown, args.max_weekly, today) for c in sample]
+
+    print(f'history={args.history:,} candidates={args.candidates:,} categories={args.categories}')
+    print(f'index build     : {t_build:.3f}s')
+    print(f'indexed checks  : {t_new:.3f}s ({t_new / max(1, len(cands)) * 1e6:.2f}us/candidate, pass={ok:,})')
+    print(f'legacy checks   : {t_legacy * 1e3:.2f}ms/candidate → ~{t_legacy * len(cands) / 3600:.1f}h estimated')
+    print(f'legacy agrees   : {same} (sample={len(sample)})')
+
+if __name__ == '__main__':
+    main()
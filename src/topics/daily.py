@@ -1,27 +1,37 @@
 import argparse, json, yaml, pathlib, datetime as dt
-from .scorer import base_score, jaccard_sim
+import numpy as np
+from .scorer import jaccard_sim, signal_matrix, base_scores, ranked
 from .diversify import History
+from .similarity import TitleIndex
+from .store import TopicStore, read_history_file
 from . import bandit
 
-def pass_constraints(c, cfg, hist: History, today):
+def category_ok(cat, cfg, hist: History, today):
     cats = cfg['categories']
-    cons = cfg.get('constraints', {})
-    cat = c['category']
     # cooldown
     cooldown = cats.get(cat,{}).get('cooldown_days', 0)
-    for r in hist.recent(days=cooldown, today=today):
-        if r['category']==cat:
-            return False
+    if hist.in_cooldown(cat, cooldown, today):
+        return False
     # weekly quota
     maxw = cats.get(cat,{}).get('max_weekly', 99)
     if hist.count_weekly(cat, today) >= maxw:
         return False
+    return True
+
+def pass_constraints(c, cfg, hist: History, today, sim: TitleIndex = None):
+    cons = cfg.get('constraints', {})
+    if not category_ok(c['category'], cfg, hist, today):
+        return False
     # similarity to recent
-    recents = hist.recent(days=cons.get('recent_days_for_similarity',14), today=today)
+    days = cons.get('recent_days_for_similarity',14)
     th = cons.get('similarity_threshold', 0.8)
-    for r in recents:
-        if jaccard_sim(c['title'], r['title']) >= th:
+    if sim is not None:
+        if sim.similar(c['title'], th, since=today - dt.timedelta(days=days)):
             return False
+    else:
+        for r in hist.recent(days=days, today=today):
+            if jaccard_sim(c['title'], r['title']) >= th:
+                return False
     # banned terms
     for b in cfg.get('banned_terms', []):
         if b in c['title']:
@@ -31,11 +41,40 @@ def pass_constraints(c, cfg, hist: History, today):
 parser = argparse.ArgumentParser()
 parser.add_argument('--topics', required=True)  # topics.yml
 parser.add_argument('--constraints', required=True)  # constraints.yml
-parser.add_argument('--history', required=True)
-parser.add_argument('--bandit', required=True)
+parser.add_argument('--history', required=False)  # 예전 JSONL/CSV 히스토리(--db가 있으면 한 번 가져옴)
+parser.add_argument('--bandit', required=False)   # 없으면 --db의 bandit 테이블
+parser.add_argument('--db', default=None)          # SQLite 저장소(후보/선택/bandit), 예: data/topics.db
 parser.add_argument('--candidates', required=False)  # optional prebuilt
+parser.add_argument('--title-index', default=None)  # MinHash/LSH 제목 인덱스 파일(--db가 있을 때만, 기본 <db>.title_index.jsonl)
 parser.add_argument('--out', required=True)
 parser.add_argument('--target', type=int, default=None)
+parser.add_argument('--select', choices=['greedy','mmr'], default='greedy')  # mmr: 배치 내 다양성 + 소프트 쿼터
+parser.add_argument('--mmr-lambda', type=float, default=0.7)      # 1이면 점수만, 0이면 다양성만
+parser.add_argument('--quota-strength', type=float, default=0.1)  # 카테고리/언어 쿼터 가산 크기
+
+
+def select_mmr(cands, final, cfg, hist, today, sim, target, lam, strength):
+    from .mmr import ngram_tfidf, quota_group, mmr_select, LANGS   # scipy는 --select mmr 일 때만
+    X, lang = ngram_tfidf([c.get('title','') for c in cands])
+    ids = {}
+    codes = np.fromiter((ids.setdefault(c['category'], len(ids)) for c in cands), dtype=np.int64, count=len(cands))
+    labels = list(ids)
+    weights = {k: v.get('weight', 0) for k, v in cfg['categories'].items()}
+    mix = cfg.get('constraints', {}).get('language_mix') or cfg.get('language_mix') or {}
+    groups = [quota_group(codes, labels, weights, strength)]
+    if mix:
+        groups.append(quota_group(lang, LANGS, mix, strength))
+    # 카테고리 단위 제약(쿨다운/주간)은 미리 걸러 둠 → 나머지는 고를 때 검사
+    cat_ok = np.array([category_ok(l, cfg, hist, today) for l in labels], dtype=bool)
+    mask = cat_ok[codes] if len(labels) else np.zeros(0, dtype=bool)
+
+    def accept(i):
+        if not pass_constraints(cands[i], cfg, hist, today, sim):
+            return False
+        sim.add(cands[i]['title'], today, save=False)
+        return True
+
+    return mmr_select(X, final, target, lam, groups, accept, mask)
 
 
 def main():
@@ -43,12 +82,24 @@ def main():
     tcfg = yaml.safe_load(open(args.topics, 'r', encoding='utf-8'))
     cons = yaml.safe_load(open(args.constraints, 'r', encoding='utf-8'))
     cfg = {**tcfg, **cons}
-    hist_path = pathlib.Path(args.history)
-    if hist_path.exists():
-        rows = [json.loads(l) for l in hist_path.read_text(encoding='utf-8').splitlines() if l.strip()]
+    today = dt.date.today()
+    store = TopicStore(args.db) if args.db else None
+    if store is not None:
+        if args.history:
+            store.import_history(args.history)
+        # 제약에 필요한 구간만 읽음(쿨다운/유사도 기간, 이번 주)
+        days = max([7, cons.get('constraints', {}).get('recent_days_for_similarity', 14)] +
+                   [v.get('cooldown_days', 0) for v in tcfg['categories'].values()])
+        rows = store.history_rows(since=today - dt.timedelta(days=days))
     else:
-        rows = []
+        rows = read_history_file(args.history) if args.history else []
     hist = History(rows)
+    # 제목 인덱스 파일은 선택이 기록될 때(--db)만 DB별로(<db>.title_index.jsonl) 유지, 없으면 히스토리로 매번 메모리에 구성
+    # 이번 선택은 메모리에만 넣고(save=False), 파일에는 다음 실행의 sync가 저장소 기록에서 추가
+    th = cons.get('constraints', {}).get('similarity_threshold', 0.8)
+    sim = (TitleIndex.load(args.title_index or f'{args.db}.title_index.jsonl', th) if store is not None
+           else TitleIndex(None, th))
+    sim.sync(hist.rows)
 
     # load candidates
     if args.candidates:
@@ -56,30 +107,42 @@ def main():
     else:
         # fallback to run_all default
         tmp = pathlib.Path('data')/f'candidates_{dt.datetime.now().strftime("%H%M%S")}.jsonl'
-        import subprocess
-        subprocess.check_call(['python','-m','src.topics.sources.run_all','--config','configs/sources.yml','--out',str(tmp)])
-        cands = [json.loads(l) for l in tmp.read_text(encoding='utf-8').splitlines() if l.strip()]
-
-    # score
-    bstate = bandit.load_state(args.bandit)
-    for c in cands:
-        c['base'] = base_score(c.get('signals',{}))
-        c['final'] = c['base'] + bandit.boost(c['category'], bstate)
+        from .sources import run_all
+        _, _, run_id = run_all.run('configs/sources.yml', tmp, db=args.db)
+        if store is not None:
+            cands = store.candidates(run_id)    # 이번 실행(run_id)의 후보를 저장소에서
+        else:
+            cands = [json.loads(l) for l in tmp.read_text(encoding='utf-8').splitlines() if l.strip()]
 
-    cands.sort(key=lambda x: -x['final'])
+    # score (컬럼 단위: 신호 행렬 @ 가중치 + 카테고리/소스 arm별 Thompson 샘플)
+    bstate = bandit.load_state(args.bandit) if args.bandit else (store.load_bandit() if store else {})
+    base = base_scores(signal_matrix(cands))
+    final = base + bandit.boosts([c['category'] for c in cands], bstate,
+                                 sources=[c.get('source') or '' for c in cands])
 
-    today = dt.date.today()
+    # 점수 순으로 힙에서 꺼내며 target이 찰 때까지만 제약 검사
     target = args.target or tcfg.get('target_daily', 5)
     picked = []
-    for c in cands:
-        if pass_constraints(c, cfg, hist, today):
-            picked.append(c)
-        if len(picked) >= target:
-            break
+    if args.select == 'mmr':
+        for i in select_mmr(cands, final, cfg, hist, today, sim, target, args.mmr_lambda, args.quota_strength):
+            cands[i]['base'], cands[i]['final'] = float(base[i]), float(final[i])
+            picked.append(cands[i])
+    else:
+        for i in ranked(final):
+            if len(picked) >= target:
+                break
+            c = cands[i]
+            if pass_constraints(c, cfg, hist, today, sim):
+                c['base'], c['final'] = float(base[i]), float(final[i])
+                picked.append(c)
+                sim.add(c['title'], today, save=False)
 
     outp = pathlib.Path(args.out)
     outp.parent.mkdir(parents=True, exist_ok=True)
     outp.write_text('\n'.join(json.dumps(x, ensure_ascii=False) for x in picked), encoding='utf-8')
+    if store is not None:
+        store.add_picks(picked, today)
+        store.close()
 
 if __name__ == '__main__':
     main()
@@ -1,25 +1,59 @@
 import datetime as dt
-from typing import List, Dict, Any
+from bisect import bisect_left
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+# 히스토리는 한 번만 파싱해서 인덱싱
+#   _ords: 정렬된 날짜 서수 배열 → recent()는 bisect 슬라이스 O(log n + k)
+#   _weekly[(category, 주 시작 서수)] → count_weekly() O(1)
+#   _last[category] = 가장 늦은 선택일 → 쿨다운 O(1)
+
+def _ord(picked_at: str) -> int:
+    return dt.date.fromisoformat(picked_at[:10]).toordinal()
+
+def _week(o: int) -> int:
+    return o - dt.date.fromordinal(o).weekday()
 
 class History:
     def __init__(self, rows: List[Dict[str, Any]]):
-        self.rows = rows
+        keyed = sorted(((_ord(r['picked_at']), i, r) for i, r in enumerate(rows)), key=lambda x: (x[0], x[1]))
+        self.rows = [r for _, _, r in keyed]
+        self._ords = [o for o, _, _ in keyed]
+        self._weekly = Counter()
+        self._last: Dict[str, int] = {}
+        for o, _, r in keyed:
+            self._index(o, r)
+
+    def _index(self, o, r):
+        cat = r.get('category')
+        self._weekly[(cat, _week(o))] += 1
+        if o > self._last.get(cat, -1):
+            self._last[cat] = o
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row: Dict[str, Any]):
+        o = _ord(row['picked_at'])
+        k = bisect_left(self._ords, o + 1)
+        self._ords.insert(k, o)
+        self.rows.insert(k, row)
+        self._index(o, row)
+
     def recent(self, days=14, today=None):
         today = today or dt.date.today()
-        res=[]
-        for r in self.rows:
-            d = dt.date.fromisoformat(r['picked_at'][:10])
-            if (today - d).days <= days:
-                res.append(r)
-        return res
+        return self.rows[bisect_left(self._ords, today.toordinal() - days):]
+
     def count_weekly(self, category, today=None):
         today = today or dt.date.today()
-        start = today - dt.timedelta(days=today.weekday())
-        end = start + dt.timedelta(days=6)
-        c=0
-        for r in self.rows:
-            d = dt.date.fromisoformat(r['picked_at'][:10])
-            if r['category']==category and start<=d<=end:
-                c+=1
-        return c
+        return self._weekly.get((category, _week(today.toordinal())), 0)
 
+    def last_picked(self, category) -> Optional[dt.date]:
+        o = self._last.get(category)
+        return dt.date.fromordinal(o) if o is not None else None
+
+    def in_cooldown(self, category, days, today=None):
+        """최근 days일 안에(미래 날짜 포함) 같은 카테고리를 뽑았는지."""
+        today = today or dt.date.today()
+        o = self._last.get(category)
+        return o is not None and o >= today.toordinal() - days
@@ -0,0 +1,97 @@
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+
+# 다양성 고려 배치 선택 (MMR)
+#   score_i = λ·rel_i − (1−λ)·max_{j∈선택} cos(i, j) + Σ_그룹 γ·부족분
+# - 유사도: 문자 바이그램 TF-IDF(similarity.shingles와 같은 정규화), L2 정규화 CSR
+#   → 한 번 고를 때마다 희소 행렬 × 벡터 한 번으로 전체 후보의 max_sim 갱신
+# - 카테고리 weight / 언어 비율은 소프트 쿼터: 목표 대비 모자란 그룹은 가산, 넘친 그룹은 감산
+# - accept(i)가 False면(히스토리 제약 등) 그 후보만 뺌. 거절로는 점수가 안 바뀌므로 다시 계산하지 않고
+#   같은 점수의 상위 REJECT_BATCH개를 차례로 검사(다 거절되면 다음 묶음)
+
+WORD_RE = re.compile(r'[0-9a-z가-힣]+')
+SEP = 0                                  # 제목 경계(코드포인트 0)
+LANGS = ('ko', 'en', 'other')
+REJECT_BATCH = 64
+
+def normalize(title: str) -> str:
+    return ' '.join(WORD_RE.findall((title or '').lower()))
+
+def ngram_tfidf(titles: Sequence[str]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """제목들 → (L2 정규화 TF-IDF CSR (n, vocab), 언어 코드 배열 LANGS 인덱스)."""
+    n = len(titles)
+    norm = [normalize(t) for t in titles]
+    cp = np.frombuffer(('\0'.join(norm) + '\0').encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    row = np.repeat(np.arange(n), [len(s) + 1 for s in norm])
+    # 언어: 한글이 있으면 ko, 라틴 문자만 있으면 en
+    hangul = np.bincount(row, weights=((cp >= 0xAC00) & (cp <= 0xD7A3)), minlength=n)
+    latin = np.bincount(row, weights=((cp >= 0x61) & (cp <= 0x7A)), minlength=n)
+    lang = np.where(hangul > 0, 0, np.where(latin > 0, 1, 2))
+    # 바이그램 = (앞 코드포인트 << 21) | 뒤 코드포인트, 경계를 걸치는 쌍은 제외
+    a, b = cp[:-1], cp[1:]
+    keep = (a != SEP) & (b != SEP)
+    grams, r = (a[keep] << np.uint64(21)) | b[keep], row[:-1][keep]
+    # 한 글자 제목은 그 글자 자체를 특징으로
+    single = np.flatnonzero(np.array([len(s) == 1 for s in norm], dtype=bool))
+    if single.size:
+        grams = np.concatenate([grams, cp[np.searchsorted(row, single)]])
+        r = np.concatenate([r, single])
+    vocab, col = np.unique(grams, return_inverse=True)
+    X = sparse.csr_matrix((np.ones(len(col)), (r, col)), shape=(n, len(vocab)))   # 중복 (행, 열)은 합산 → tf
+    X.sum_duplicates()
+    df = np.bincount(X.indices, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+    X.data = X.data * idf[X.indices]
+    rn = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    rn[rn == 0] = 1.0
+    X = sparse.csr_matrix(sparse.diags(1.0 / rn) @ X)
+    return X, lang
+
+def quota_group(codes: np.ndarray, labels: Sequence[str], weights: dict, strength: float):
+    """(codes, 목표 비율 배열, γ) — weights에 없는 라벨은 목표 0(소프트하게 억제)."""
+    w = np.array([float(weights.get(l, 0.0)) for l in labels])
+    if w.sum() > 0:
+        w = w / w.sum()
+    return np.asarray(codes), w, float(strength)
+
+def mmr_select(X: sparse.csr_matrix, rel: np.ndarray, k: int, lam: float = 0.7,
+               groups: Sequence[tuple] = (), accept: Optional[Callable[[int], bool]] = None,
+               mask: Optional[np.ndarray] = None) -> List[int]:
+    n = X.shape[0]
+    rel = np.asarray(rel, dtype=np.float64)
+    lo, hi = (rel.min(), rel.max()) if n else (0.0, 0.0)
+    rel = (rel - lo) / (hi - lo) if hi > lo else np.zeros(n)
+    alive = np.ones(n, dtype=bool) if mask is None else np.asarray(mask, dtype=bool).copy()
+    max_sim = np.zeros(n)
+    counts = [np.zeros(len(w)) for _, w, _ in groups]
+    picked: List[int] = []
+    while len(picked) < k and alive.any():
+        score = lam * rel - (1 - lam) * max_sim
+        m = len(picked) + 1
+        for (codes, w, g), cnt in zip(groups, counts):
+            score += g * np.clip(w * m - cnt, -1.0, 1.0)[codes]
+        score[~alive] = -np.inf
+        i = _first_accepted(score, alive, accept)
+        if i < 0:
+            break
+        picked.append(i)
+        for (codes, _, _), cnt in zip(groups, counts):
+            cnt[codes[i]] += 1
+        np.maximum(max_sim, X @ X.getrow(i).T.toarray().ravel(), out=max_sim)
+    return picked
+
+def _first_accepted(score: np.ndarray, alive: np.ndarray, accept: Optional[Callable[[int], bool]]) -> int:
+    """점수 순으로 accept를 통과하는 첫 후보(없으면 -1). 검사한 후보는 alive에서 뺌."""
+    while True:
+        live = np.flatnonzero(alive)
+        if not live.size:
+            return -1
+        b = min(REJECT_BATCH, live.size)
+        top = live[np.argpartition(-score[live], b - 1)[:b]]
+        top = top[np.lexsort((top, -score[top]))]          # 점수 내림차순, 동점은 앞 인덱스
+        for j in top:
+            alive[j] = False
+            if accept is None or accept(int(j)):
+                return int(j)
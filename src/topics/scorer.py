@@ -1,7 +1,29 @@
-from typing import Dict
+import heapq
+from typing import Dict, Iterator, List
+import numpy as np
+
+SIGNAL_KEYS = ('trend', 'search', 'freshness')
+SIGNAL_WEIGHTS = np.array([0.45, 0.35, 0.20])
+
 def base_score(signals: Dict[str, float]) -> float:
     return 0.45*signals.get('trend',0) + 0.35*signals.get('search',0) + 0.20*signals.get('freshness',0)
 def jaccard_sim(a: str, b: str) -> float:
     A = set(a.lower().split()); B = set(b.lower().split())
     if not A and not B: return 1.0
     return len(A & B) / max(1, len(A | B))
+
+# 후보 풀 컬럼화: 신호 행렬 (n, len(SIGNAL_KEYS)) → 기본 점수는 행렬-벡터 곱 한 번
+def signal_matrix(cands: List[dict]) -> np.ndarray:
+    flat = np.fromiter((float((c.get('signals') or {}).get(k, 0) or 0) for c in cands for k in SIGNAL_KEYS),
+                       dtype=np.float64, count=len(cands) * len(SIGNAL_KEYS))
+    return flat.reshape(len(cands), len(SIGNAL_KEYS))
+
+def base_scores(X: np.ndarray) -> np.ndarray:
+    return X @ SIGNAL_WEIGHTS
+
+def ranked(scores: np.ndarray) -> Iterator[int]:
+    """점수 내림차순 인덱스(동점은 입력 순서). heapify O(n) 후 필요한 만큼만 pop."""
+    heap = list(zip((-np.asarray(scores, dtype=np.float64)).tolist(), range(len(scores))))
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
@@ -0,0 +1,181 @@
+import re, json, zlib, base64, pathlib, datetime as dt
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# 제목 유사도 인덱스 (MinHash + LSH 밴딩)
+# - 문자 n-gram 셔글: 띄어쓰기·조사에 덜 민감(한글 제목은 공백 단어 Jaccard가 잘 안 맞음)
+# - 제목당 MinHash 서명은 한 번만 계산, 밴드 키 → 항목 id 버킷으로 후보만 추림
+# - 후보는 셔글 집합의 정확한 Jaccard로 다시 확인(LSH는 후보 추림에만 사용)
+# - 저장: JSON lines(첫 줄 파라미터 헤더), 선택될 때마다 한 줄 추가
+#
+#   idx = TitleIndex.load('data/title_index.jsonl', threshold=0.8)
+#   idx.sync(hist.rows)
+#   hit = idx.similar(title, since=today - timedelta(days=14))   # → (title, jaccard) | None
+
+NGRAM = 2
+NUM_PERM = 128
+MIN_RECALL = 0.99          # Jaccard == threshold 인 쌍이 후보로 잡힐 최소 확률
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX32 = np.uint64(0xFFFFFFFF)
+WORD_RE = re.compile(r'[0-9a-z가-힣]+')
+
+def shingles(title: str, n: int = NGRAM) -> frozenset:
+    s = ' '.join(WORD_RE.findall((title or '').lower()))
+    if len(s) <= n:
+        return frozenset([s]) if s else frozenset()
+    return frozenset(s[i:i + n] for i in range(len(s) - n + 1))
+
+def shingle_jaccard(a: str, b: str) -> float:
+    A, B = shingles(a), shingles(b)
+    if not A and not B:
+        return 1.0
+    return len(A & B) / max(1, len(A | B))
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM, min_recall: float = MIN_RECALL) -> Tuple[int, int]:
+    """(bands, rows): threshold에서 재현율 ≥ min_recall 을 만족하는 가장 긴 rows(후보 최소화)."""
+    for r in range(num_perm, 0, -1):
+        b = num_perm // r
+        if 1 - (1 - threshold ** r) ** b >= min_recall:
+            return b, r
+    return num_perm, 1
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, sh: Iterable[str]) -> Optional[np.ndarray]:
+        hv = np.fromiter((zlib.crc32(x.encode('utf-8')) for x in sh), dtype=np.uint64)
+        if hv.size == 0:
+            return None
+        with np.errstate(over='ignore'):
+            ph = (hv[:, None] * self.a + self.b) % _PRIME & _MAX32
+        return ph.min(axis=0).astype(np.uint32)
+
+class TitleIndex:
+    def __init__(self, path=None, threshold: float = 0.8, num_perm: int = NUM_PERM, ngram: int = NGRAM, seed: int = 1):
+        self.path = pathlib.Path(path) if path else None
+        self.threshold = float(threshold)
+        self.ngram = ngram
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands, self.rows = lsh_params(self.threshold, num_perm)
+        self.header = {'num_perm': num_perm, 'ngram': ngram, 'seed': seed,
+                       'bands': self.bands, 'rows': self.rows, 'threshold': self.threshold}
+        # 밴드 키: 행 값 × 고정 홀수 계수 합(uint64 랩어라운드) → 프로세스 간에도 같은 키
+        self._mult = np.random.RandomState(seed + 7).randint(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self.titles: List[str] = []
+        self.ords: List[int] = []
+        self.tables = [dict() for _ in range(self.bands)]
+        self._keys = set()
+
+    @classmethod
+    def load(cls, path, threshold: float = 0.8, **kw) -> 'TitleIndex':
+        idx = cls(path, threshold, **kw)
+        p = idx.path
+        if p is None or not p.exists():
+            return idx
+        with open(p, encoding='utf-8') as f:
+            head = f.readline()
+            try:
+                ok = json.loads(head) == idx.header
+            except ValueError:
+                ok = False
+            if not ok:      # 파라미터가 바뀌면 버리고 히스토리에서 다시 구성(sync)
+                return idx
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    e = json.loads(line)
+                    keys = np.frombuffer(base64.b64decode(e['b']), dtype=np.uint64)
+                    idx._insert(e['t'], dt.date.fromisoformat(e['d']).toordinal(), keys)
+                except (ValueError, KeyError):
+                    continue
+        return idx
+
+    def __len__(self):
+        return len(self.titles)
+
+    def band_keys(self, sig: np.ndarray) -> np.ndarray:
+        m = sig[:self.bands * self.rows].astype(np.uint64).reshape(self.bands, self.rows)
+        with np.errstate(over='ignore'):
+            return (m * self._mult).sum(axis=1, dtype=np.uint64)
+
+    def _keys_for(self, title: str) -> Optional[np.ndarray]:
+        sig = self.hasher.signature(shingles(title, self.ngram))
+        return None if sig is None else self.band_keys(sig)
+
+    def _insert(self, title, o, keys):
+        i = len(self.titles)
+        self.titles.append(title)
+        self.ords.append(o)
+        self._keys.add((title, o))
+        if keys is not None:
+            for t, k in zip(self.tables, keys.tolist()):
+                t.setdefault(k, []).append(i)
+        return i
+
+    def add(self, title: str, day: Optional[dt.date] = None, save: bool = True):
+        o = (day or dt.date.today()).toordinal()
+        if (title, o) in self._keys:
+            return
+        keys = self._keys_for(title)
+        self._insert(title, o, keys)
+        if save and self.path is not None:
+            self._append([(title, o, keys)])
+
+    def sync(self, rows: Sequence[dict]):
+        """히스토리 행 중 인덱스에 없는 제목만 추가(한 번에 기록)."""
+        new = []
+        for r in rows:
+            title, o = r.get('title') or '', dt.date.fromisoformat(r['picked_at'][:10]).toordinal()
+            if (title, o) in self._keys:
+                continue
+            keys = self._keys_for(title)
+            self._insert(title, o, keys)
+            new.append((title, o, keys))
+        if new and self.path is not None:
+            self._append(new)
+        return len(new)
+
+    def _append(self, items):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.path.exists() or self.path.stat().st_size == 0
+        if not fresh:
+            with open(self.path, encoding='utf-8') as f:
+                fresh = f.readline().strip() != json.dumps(self.header)
+        with open(self.path, 'w' if fresh else 'a', encoding='utf-8') as f:
+            if fresh:
+                # 헤더가 없거나 파라미터가 바뀜 → 현재 메모리 전체로 다시 씀
+                f.write(json.dumps(self.header) + '\n')
+                items = [(t, o, self._keys_for(t)) for t, o in zip(self.titles, self.ords)]
+            for title, o, keys in items:
+                b = base64.b64encode(keys.tobytes()).decode('ascii') if keys is not None else ''
+                f.write(json.dumps({'t': title, 'd': dt.date.fromordinal(o).isoformat(), 'b': b},
+                                   ensure_ascii=False) + '\n')
+
+    def candidates(self, title: str, since: Optional[dt.date] = None) -> List[int]:
+        keys = self._keys_for(title)
+        if keys is None:
+            return []
+        lo = since.toordinal() if since else None
+        seen = set()
+        for t, k in zip(self.tables, keys.tolist()):
+            for i in t.get(k, ()):
+                if lo is None or self.ords[i] >= lo:
+                    seen.add(i)
+        return sorted(seen)
+
+    def similar(self, title: str, threshold: Optional[float] = None,
+                since: Optional[dt.date] = None) -> Optional[Tuple[str, float]]:
+        """since 이후 제목 중 셔글 Jaccard ≥ threshold 인 첫 항목(정확 검증)."""
+        th = self.threshold if threshold is None else threshold
+        q = shingles(title, self.ngram)
+        for i in self.candidates(title, since):
+            s = shingles(self.titles[i], self.ngram)
+            j = len(q & s) / max(1, len(q | s))
+            if j >= th:
+                return self.titles[i], j
+        return None
@@ -1,5 +1,6 @@
+import importlib
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Callable
 
 @dataclass
 class Candidate:
@@ -17,3 +18,26 @@ class Candidate:
             "terms": self.terms,
             "source": self.source,
         }
+
+# 소스 플러그인 레지스트리
+# 각 소스 모듈은 @register('이름') 으로 async 생성기 함수를 등록한다:
+#   @register('seed_list')
+#   async def produce(file, category): ... yield Candidate(...)
+# 설정의 name이 아직 등록되지 않았으면 같은 이름의 모듈(src.topics.sources.<name>)을 import 해서 찾는다.
+SOURCES: Dict[str, Callable[..., AsyncIterator[Candidate]]] = {}
+
+def register(name: str):
+    def deco(fn):
+        SOURCES[name] = fn
+        return fn
+    return deco
+
+def get_source(name: str):
+    if name not in SOURCES:
+        try:
+            importlib.import_module(f'{__package__}.{name}')
+        except ImportError:
+            pass
+    if name not in SOURCES:
+        raise KeyError(f'unknown source: {name}')
+    return SOURCES[name]
@@ -1,28 +1,93 @@
-import argparse, yaml, subprocess, json, pathlib, tempfile
+import argparse, asyncio, json, os, pathlib, re, time
+import yaml
+from .base import get_source
+from ..store import TopicStore
+
+# 설정된 소스를 한 프로세스 안에서 async 태스크로 동시에 실행
+# - 소스 → asyncio.Queue → 병합기(제목 정규화 키로 중복 제거, 먼저 온 것 유지) → JSONL 즉시 기록
+# - 출력은 <out>.part 에 쓰고 끝나면 os.replace (동시 실행끼리 임시 파일이 겹치지 않음)
+# - 소스 하나가 실패해도 나머지는 계속, 소스별 개수/시간/오류는 stats로
+# - --db 가 있으면 같은 후보를 SQLite 저장소(run_id별)에도 기록
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--config', required=True)
 parser.add_argument('--out', required=True)
+parser.add_argument('--stats', default=None)  # 소스별 통계 JSON 경로(선택)
+parser.add_argument('--db', default=None)     # SQLite 저장소에도 후보 기록(선택)
+
+_DONE = object()
+
+def dedup_key(title: str) -> str:
+    return re.sub(r'\s+', ' ', (title or '').strip().lower())
+
+async def _pump(i, spec, queue, stats):
+    name = spec['name']
+    st = stats[i] = {'name': name, 'count': 0, 'seconds': 0.0, 'error': None}
+    t0 = time.perf_counter()
+    try:
+        async for c in get_source(name)(**(spec.get('args') or {})):
+            st['count'] += 1
+            await queue.put(c)
+    except Exception as e:
+        st['error'] = f'{type(e).__name__}: {e}'
+        print(f'[sources] {name} failed: {st["error"]}')
+    finally:
+        st['seconds'] = round(time.perf_counter() - t0, 3)
+        await queue.put(_DONE)
+
+async def run_sources(specs, out_path, store=None, run_id=None, batch=500):
+    """specs: [{'name':..., 'args': {...}}] → (기록한 후보 수, 소스별 통계).
+    store가 있으면 batch 개씩 트랜잭션으로 candidates 테이블에도 추가."""
+    out_path = pathlib.Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + f'.{os.getpid()}.part')
+    queue = asyncio.Queue(maxsize=1024)
+    stats = [None] * len(specs)
+    tasks = [asyncio.create_task(_pump(i, s, queue, stats)) for i, s in enumerate(specs)]
+    seen, written, pending, buf = set(), 0, len(tasks), []
+    with open(tmp, 'w', encoding='utf-8') as f:
+        while pending:
+            c = await queue.get()
+            if c is _DONE:
+                pending -= 1
+                continue
+            key = dedup_key(c.title)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            row = c.to_json()
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            written += 1
+            if store is not None:
+                buf.append(row)
+                if len(buf) >= batch:
+                    store.add_candidates(buf, run_id)
+                    buf = []
+    await asyncio.gather(*tasks)
+    if store is not None and buf:
+        store.add_candidates(buf, run_id)
+    os.replace(tmp, out_path)
+    for st in stats:
+        print(f"[sources] {st['name']}: {st['count']} in {st['seconds']:.2f}s" + (f" ({st['error']})" if st['error'] else ''))
+    return written, stats
+
+def run(config, out, stats_path=None, db=None):
+    """→ (기록한 후보 수, 소스별 통계, run_id). db가 있으면 같은 run_id로 candidates 테이블에도."""
+    cfg = yaml.safe_load(open(config, 'r', encoding='utf-8'))
+    store = TopicStore(db) if db else None
+    run_id = time.strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+    try:
+        written, stats = asyncio.run(run_sources(cfg.get('sources') or [], out, store, run_id))
+    finally:
+        if store is not None:
+            store.close()
+    if stats_path:
+        pathlib.Path(stats_path).write_text(json.dumps({'written': written, 'sources': stats}, ensure_ascii=False, indent=2), encoding='utf-8')
+    return written, stats, run_id
 
 def main():
     args = parser.parse_args()
-    cfg = yaml.safe_load(open(args.config, 'r', encoding='utf-8'))
-    out_dir = pathlib.Path(args.out).parent
-    out_dir.mkdir(parents=True, exist_ok=True)
-    merged = []
-    for i, s in enumerate(cfg['sources']):
-        name = s['name']
-        a = s.get('args', {})
-        tmp = pathlib.Path(tempfile.gettempdir())/f"cands_{i}.jsonl"
-        if name == 'seed_list':
-            cmd = ['python','-m','src.topics.sources.seed_list','--file',a['file'],'--category',a['category'],'--out',str(tmp)]
-        elif name == 'youtube_suggest':
-            cmd = ['python','-m','src.topics.sources.youtube_suggest','--queries',*a['queries'],'--category_map',json.dumps(a.get('category_map',{})),'--out',str(tmp)]
-        else:
-            continue
-        subprocess.check_call(cmd)
-        merged.extend([json.loads(l) for l in tmp.read_text(encoding='utf-8').splitlines() if l.strip()])
-    pathlib.Path(args.out).write_text('\n'.join(json.dumps(x,ensure_ascii=False) for x in merged), encoding='utf-8')
+    run(args.config, args.out, args.stats, args.db)
 
 if __name__ == '__main__':
     main()
@@ -1,22 +1,30 @@
 import argparse, pathlib, json
-from .base import Candidate
+from .base import Candidate, register
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--file', required=True)
 parser.add_argument('--category', required=True)
 parser.add_argument('--out', required=True)
 
+def read_seeds(file, category):
+    p = pathlib.Path(file)
+    lines = [l.strip() for l in p.read_text(encoding='utf-8').splitlines() if l.strip()]
+    for t in lines:
+        yield Candidate(title=t, category=category,
+                        signals={"trend":0.3, "search":0.4, "freshness":0.5},
+                        terms=t.split(), source='seed_list')
+
+@register('seed_list')
+async def produce(file, category):
+    for c in read_seeds(file, category):
+        yield c
+
 def main():
     args = parser.parse_args()
-    p = pathlib.Path(args.file)
-    lines = [l.strip() for l in p.read_text(encoding='utf-8').splitlines() if l.strip()]
     out = pathlib.Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
     with out.open('w', encoding='utf-8') as f:
-        for t in lines:
-            c = Candidate(title=t, category=args.category,
-                          signals={"trend":0.3, "search":0.4, "freshness":0.5},
-                          terms=t.split(), source='seed_list')
+        for c in read_seeds(args.file, args.category):
             f.write(json.dumps(c.to_json(), ensure_ascii=False) + '\n')
 
 if __name__ == '__main__':
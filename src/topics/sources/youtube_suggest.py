@@ -1,41 +1,196 @@
-# Lightweight YouTube suggest (no API). May throttle; keep queries small.
-import argparse, json, time
-import requests
-from .base import Candidate
+# Lightweight YouTube suggest (no API).
+# - aiohttp 세션 하나(keep-alive) + 토큰 버킷으로 초당 요청 수 제한(고정 sleep 대신)
+# - 429/5xx/연결 오류는 지수 백오프 재시도, 최종 실패는 로그로 남김
+# - 응답은 (query, client, ds) 키로 디스크 TTL 캐시
+# - depth > 0 이면 제안어를 다시 질의(suggest of suggest), budget 개 질의까지
+# - 로컬 대역 서버로 돌릴 땐 --url 또는 YT_SUGGEST_URL
+import argparse, asyncio, hashlib, json, os, pathlib, random, time
+from .base import Candidate, register
+
+SUGGEST_URL = os.environ.get('YT_SUGGEST_URL', 'https://suggestqueries.google.com/complete/search')
+CACHE_DIR = os.environ.get('YT_SUGGEST_CACHE', 'data/cache/youtube_suggest')
+CACHE_TTL = 6 * 3600
+PER_QUERY = 8
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--queries', nargs='+', required=True)
 parser.add_argument('--category_map', type=json.loads, default='{}')
 parser.add_argument('--out', required=True)
+parser.add_argument('--depth', type=int, default=0)
+parser.add_argument('--budget', type=int, default=100)    # 최대 질의 수(시드 포함)
+parser.add_argument('--rate', type=float, default=10.0)   # 초당 요청
+parser.add_argument('--concurrency', type=int, default=8)
+parser.add_argument('--ttl', type=float, default=CACHE_TTL)
+parser.add_argument('--url', default=SUGGEST_URL)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class SuggestCache:
+    def __init__(self, root=CACHE_DIR, ttl=CACHE_TTL):
+        self.root = pathlib.Path(root) if root else None
+        self.ttl = ttl
+
+    def _path(self, key):
+        h = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()
+        return self.root / h[:2] / f'{h}.json'
 
-def fetch_suggest(q):
-    # Public suggest endpoint (client=firefox works often)
-    url = 'https://suggestqueries.google.com/complete/search'
-    params = {"client":"firefox", "ds":"yt", "q": q}
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-    return data[1] if isinstance(data, list) and len(data)>=2 else []
+    def get(self, key):
+        if self.root is None or not self.ttl:
+            return None
+        p = self._path(key)
+        try:
+            if time.time() - p.stat().st_mtime > self.ttl:
+                return None
+            return json.loads(p.read_text(encoding='utf-8'))['sugs']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, sugs):
+        if self.root is None or not self.ttl:
+            return
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps({'key': key, 'sugs': sugs}, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, p)
+
+class SuggestFetcher:
+    """async with SuggestFetcher(rate=10) as f: sugs = await f.fetch('블루 아카이브')"""
+    def __init__(self, url=SUGGEST_URL, client='firefox', ds='yt', rate=10.0, burst=None, concurrency=8,
+                 retries=3, backoff=0.5, timeout=10, cache_dir=CACHE_DIR, ttl=CACHE_TTL):
+        self.url = url
+        self.client, self.ds = client, ds
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = max(1, int(concurrency))
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.cache = SuggestCache(cache_dir, ttl)
+        self.session = None
+        self._sem = None
+        self.stats = {'requests': 0, 'cached': 0, 'retries': 0, 'failed': 0}
+
+    async def __aenter__(self):
+        import aiohttp
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _get(self, q):
+        import aiohttp
+        params = {'client': self.client, 'ds': self.ds, 'q': q}
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            try:
+                async with self.session.get(self.url, params=params) as r:
+                    if r.status == 429 or r.status >= 500:
+                        ra = r.headers.get('Retry-After', '')
+                        if ra.isdigit():
+                            delay = max(delay, float(ra))
+                        raise aiohttp.ClientResponseError(r.request_info, r.history, status=r.status, message=r.reason or '')
+                    r.raise_for_status()
+                    data = json.loads(await r.text())
+                    return data[1] if isinstance(data, list) and len(data) >= 2 else []
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                status = getattr(e, 'status', None)
+                if attempt >= self.retries or (status is not None and 400 <= status < 500 and status != 429):
+                    raise
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+    async def fetch(self, q):
+        key = [q, self.client, self.ds]
+        sugs = self.cache.get(key)
+        if sugs is not None:
+            self.stats['cached'] += 1
+            return sugs
+        async with self._sem:
+            try:
+                sugs = await self._get(q)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f'[youtube_suggest] {q!r} failed: {type(e).__name__}: {e}')
+                return []
+        self.cache.put(key, sugs)
+        return sugs
+
+    async def _tagged(self, root, q):
+        return root, q, await self.fetch(q)
+
+    async def expand(self, seeds, depth=0, budget=100):
+        """BFS: (root, query, level, suggestions)를 끝나는 대로 내보냄. 질의는 budget 개까지."""
+        seen = set()
+        level = []
+        for q in seeds:
+            if q not in seen and len(seen) < budget:
+                seen.add(q)
+                level.append((q, q))
+        for d in range(depth + 1):
+            nxt = []
+            for fut in asyncio.as_completed([self._tagged(root, q) for root, q in level]):
+                root, q, sugs = await fut
+                yield root, q, d, sugs
+                if d < depth:
+                    for s in sugs[:PER_QUERY]:
+                        if s not in seen and len(seen) < budget:
+                            seen.add(s)
+                            nxt.append((root, s))
+            level = nxt
+            if not level:
+                break
+
+def to_candidates(q, sugs, cmap, root=None):
+    cat = cmap.get(root or q, 'internet.culture')
+    for s in sugs[:PER_QUERY]:
+        yield Candidate(title=s, category=cat,
+                        signals={"trend":0.6, "search":0.7, "freshness":0.6},
+                        terms=list({q, *s.split()}), source='youtube_suggest')
+
+@register('youtube_suggest')
+async def produce(queries, category_map=None, depth=0, budget=100, rate=10.0, concurrency=8,
+                  ttl=CACHE_TTL, cache_dir=CACHE_DIR, url=SUGGEST_URL):
+    cmap = category_map or {}
+    seen = set()
+    async with SuggestFetcher(url=url, rate=rate, concurrency=concurrency, cache_dir=cache_dir, ttl=ttl) as f:
+        async for root, q, _, sugs in f.expand(queries, depth, budget):
+            for c in to_candidates(q, sugs, cmap, root):
+                if c.title not in seen:
+                    seen.add(c.title)
+                    yield c
+        print(f'[youtube_suggest] {f.stats}')
+
+async def _write(args, cmap):
+    with open(args.out, 'w', encoding='utf-8') as out:
+        async for c in produce(args.queries, cmap, args.depth, args.budget, args.rate, args.concurrency,
+                               args.ttl, url=args.url):
+            out.write(json.dumps(c.to_json(), ensure_ascii=False) + '\n')
 
 def main():
     args = parser.parse_args()
     cmap = json.loads(args.category_map) if isinstance(args.category_map, str) else args.category_map
-    out = open(args.out, 'w', encoding='utf-8')
-    try:
-        for q in args.queries:
-            try:
-                sugs = fetch_suggest(q)
-            except Exception:
-                sugs = []
-            cat = cmap.get(q, 'internet.culture')
-            for s in sugs[:8]:
-                c = Candidate(title=s, category=cat,
-                              signals={"trend":0.6, "search":0.7, "freshness":0.6},
-                              terms=list({q, *s.split()}), source='youtube_suggest')
-                out.write(json.dumps(c.to_json(), ensure_ascii=False) + '\n')
-            time.sleep(0.5)
-    finally:
-        out.close()
+    asyncio.run(_write(args, cmap))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,221 @@
+import argparse, csv, hashlib, json, pathlib, re, sqlite3, time, datetime as dt
+from typing import Any, Dict, Iterable, List, Optional
+
+# 토픽 엔진 저장소 (SQLite, WAL)
+# - candidates: 소스 실행(run_id)별 후보, 추가만 함
+# - picks: 선택 히스토리 — (category, picked_at), title_hash 인덱스
+# - bandit: 카테고리/소스 arm 별 alpha/beta
+# - 동시 실행: WAL + busy_timeout, 쓰기는 모두 트랜잭션 단위
+#
+#   st = TopicStore('data/topics.db')
+#   rows = st.history_rows(since=today - timedelta(days=14))
+#   st.add_picks(picked, today)
+
+DB_PATH = 'data/topics.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    category TEXT,
+    source TEXT,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cand_run ON candidates(run_id);
+CREATE INDEX IF NOT EXISTS idx_cand_hash ON candidates(title_hash);
+CREATE INDEX IF NOT EXISTS idx_cand_created ON candidates(created_at);
+CREATE TABLE IF NOT EXISTS picks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    category TEXT,
+    source TEXT,
+    picked_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_picks_cat_date ON picks(category, picked_at);
+CREATE INDEX IF NOT EXISTS idx_picks_date ON picks(picked_at);
+CREATE INDEX IF NOT EXISTS idx_picks_hash ON picks(title_hash);
+CREATE TABLE IF NOT EXISTS bandit (
+    arm TEXT PRIMARY KEY,
+    alpha REAL NOT NULL,
+    beta REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def title_hash(title: str) -> str:
+    key = re.sub(r'\s+', ' ', (title or '').strip().lower())
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _now():
+    return dt.datetime.now().isoformat(timespec='seconds')
+
+def read_history_file(path) -> List[Dict[str, Any]]:
+    """히스토리 파일(JSON lines, 또는 picked_at 헤더가 있는 CSV) → 행 목록."""
+    p = pathlib.Path(path)
+    if not p.exists():
+        return []
+    text = p.read_text(encoding='utf-8')
+    lines = [l for l in text.splitlines() if l.strip()]
+    if lines and not lines[0].lstrip().startswith('{'):
+        return [dict(r) for r in csv.DictReader(lines) if r.get('picked_at') and r.get('title')]
+    return [json.loads(l) for l in lines]
+
+class TopicStore:
+    def __init__(self, path=DB_PATH, timeout: float = 30.0):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=timeout)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(f'PRAGMA busy_timeout={int(timeout * 1000)}')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- candidates ----------
+    def add_candidates(self, cands: Iterable[Dict[str, Any]], run_id: str) -> int:
+        now = _now()
+        rows = [(run_id, c['title'], title_hash(c['title']), c.get('category'), c.get('source'),
+                 json.dumps(c, ensure_ascii=False), now) for c in cands]
+        with self.conn:
+            self.conn.executemany('INSERT INTO candidates(run_id,title,title_hash,category,source,data,created_at) '
+                                  'VALUES (?,?,?,?,?,?,?)', rows)
+        return len(rows)
+
+    def latest_run(self) -> Optional[str]:
+        r = self.conn.execute('SELECT run_id FROM candidates ORDER BY id DESC LIMIT 1').fetchone()
+        return r[0] if r else None
+
+    def candidates(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        run_id = run_id or self.latest_run()
+        if run_id is None:
+            return []
+        cur = self.conn.execute('SELECT data FROM candidates WHERE run_id=? ORDER BY id', (run_id,))
+        return [json.loads(r[0]) for r in cur]
+
+    # ---------- picks ----------
+    def add_picks(self, picked: Iterable[Dict[str, Any]], day: Optional[dt.date] = None) -> int:
+        """선택 기록. picked_at이 없으면 day(기본 오늘) 기준으로 채움."""
+        stamp = (day or dt.date.today()).isoformat() + dt.datetime.now().strftime('T%H:%M:%S')
+        rows = []
+        for c in picked:
+            r = dict(c, picked_at=c.get('picked_at') or stamp)
+            rows.append((r['title'], title_hash(r['title']), r.get('category'), r.get('source'),
+                         r['picked_at'], json.dumps(r, ensure_ascii=False)))
+        with self.conn:
+            self.conn.executemany('INSERT INTO picks(title,title_hash,category,source,picked_at,data) '
+                                  'VALUES (?,?,?,?,?,?)', rows)
+        return len(rows)
+
+    def history_rows(self, since: Optional[dt.date] = None) -> List[Dict[str, Any]]:
+        """since 이후 선택(날짜 문자열 비교, picked_at 인덱스 사용)."""
+        q, args = 'SELECT title, category, source, picked_at FROM picks', ()
+        if since is not None:
+            q, args = q + ' WHERE picked_at >= ?', (since.isoformat(),)
+        return [dict(r) for r in self.conn.execute(q + ' ORDER BY picked_at, id', args)]
+
+    def lookup_pick(self, title: str) -> Optional[Dict[str, Any]]:
+        """제목으로 가장 최근 선택의 category/source (피드백 보충용)."""
+        r = self.conn.execute('SELECT category, source FROM picks WHERE title_hash=? ORDER BY id DESC LIMIT 1',
+                              (title_hash(title),)).fetchone()
+        return {k: r[k] for k in ('category', 'source') if r[k]} if r else None
+
+    def import_history(self, path) -> int:
+        """예전 JSONL/CSV 히스토리를 한 번만 가져옴(파일 크기+mtime 기준)."""
+        p = pathlib.Path(path)
+        if not p.exists():
+            return 0
+        st = p.stat()
+        key, stamp = f'import:{p.resolve()}', f'{st.st_size}:{st.st_mtime_ns}'
+        r = self.conn.execute('SELECT value FROM meta WHERE key=?', (key,)).fetchone()
+        prev, _, done = (r[0] if r else '').partition('|')
+        if prev == stamp:
+            return 0
+        done = int(done or 0)
+        rows = read_history_file(p)[done:]       # 추가만 된 파일이면 새 줄만
+        n = self.add_picks(rows)
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO meta(key,value) VALUES (?,?)',
+                              (key, f'{stamp}|{done + n}'))
+        return n
+
+    # ---------- bandit ----------
+    def load_bandit(self) -> Dict[str, Dict[str, float]]:
+        return {r['arm']: {'alpha': r['alpha'], 'beta': r['beta']}
+                for r in self.conn.execute('SELECT arm, alpha, beta FROM bandit')}
+
+    def save_bandit(self, state: Dict[str, Dict[str, float]], feedback_keys: Iterable[str] = ()):
+        """bandit 상태 저장. feedback_keys(처리한 피드백)도 같은 트랜잭션으로 meta에 기록."""
+        now = _now()
+        with self.conn:
+            self.conn.executemany('INSERT INTO bandit(arm,alpha,beta,updated_at) VALUES (?,?,?,?) '
+                                  'ON CONFLICT(arm) DO UPDATE SET alpha=excluded.alpha, beta=excluded.beta, '
+                                  'updated_at=excluded.updated_at',
+                                  [(k, float(v['alpha']), float(v['beta']), now) for k, v in state.items()])
+            self.conn.executemany('INSERT OR IGNORE INTO meta(key,value) VALUES (?,?)',
+                                  [('feedback:' + k, now) for k in feedback_keys])
+
+    def feedback_seen(self) -> set:
+        cur = self.conn.execute("SELECT substr(key, 10) FROM meta WHERE key >= 'feedback:' AND key < 'feedback;'")
+        return {r[0] for r in cur}
+
+    # ---------- maintenance ----------
+    def compact(self, keep_candidate_days: int = 14, keep_pick_days: Optional[int] = None):
+        """보존 기간이 지난 후보(및 선택적으로 오래된 선택)를 지우고 WAL을 비움."""
+        today = dt.date.today()
+        with self.conn:
+            c = self.conn.execute('DELETE FROM candidates WHERE created_at < ?',
+                                  ((today - dt.timedelta(days=keep_candidate_days)).isoformat(),)).rowcount
+            p = 0
+            if keep_pick_days is not None:
+                p = self.conn.execute('DELETE FROM picks WHERE picked_at < ?',
+                                      ((today - dt.timedelta(days=keep_pick_days)).isoformat(),)).rowcount
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.execute('VACUUM')
+        return {'candidates': c, 'picks': p}
+
+    def stats(self):
+        one = lambda q: self.conn.execute(q).fetchone()[0]
+        return {'candidates': one('SELECT COUNT(*) FROM candidates'),
+                'runs': one('SELECT COUNT(DISTINCT run_id) FROM candidates'),
+                'picks': one('SELECT COUNT(*) FROM picks'),
+                'arms': one('SELECT COUNT(*) FROM bandit')}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--db', default=DB_PATH)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats')
+    ih = sub.add_parser('import-history')
+    ih.add_argument('path')
+    cp = sub.add_parser('compact')
+    cp.add_argument('--keep-candidates', type=int, default=14)
+    cp.add_argument('--keep-picks', type=int, default=None)
+    args = ap.parse_args()
+    with TopicStore(args.db) as st:
+        if args.cmd == 'import-history':
+            print(f'imported {st.import_history(args.path)}')
+        elif args.cmd == 'compact':
+            t0 = time.time()
+            print(st.compact(args.keep_candidates, args.keep_picks), f'{time.time() - t0:.2f}s')
+        print(json.dumps(st.stats()))
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,18 @@ parser = argparse.ArgumentParser()
 parser.add_argument('--beats', required=True)
 parser.add_argument('--write', required=True)
 
-def main():
-    import math
-    args = parser.parse_args()
-    rows = list(csv.DictReader(open(args.beats, encoding='utf-8')))
+def estimate(rows):
+    """beat 행 목록 → sec_target을 추정 길이로 바꾼 새 목록."""
+    out = []
     for r in rows:
         chars = len(r['line_ko'])
         est = max(1.5, min(8.0, chars/10.0))  # ~10cps heuristic
-        r['sec_target'] = f"{est:.2f}"
+        out.append(dict(r, sec_target=f"{est:.2f}"))
+    return out
+
+def main():
+    args = parser.parse_args()
+    rows = estimate(list(csv.DictReader(open(args.beats, encoding='utf-8'))))
     # rewrite
     import io
     out = io.StringIO()
@@ -73,45 +73,98 @@ def ken_burns_from_image(img_path: str, size: str, secs: float, out_path: str, f
     )
     ff(cmd)
 
-def comfyui_generate_shot(client: ComfyClient, workflow_path: str, prompt_node: int, neg_node: Optional[int], prompt: str, out_img: str):
-    with open(workflow_path, "r", encoding="utf-8") as f:
-        wf = json.load(f)
-    nid = str(prompt_node)
-    if nid in wf:
-        wf[nid].setdefault("inputs", {})
-        wf[nid]["inputs"]["text"] = prompt
-    if neg_node is not None:
-        nidn = str(neg_node)
-        if nidn in wf:
-            wf[nidn].setdefault("inputs", {})
-            wf[nidn]["inputs"]["text"] = "low quality, blurry, watermark, text"
+COMFY_NEG = "low quality, blurry, watermark, text"
+
+def comfyui_prepare_workflow(workflow_path: str, prompt_node: int, neg_node: Optional[int], prompt: str):
+    # 템플릿은 한 번만 파싱(캐시), 샷마다 사본만 만든다
+    from .comfy_workflow import WorkflowTemplate
+    tpl = WorkflowTemplate.load(workflow_path, prompt_node, neg_node)
+    return tpl.render(prompt, negative=COMFY_NEG if neg_node is not None else None)
 
+def comfyui_generate_shot(client: ComfyClient, workflow_path: str, prompt_node: int, neg_node: Optional[int], prompt: str, out_img: str):
+    wf = comfyui_prepare_workflow(workflow_path, prompt_node, neg_node, prompt)
     r = client.queue_prompt(wf)
     pid = r.get("prompt_id")
     hist = client.wait_for_complete(pid, timeout=600)
     # Expect images in hist["outputs"][<node_id>]["images"] entries
-    outputs = hist.get("outputs", {})
-    for node_id, node_out in outputs.items():
-        imgs = node_out.get("images") or []
-        for im in imgs:
-            fn = im.get("filename")
-            sf = im.get("subfolder","")
-            if fn:
-                try:
-                    client.fetch_image(fn, sf, out_img)
-                    return True
-                except Exception as e:
-                    print("[warn] image fetch failed:", e)
+    for im in client.output_images(hist):
+        try:
+            client.fetch_image(im["filename"], im.get("subfolder", ""), out_img)
+            return True
+        except Exception as e:
+            print("[warn] image fetch failed:", e)
     return False
 
+def comfyui_generate_images(prompts: List[str], out_imgs: List[str], comfy_cfg: dict) -> List[bool]:
+    """
+    전 샷 이미지를 ComfyUI 인스턴스들에 동시에 투입(comfy_cfg["url"]은 콤마 구분 복수 가능).
+    샷 순서대로 성공 여부 반환.
+    """
+    from .comfy_dispatch import ComfyDispatcher
+    from .comfy_workflow import WorkflowTemplate
+    neg_node = comfy_cfg.get("neg_prompt_node")
+    tpl = WorkflowTemplate.load(comfy_cfg["workflow_path"], comfy_cfg["prompt_node"], neg_node)
+    # 설정이 같은 샷 bs개씩 워크플로 하나로 묶음(큐 등록/스케줄링 오버헤드 절감)
+    # 재사용 인덱스: 동일(옵션: 유사) 프롬프트+설정 이미지가 있으면 생성하지 않음
+    reuse = comfy_cfg.get("reuse", "off")
+    index, hits = None, {}
+    s_in = tpl.graph.get(tpl.sampler_node, {}).get("inputs", {})
+    l_in = tpl.graph.get(tpl.latent_node, {}).get("inputs", {})
+    settings = {"engine": "comfy", "workflow": os.path.basename(comfy_cfg["workflow_path"]),
+                "w": l_in.get("width"), "h": l_in.get("height"), "steps": s_in.get("steps"), "cfg": s_in.get("cfg"),
+                "sampler": s_in.get("sampler_name"), "neg": COMFY_NEG if neg_node is not None else None,
+                "seed": s_in.get(tpl.seed_key)}
+    # 워크플로 시드가 랜덤(없음/음수)이면 매번 다른 이미지가 목적 → 인덱스를 보지도 쓰지도 않음
+    seed = settings["seed"]
+    if reuse != "off" and (not isinstance(seed, int) or seed < 0):
+        print("[comfy] 랜덤 시드 → 이미지 재사용 안 함")
+    elif reuse != "off":
+        from .image_index import ImageIndex
+        index = ImageIndex()
+        heroes = set(comfy_cfg.get("hero_shots", [0]))
+        for i, (p, img) in enumerate(zip(prompts, out_imgs)):
+            near = comfy_cfg.get("near_thr", 0.8) if reuse == "near" and i not in heroes else None
+            hit = index.lookup(p, settings, near=near)
+            if hit:
+                index.materialize(hit[0], img)
+                hits[i] = hit
+                print(f"[comfy] shot {i:03d} reused ({hit[2]}, {hit[1]:.2f}): {hit[0]}")
+    todo = [i for i in range(len(prompts)) if i not in hits]
+
+    bs = max(1, int(comfy_cfg.get("batch", 1)))
+    jobs, spans = [], []
+    for k in range(0, len(todo), bs):
+        idxs = todo[k:k + bs]
+        wf, out_nodes = tpl.render_batch([prompts[i] for i in idxs], negative=settings["neg"])
+        jobs.append({"workflow": wf, "save_to": [out_imgs[i] for i in idxs], "output_nodes": out_nodes})
+        spans.append(idxs)
+    disp = ComfyDispatcher(comfy_cfg.get("urls") or comfy_cfg["url"], depth=comfy_cfg.get("depth", 2),
+                           retries=comfy_cfg.get("retries", 2))
+    try:
+        results = disp.run(jobs, on_result=lambda i, r: print(
+            f"[comfy] shots {','.join(f'{x:03d}' for x in spans[i])} "
+            f"{'ok' if r['ok'] else 'failed: ' + r.get('error', '')} ({r.get('instance')})"))
+        print("[comfy] per-instance:", disp.stats())
+    finally:
+        disp.close()
+    ok = [i in hits for i in range(len(prompts))]
+    for idxs, r in zip(spans, results):
+        for i in idxs:
+            ok[i] = bool(r and r["ok"])
+            if ok[i] and index is not None:
+                index.add(prompts[i], settings, out_imgs[i])
+    return ok
+
 def build_shot_video(text: str, prompt: str, size: str, secs: float, tmp_dir: str,
-                     use_comfy: bool=False, comfy_cfg: dict=None) -> str:
+                     use_comfy: bool=False, comfy_cfg: dict=None, image_ready: bool=False) -> str:
+    # image_ready: comfyui_generate_images로 shot.png를 미리 만들어 둔 경우
     img_path = os.path.join(tmp_dir, "shot.png")
     vid_path = os.path.join(tmp_dir, "shot.mp4")
-    used_comfy = False
-    if use_comfy and comfy_cfg:
+    used_comfy = image_ready and os.path.exists(img_path)
+    if use_comfy and comfy_cfg and not used_comfy:
         try:
-            cc = ComfyClient(comfy_cfg["url"])
+            from .comfy_dispatch import parse_urls
+            cc = ComfyClient(parse_urls(comfy_cfg.get("urls") or comfy_cfg["url"])[0])
             ok = comfyui_generate_shot(cc, comfy_cfg["workflow_path"], comfy_cfg["prompt_node"],
                                        comfy_cfg.get("neg_prompt_node"), prompt, img_path)
             used_comfy = bool(ok)
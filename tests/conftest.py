@@ -0,0 +1,153 @@
+# 테스트 공용: 별도 스레드 이벤트 루프에서 도는 로컬 aiohttp 서버 + 가짜 ComfyUI
+# (requests/websocket-client를 쓰는 동기 클라이언트가 그대로 붙을 수 있게)
+import asyncio, json, threading, uuid
+import pytest
+from aiohttp import web, WSMsgType
+
+class ServerThread:
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(10)
+
+    def start(self) -> str:
+        self.thread.start()
+
+        async def setup():
+            self.runner = web.AppRunner(self.app)
+            await self.runner.setup()
+            site = web.TCPSite(self.runner, '127.0.0.1', 0)
+            await site.start()
+            return site._server.sockets[0].getsockname()[1]
+
+        self.url = f'http://127.0.0.1:{self._call(setup())}'
+        return self.url
+
+    def stop(self):
+        self._call(self.runner.cleanup())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+@pytest.fixture
+def serve():
+    """serve(app) → base url. 테스트가 끝나면 서버를 모두 내림."""
+    servers = []
+
+    def start(app):
+        s = ServerThread(app)
+        servers.append(s)
+        return s.start()
+
+    yield start
+    for s in servers:
+        s.stop()
+
+class FakeComfy:
+    """
+    /prompt, /history/{id}, /queue, /ws, /view 만 흉내 내는 ComfyUI.
+    - 프롬프트는 delay초 뒤 완료, 출력 이미지 이름 = "<name>_<텍스트 노드 text>.png"
+    - workflow["_fake"]: {"fail_on": [인스턴스 이름...]} 이면 그 인스턴스에서 execution_error
+    - done_event: "executing"(node=null) 또는 "execution_success"
+    - ws=False 면 /ws 는 404 (클라이언트는 폴링으로)
+    """
+    def __init__(self, name='A', delay=0.05, ws=True, done_event='executing', view_size=200_000):
+        self.name, self.delay, self.ws, self.done_event = name, delay, ws, done_event
+        self.view_size = view_size
+        self.history, self.pending = {}, set()
+        self.prompts, self.history_hits, self.ws_connects = [], 0, 0
+        self.sockets = {}
+        self.app = web.Application()
+        self.app.router.add_post('/prompt', self.prompt)
+        self.app.router.add_get('/history/{pid}', self.get_history)
+        self.app.router.add_get('/queue', self.queue)
+        self.app.router.add_get('/ws', self.websocket)
+        self.app.router.add_get('/view', self.view)
+        self.app.on_shutdown.append(self._close_sockets)
+
+    @staticmethod
+    def text_of(wf):
+        return next(n['inputs']['text'] for k, n in wf.items() if k != '_fake' and 'text' in n.get('inputs', {}))
+
+    def content(self, filename):
+        head = filename.encode('utf-8') + b'|'
+        return (head * (self.view_size // len(head) + 1))[:self.view_size]
+
+    async def prompt(self, request):
+        body = await request.json()
+        pid = body.get('prompt_id') or uuid.uuid4().hex
+        wf = body['prompt']
+        self.prompts.append(self.text_of(wf))
+        self.pending.add(pid)
+        asyncio.get_running_loop().create_task(self._run(pid, wf, body.get('client_id')))
+        return web.json_response({'prompt_id': pid, 'number': len(self.prompts)})
+
+    async def _send(self, cid, typ, data):
+        ws = self.sockets.get(cid)
+        if ws is not None and not ws.closed:
+            await ws.send_str(json.dumps({'type': typ, 'data': data}))
+
+    async def _run(self, pid, wf, cid):
+        await asyncio.sleep(self.delay)
+        await self._send(cid, 'executing', {'node': '3', 'prompt_id': pid})
+        if self.name in (wf.get('_fake') or {}).get('fail_on', ()):
+            self.history[pid] = {'outputs': {}, 'status': {'status_str': 'error'}}
+            self.pending.discard(pid)
+            await self._send(cid, 'execution_error', {'prompt_id': pid, 'node_id': '3',
+                                                      'exception_message': f'boom on {self.name}'})
+            return
+        fn = f'{self.name}_{self.text_of(wf)}.png'
+        self.history[pid] = {'outputs': {'9': {'images': [{'filename': fn, 'subfolder': '', 'type': 'output'}]}},
+                             'status': {'status_str': 'success'}}
+        self.pending.discard(pid)
+        if self.done_event == 'execution_success':
+            await self._send(cid, 'execution_success', {'prompt_id': pid})
+        else:
+            await self._send(cid, 'executing', {'node': None, 'prompt_id': pid})
+
+    async def get_history(self, request):
+        self.history_hits += 1
+        pid = request.match_info['pid']
+        return web.json_response({pid: self.history[pid]} if pid in self.history else {})
+
+    async def queue(self, request):
+        return web.json_response({'queue_running': [], 'queue_pending': [[0, p] for p in self.pending]})
+
+    async def websocket(self, request):
+        if not self.ws:
+            raise web.HTTPNotFound()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.ws_connects += 1
+        cid = request.query.get('clientId')
+        self.sockets[cid] = ws
+        await ws.send_str(json.dumps({'type': 'status', 'data': {'sid': cid}}))
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+        self.sockets.pop(cid, None)
+        return ws
+
+    async def view(self, request):
+        data = self.content(request.query['filename'])
+        resp = web.StreamResponse(headers={'Content-Type': 'image/png'})
+        await resp.prepare(request)
+        for s in range(0, len(data), 16384):      # 청크 전송(Content-Length 없이)
+            await resp.write(data[s:s + 16384])
+        await resp.write_eof()
+        return resp
+
+    async def _close_sockets(self, app):
+        for ws in list(self.sockets.values()):
+            await ws.close()
+
+@pytest.fixture
+def fake_comfy(serve):
+    """fake_comfy(name=..., **opts) → (url, FakeComfy)."""
+    def start(name='A', **kw):
+        fake = FakeComfy(name, **kw)
+        return serve(fake.app), fake
+    return start
@@ -0,0 +1,67 @@
+# ComfyClient: 로컬 가짜 ComfyUI(conftest.FakeComfy)로 ws 완료 이벤트 / 실행 오류 / 폴링 폴백 / /view 청크 다운로드
+#   python -m pytest -q tests/test_comfy_client.py
+import os
+import pytest
+from src import comfy_client
+from src.comfy_client import ComfyClient
+
+def _wf(text, **fake):
+    return {'6': {'class_type': 'CLIPTextEncode', 'inputs': {'text': text}}, '_fake': fake}
+
+@pytest.mark.parametrize('event', ['executing', 'execution_success'])
+def test_ws_done_event(fake_comfy, event):
+    url, fake = fake_comfy(done_event=event, delay=0.2)
+    c = ComfyClient(url)
+    try:
+        pid = c.queue_prompt(_wf('cat'))['prompt_id']
+        hist = c.wait_for_complete(pid, timeout=10)
+    finally:
+        c.close()
+    assert fake.ws_connects == 1
+    assert c.output_images(hist)[0]['filename'] == 'A_cat.png'
+    assert fake.history_hits == 1          # 이벤트 뒤 한 번만 조회(폴링 안 함)
+
+def test_ws_execution_error_raises(fake_comfy):
+    url, fake = fake_comfy()
+    c = ComfyClient(url)
+    try:
+        pid = c.queue_prompt(_wf('dog', fail_on=['A']))['prompt_id']
+        with pytest.raises(RuntimeError, match='execution_error: boom on A'):
+            c.wait_for_complete(pid, timeout=10)
+    finally:
+        c.close()
+
+def test_polling_fallback_without_ws(fake_comfy):
+    url, fake = fake_comfy(ws=False, delay=0.5)
+    c = ComfyClient(url)
+    try:
+        pid = c.queue_prompt(_wf('owl'))['prompt_id']
+        assert c._ws is None and c._ws_failed
+        hist = c.wait_for_complete(pid, poll=2.0, timeout=10)
+    finally:
+        c.close()
+    assert c.output_images(hist)[0]['filename'] == 'A_owl.png'
+    # 0.1s부터 1.5배씩 늘리는 폴링 → 0.5초 작업에 여러 번, 고정 2초 간격보다 촘촘
+    assert 3 <= fake.history_hits <= 10
+
+def test_view_chunked_download_via_part_file(fake_comfy, tmp_path, monkeypatch):
+    url, fake = fake_comfy(view_size=300_000)
+    moves = []
+    real_replace = os.replace
+
+    def spy(src, dst):
+        assert os.path.getsize(src) == 300_000     # 임시 파일에 다 받은 뒤 이동
+        moves.append((str(src), str(dst)))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(comfy_client.os, 'replace', spy)
+    out = str(tmp_path / 'shot.png')
+    c = ComfyClient(url, use_ws=False)
+    try:
+        assert c.fetch_image('A_x.png', '', out) == out
+    finally:
+        c.close()
+    assert moves == [(out + '.part', out)]
+    assert not os.path.exists(out + '.part')
+    with open(out, 'rb') as f:
+        assert f.read() == fake.content('A_x.png')
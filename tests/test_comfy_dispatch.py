@@ -0,0 +1,59 @@
+# ComfyDispatcher: 로컬 가짜 ComfyUI 인스턴스 여러 개(conftest.FakeComfy)로 순서 / 재시도 / 전부 다운
+#   python -m pytest -q tests/test_comfy_dispatch.py
+import socket, threading, time
+from src.comfy_dispatch import ComfyDispatcher
+
+def _wf(text, **fake):
+    return {'6': {'class_type': 'CLIPTextEncode', 'inputs': {'text': text}}, '_fake': fake}
+
+def _jobs(tmp_path, n, **fake):
+    return [{'workflow': _wf(f'shot{i:02d}', **fake), 'save_to': [str(tmp_path / f'shot_{i:02d}.png')]}
+            for i in range(n)]
+
+def _run(disp, jobs, limit=30):
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault('res', disp.run(jobs)), daemon=True)
+    t.start()
+    t.join(limit)
+    disp.close()
+    assert not t.is_alive(), 'dispatcher hung'
+    return out['res']
+
+def test_results_in_shot_order(fake_comfy, tmp_path):
+    # 인스턴스마다 속도가 달라 완료 순서는 섞이지만 결과는 입력 순서
+    servers = [fake_comfy(name, delay=d) for name, d in (('A', 0.02), ('B', 0.15), ('C', 0.3))]
+    fakes = {f.name: f for _, f in servers}
+    jobs = _jobs(tmp_path, 9)
+    res = _run(ComfyDispatcher([u for u, _ in servers], depth=2, queue_poll=0.02), jobs)
+    assert all(r['ok'] for r in res)
+    for i, r in enumerate(res):
+        name = next(f.name for u, f in servers if u == r['instance'])
+        assert r['images'][0]['filename'] == f'{name}_shot{i:02d}.png'
+        with open(jobs[i]['save_to'][0], 'rb') as f:
+            assert f.read() == fakes[name].content(f'{name}_shot{i:02d}.png')
+    assert sum(len(f.prompts) for f in fakes.values()) == 9
+
+def test_failed_prompt_retried_on_other_instance(fake_comfy, tmp_path):
+    # A에서는 모든 프롬프트가 execution_error, B는 느리게 성공 → A에 먼저 간 샷은 B로 재시도
+    (ua, fa), (ub, fb) = fake_comfy('A', delay=0.02), fake_comfy('B', delay=0.2)
+    jobs = _jobs(tmp_path, 4, fail_on=['A'])
+    res = _run(ComfyDispatcher([ua, ub], depth=1, retries=2, queue_poll=0.02), jobs)
+    assert all(r['ok'] and r['instance'] == ub for r in res)
+    assert fa.prompts                                          # A도 실제로 받았다가 실패
+    retried = [r for r in res if r['attempts'] > 1]
+    assert len(retried) == len(fa.prompts)
+    assert sorted(fb.prompts) == [f'shot{i:02d}' for i in range(4)]
+
+def _dead_url():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{s.getsockname()[1]}'
+
+def test_all_instances_dead_fails_jobs(tmp_path):
+    jobs = _jobs(tmp_path, 3)
+    disp = ComfyDispatcher([_dead_url(), _dead_url()], depth=1, retries=1, queue_poll=0.02, cooldown=0.1)
+    t0 = time.time()
+    res = _run(disp, jobs, limit=20)
+    assert time.time() - t0 < 10
+    assert [r['ok'] for r in res] == [False] * 3
+    assert all(r['error'] for r in res)
@@ -0,0 +1,72 @@
+# SDClient: 로컬 가짜 /sdapi/v1/txt2img 로 묶음(batch_size) / 샷별 분리 순서 / 동시 요청 수 제한
+#   python -m pytest -q tests/test_sd_client.py
+import asyncio, base64, io
+from aiohttp import web
+from PIL import Image
+from src.sd_client import SDClient, group_jobs, make_payload
+
+class FakeSD:
+    """이미지 k의 픽셀 = (k, seed+k 또는 255(랜덤 시드), 프롬프트 번호) — 어느 요청의 몇 번째인지 복원용."""
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls, self.active, self.max_active = [], 0, 0
+        self.app = web.Application()
+        self.app.router.add_post('/sdapi/v1/txt2img', self.txt2img)
+
+    @staticmethod
+    def pixel(k, seed, prompt):
+        return (k, (seed + k) % 255 if seed >= 0 else 255, int(prompt.split()[-1]))
+
+    async def txt2img(self, request):
+        p = await request.json()
+        self.calls.append(p)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        imgs = []
+        for k in range(p.get('batch_size', 1) * p.get('n_iter', 1)):
+            buf = io.BytesIO()
+            Image.new('RGB', (2, 2), self.pixel(k, p['seed'], p['prompt'])).save(buf, 'PNG')
+            imgs.append(base64.b64encode(buf.getvalue()).decode('ascii'))
+        return web.json_response({'images': imgs})
+
+def _job(key, prompt, seed, **kw):
+    return {'key': key, 'payload': make_payload(prompt, w=64, h=64, steps=4, seed=seed, **kw)}
+
+def test_group_jobs_merges_random_and_consecutive_seeds():
+    jobs = [_job(0, 'p 1', -1), _job(1, 'p 1', -1), _job(2, 'p 1', 7), _job(3, 'p 1', 8), _job(4, 'p 1', 10),
+            _job(5, 'p 2', -1), _job(6, 'p 1', -1), _job(7, 'p 1', 9, cfg=3)]
+    groups = [[j['key'] for j in g] for g in group_jobs(jobs, max_batch=4)]
+    # 시드 -1끼리 / 연속 시드끼리만, 설정(프롬프트/cfg)이 다르면 따로
+    assert groups == [[0, 1], [2, 3], [4], [5], [6], [7]]
+    assert [len(g) for g in group_jobs([_job(i, 'p 1', -1) for i in range(6)], max_batch=4)] == [4, 2]
+
+def test_batched_calls_split_back_per_shot(serve):
+    fake = FakeSD(delay=0.05)
+    url = serve(fake.app)
+    jobs = [_job('a0', 'p 1', 100), _job('a1', 'p 1', 101), _job('a2', 'p 1', 102),
+            _job('r0', 'p 2', -1), _job('r1', 'p 2', -1), _job('x', 'p 3', 5)]
+    with SDClient(url, max_in_flight=2, max_batch=4) as c:
+        got = {job['key']: img for job, img in c.iter_txt2img(jobs)}
+        stats = dict(c.stats)
+    assert not any(isinstance(v, Exception) for v in got.values())
+    # 묶음 3개 → 요청 3번, batch_size = 묶음 크기
+    assert sorted((p['prompt'], p['batch_size'], p['seed']) for p in fake.calls) == \
+        [('p 1', 3, 100), ('p 2', 2, -1), ('p 3', 1, 5)]
+    assert stats['requests'] == 3 and stats['images'] == 6
+    # 잡 순서 = 묶음 안 이미지 순서 (A1111: seed, seed+1, ...)
+    expect = {'a0': (0, 100, 1), 'a1': (1, 101, 1), 'a2': (2, 102, 1),
+              'r0': (0, 255, 2), 'r1': (1, 255, 2), 'x': (0, 5, 3)}
+    assert {k: img.getpixel((0, 0)) for k, img in got.items()} == expect
+
+def test_in_flight_limit(serve):
+    fake = FakeSD(delay=0.15)
+    url = serve(fake.app)
+    jobs = [_job(i, f'p {i}', -1) for i in range(6)]          # 프롬프트가 다 달라 묶이지 않음 → 요청 6번
+    with SDClient(url, max_in_flight=2) as c:
+        out = list(c.iter_txt2img(jobs))
+    assert len(out) == 6 and len(fake.calls) == 6
+    assert fake.max_active == 2
@@ -0,0 +1,106 @@
+# youtube_suggest: 로컬 aiohttp 대역 서버로 재시도 / 속도 제한 / TTL 캐시 / depth·budget 확인
+#   python -m pytest -q tests/test_youtube_suggest.py
+import asyncio, json, os, time
+from aiohttp import web
+from src.topics.sources.youtube_suggest import SuggestFetcher
+
+class Stub:
+    """q별 응답 스크립트: script[q] = [status, ...] 를 순서대로 쓰고 다 쓰면 200."""
+    def __init__(self, script=None):
+        self.script = {q: list(v) for q, v in (script or {}).items()}
+        self.hits = []
+
+    async def handle(self, request):
+        q = request.query['q']
+        self.hits.append(q)
+        todo = self.script.get(q)
+        if todo:
+            status = todo.pop(0)
+            return web.Response(status=status, headers={'Retry-After': '0'} if status == 429 else None)
+        return web.Response(text=json.dumps([q, [f'{q} a', f'{q} b', f'{q} c']], ensure_ascii=False))
+
+async def _serve(stub, body):
+    app = web.Application()
+    app.router.add_get('/complete/search', stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await body(f'http://127.0.0.1:{port}/complete/search')
+    finally:
+        await runner.cleanup()
+
+def _fetcher(url, tmp_path, **kw):
+    kw = {'rate': 1000, 'backoff': 0.01, 'retries': 3, 'cache_dir': str(tmp_path / 'cache'), **kw}
+    return SuggestFetcher(url=url, **kw)
+
+def test_retry_on_429_and_5xx(tmp_path):
+    stub = Stub({'flaky': [429, 503], 'down': [500] * 10, 'gone': [404]})
+
+    async def body(url):
+        async with _fetcher(url, tmp_path) as f:
+            res = {q: await f.fetch(q) for q in ('flaky', 'down', 'gone')}
+            return res, f.stats
+
+    res, stats = asyncio.run(_serve(stub, body))
+    assert res['flaky'] == ['flaky a', 'flaky b', 'flaky c']
+    assert stub.hits.count('flaky') == 3
+    assert res['down'] == [] and stub.hits.count('down') == 4      # 1 + retries
+    assert res['gone'] == [] and stub.hits.count('gone') == 1      # 4xx(429 제외)는 재시도 안 함
+    assert stats['retries'] == 2 + 3 and stats['failed'] == 2
+
+def test_rate_limit(tmp_path):
+    stub = Stub()
+    n, rate = 11, 20.0
+
+    async def body(url):
+        async with _fetcher(url, tmp_path, rate=rate, burst=1, concurrency=8, ttl=0) as f:
+            t0 = time.monotonic()
+            await asyncio.gather(*(f.fetch(f'q{i}') for i in range(n)))
+            return time.monotonic() - t0
+
+    elapsed = asyncio.run(_serve(stub, body))
+    assert len(stub.hits) == n
+    assert elapsed >= (n - 1) / rate * 0.9                          # 버킷 1개 + 나머지는 1/rate 간격
+
+def test_ttl_cache_hit_and_expiry(tmp_path):
+    stub = Stub()
+
+    async def body(url):
+        async with _fetcher(url, tmp_path, ttl=60) as f:
+            first = await f.fetch('cached')
+        async with _fetcher(url, tmp_path, ttl=60) as f:           # 새 세션, 같은 디스크 캐시
+            second = await f.fetch('cached')
+            hit_stats = dict(f.stats)
+        for p in (tmp_path / 'cache').rglob('*.json'):              # TTL 지난 것처럼 mtime을 되돌림
+            old = time.time() - 120
+            os.utime(p, (old, old))
+        async with _fetcher(url, tmp_path, ttl=60) as f:
+            await f.fetch('cached')
+            return first, second, hit_stats, f.stats
+
+    first, second, hit_stats, expired_stats = asyncio.run(_serve(stub, body))
+    assert first == second
+    assert hit_stats['cached'] == 1 and hit_stats['requests'] == 0
+    assert expired_stats['cached'] == 0 and expired_stats['requests'] == 1
+    assert stub.hits == ['cached', 'cached']
+
+def test_depth_and_budget(tmp_path):
+    stub = Stub()
+
+    async def body(url):
+        out = {}
+        for depth, budget in ((0, 100), (1, 100), (2, 100), (2, 6)):
+            async with _fetcher(url, tmp_path, ttl=0) as f:
+                out[depth, budget] = [(root, q, d) async for root, q, d, _ in f.expand(['x', 'y'], depth, budget)]
+        return out
+
+    out = asyncio.run(_serve(stub, body))
+    assert {q for _, q, _ in out[0, 100]} == {'x', 'y'}
+    assert len(out[1, 100]) == 2 + 2 * 3 and max(d for *_, d in out[1, 100]) == 1
+    assert len(out[2, 100]) == 2 + 6 + 18 and max(d for *_, d in out[2, 100]) == 2
+    assert len(out[2, 6]) == 6                                     # 시드 포함 budget 개 질의
+    assert all(root in ('x', 'y') and q.startswith(root) for root, q, _ in out[2, 6])
+    assert len(stub.hits) == 2 + 8 + 26 + 6